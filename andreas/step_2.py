@@ -1,35 +1,26 @@
-from urllib.request import urlopen
-import re
+import os
+import sys
 
-url = "https://www.qalamos.net/receive/MyMssPerson_agent_00001577"
-page = urlopen(url)
-html = page.read().decode("utf-8")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extract import load_rules
+from common.http_client import fetch_html
 
-BASE = "https://www.qalamos.net"
+url = "https://www.qalamos.net/receive/MyMssPerson_agent_00001577"
+html = fetch_html(url)
 
-# Regex for manuscript links
-pattern = re.compile(
-    r'<a href="(.*?)" class="link-manuscript[^"]*">\s*'
-    r'\[(.*?)\]\s*'          # Library
-    r'([^:]+):\s*'           # Code
-    r'(.*?)\s*'              # Title + (Author)
-    r'\(([^()]+)\)\s*'       # Author (last parentheses)
-    r'</a>',
-    re.DOTALL
-)
+# Library, code, title and author of each manuscript link are declared in
+# qalamos_rules.json; links are made absolute against its "base"
+rules = load_rules(os.path.join(os.path.dirname(os.path.abspath(__file__)), "qalamos_rules.json"))
 
 results = []
 
-matches = pattern.findall(html)
-
-for link, library, code, title, author in matches:
-    link = BASE + link.strip()
-    library = library.strip()
-    code = code.strip()
-    title = re.sub(r'\s*\([^()]+\)\s*$', '', title.strip())  # remove trailing extra (..)
-    author = author.strip()
+for _, record in rules.records(html):
+    results.append((record["author"], record["title"], record["code"],
+                    record["library"], record["link"]))
 
-    results.append((author, title, code, library, link))
+if rules.skipped or not results:
+    print(f"Warning: {len(results)} manuscripts found, {sum(rules.skipped.values())} links "
+          f"did not match qalamos_rules.json - has the page layout changed?\n")
 
 # Print results
 for author, title, code, library, link in results:
@@ -1,8 +1,11 @@
-import time
+import os
+import sys
 from urllib.parse import urljoin, parse_qs, urlparse
-from urllib.request import urlopen
 
-from bs4 import BeautifulSoup
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.crawl import follow_chain
+from common.http_client import fetch_html, get_client
+from common.parsers import make_soup, take_parser_option
 
 TEXT_ID = "1999.01.0126"     
 BOOK = "1"
@@ -13,9 +16,8 @@ OUTPUT_FILE = f"perseus_{TEXT_ID}_book{BOOK}_chapter{CHAPTER}.txt"
 
 def get_soup(url):
     """Download one page and return BeautifulSoup."""
-    page = urlopen(url)
-    html = page.read().decode("utf-8")
-    return BeautifulSoup(html, "html.parser")
+    html = fetch_html(url)
+    return make_soup(html)
 
 def extract_text(soup):
     """
@@ -67,37 +69,49 @@ def still_in_target_section(url):
         f":chapter={CHAPTER}:" in doc_value
     )
 
-def scrape_book_chapter(start_url):
-    url = start_url
-    all_sections = []
+def next_section_url(soup, url):
+    """
+    Next URL of the chain, or None once it leaves the target chapter.
+    """
+    next_url = find_next_url(soup, url)
+    if next_url is None or not still_in_target_section(next_url):
+        return None
+    return next_url
+
+def write_section(f, i, section_text):
+    f.write(f"[Section {i}]\n")
+    f.write(section_text)
+    f.write("\n\n")
+
+    print(f"[Section {i}]")
+    print(section_text)
+    print()
 
-    while True:
-        soup = get_soup(url)
+def scrape_book_chapter(start_url, out=None, pipelined=True, delay=0.5):
+    """
+    Follow the 'next' arrows through the chapter.
+    With pipelined=True the next page downloads while this one is
+    extracted and written to `out`; `delay` seconds of politeness are
+    kept either way.
+    """
+    all_sections = []
 
+    for url, soup in follow_chain(start_url, get_soup, next_section_url,
+                                  delay=delay, pipelined=pipelined):
         text = extract_text(soup)
         if text:
             all_sections.append(text)
-
-        next_url = find_next_url(soup, url)
-        if next_url is None or not still_in_target_section(next_url):
-            break
-
-        url = next_url
-        time.sleep(0.5)  
+            if out is not None:
+                write_section(out, len(all_sections), text)
 
     return all_sections
 
 if __name__ == "__main__":
-    sections = scrape_book_chapter(START_URL)
+    take_parser_option(sys.argv)
+    pipelined = "--serial" not in sys.argv
 
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        for i, section_text in enumerate(sections, start=1):
-            f.write(f"[Section {i}]\n")
-            f.write(section_text)
-            f.write("\n\n")
-
-            print(f"[Section {i}]")
-            print(section_text)
-            print()
+        sections = scrape_book_chapter(START_URL, out=f, pipelined=pipelined)
 
     print(f"Saved {len(sections)} sections to {OUTPUT_FILE}")
+    print(f"Connections: {get_client().describe_stats()}")
@@ -0,0 +1,154 @@
+# 📈 Aggregate Statistics - vectorized totals, means and percentiles
+# Loads the analytics fields into NumPy columns once, then every statistic
+# is a single array operation, so millions of records stay interactive.
+# NumPy is optional: without it the viewers fall back to plain totals.
+
+from urllib.parse import urlparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FIELDS = ('links', 'images', 'paragraphs', 'word_count', 'total_text_length')
+LABELS = {
+    'links': '🔗 Links',
+    'images': '🖼️  Images',
+    'paragraphs': '📝 Paragraphs',
+    'word_count': '💬 Words',
+    'total_text_length': '📏 Text length',
+}
+PERCENTILES = (50, 90, 99)
+
+
+class ColorText:
+    """Terminal colors"""
+    HEADER = '\033[95m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+
+def numpy_available():
+    return np is not None
+
+
+def host_of(url):
+    return urlparse(url or '').netloc.lower() or 'unknown'
+
+
+def make_columns(values, host_codes, host_names):
+    """
+    Build the column set from plain sequences:
+        values      {field: sequence of ints} (array.array works without a copy)
+        host_codes  sequence of ints, index into host_names, one per record
+    """
+    columns = {field: np.asarray(values[field], dtype=np.int64) for field in FIELDS}
+    columns['host'] = np.asarray(host_codes, dtype=np.int64)
+    columns['host_names'] = list(host_names)
+    return columns
+
+
+def columns_from_rows(rows):
+    """Columns from (host, links, images, paragraphs, word_count, text_length) rows"""
+    rows = list(rows)
+    lookup = {}
+    host_codes = [lookup.setdefault(row[0] or 'unknown', len(lookup)) for row in rows]
+    numbers = np.array([row[1:] for row in rows], dtype=np.int64).reshape(-1, len(FIELDS))
+    values = {field: numbers[:, i] for i, field in enumerate(FIELDS)}
+    return make_columns(values, host_codes, lookup)
+
+
+def columns_from_records(records):
+    """Columns from analytics dicts (e.g. loaded JSON files)"""
+    return columns_from_rows(
+        (host_of(r.get('url')), r.get('links') or 0, r.get('images') or 0, r.get('paragraphs') or 0,
+         r.get('word_count') or 0, r.get('total_text_length') or 0)
+        for r in records)
+
+
+def describe(columns):
+    """{field: {'total', 'mean', 'min', 'max', 'p50', 'p90', 'p99'}}"""
+    stats = {}
+    for field in FIELDS:
+        values = columns[field]
+        if values.size == 0:
+            stats[field] = dict(total=0, mean=0.0, min=0, max=0,
+                                **{f"p{p}": 0.0 for p in PERCENTILES})
+            continue
+        percentiles = np.percentile(values, PERCENTILES)
+        stats[field] = dict(
+            total=int(values.sum()),
+            mean=float(values.mean()),
+            min=int(values.min()),
+            max=int(values.max()),
+            **{f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+        )
+    return stats
+
+
+def histogram(values, bins=8):
+    """(counts, edges) with logarithmic bins, which suit word counts and link counts"""
+    if values.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    top = max(int(values.max()), 1)
+    edges = np.unique(np.concatenate(([0], np.rint(np.geomspace(1, top, bins)))).astype(np.int64))
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def by_host(columns, top=10, sort_field='word_count'):
+    """
+    Per-host page counts and sums, computed with bincount.
+    Returns the `top` hosts by pages as [(host, pages, {field: sum})].
+    """
+    codes = columns['host']
+    names = columns['host_names']
+    if codes.size == 0:
+        return []
+    pages = np.bincount(codes, minlength=len(names))
+    sums = {field: np.bincount(codes, weights=columns[field], minlength=len(names))
+            for field in FIELDS}
+    order = np.lexsort((-sums[sort_field], -pages))[:top]
+    return [(names[i], int(pages[i]), {field: int(sums[field][i]) for field in FIELDS})
+            for i in order]
+
+
+def display_statistics(columns, top_hosts=10):
+    """Print the vectorized summary: per-field stats, a histogram and top hosts"""
+    count = columns['links'].size
+    print(f"\n{ColorText.BOLD}{ColorText.BLUE}📈 DETAILED STATISTICS ({count:,} pages){ColorText.END}")
+    print("═" * 70)
+    if count == 0:
+        print(f"{ColorText.YELLOW}No pages to analyze{ColorText.END}")
+        return
+
+    stats = describe(columns)
+    print(f"{'Field':<18} {'Total':>14} {'Mean':>10} {'p50':>9} {'p90':>9} {'p99':>9} {'Max':>10}")
+    print("─" * 70)
+    for field in FIELDS:
+        s = stats[field]
+        print(f"{LABELS[field]:<18} {s['total']:>14,} {s['mean']:>10,.1f} {s['p50']:>9,.0f} "
+              f"{s['p90']:>9,.0f} {s['p99']:>9,.0f} {s['max']:>10,}")
+
+    counts, edges = histogram(columns['word_count'])
+    if counts.size:
+        print(f"\n{ColorText.YELLOW}Words per page:{ColorText.END}")
+        widest = max(int(counts.max()), 1)
+        last = len(counts) - 1
+        for i, (c, low, high) in enumerate(zip(counts, edges[:-1], edges[1:])):
+            bar = '█' * int(40 * c / widest)
+            # Bins are [low, high) except the last, which np.histogram closes: [low, high]
+            high = int(high) if i == last else int(high) - 1
+            print(f"  {int(low):>9,} – {high:<9,} {bar} {int(c):,}")
+
+    hosts = by_host(columns, top=top_hosts)
+    if len(columns['host_names']) > 1:
+        print(f"\n{ColorText.YELLOW}Top hosts:{ColorText.END}")
+        for host, pages, sums in hosts:
+            print(f"  {host[:40]:<40} {pages:>8,} pages {sums['word_count']:>14,} words")
+    print("═" * 70)
@@ -0,0 +1,144 @@
+# 🗂️ Analytics Index - keeps every analytics_*.json in one SQLite file
+# Only new or changed files (by mtime and size) are parsed again, so the
+# stats viewer stays fast with tens of thousands of analytics files.
+
+import json
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+INDEX_FILE = '.analytics_index.sqlite'
+
+# Bump when the table changes; an older index is simply rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics (
+    filename TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    url TEXT,
+    host TEXT,
+    timestamp TEXT,
+    title TEXT,
+    links INTEGER NOT NULL DEFAULT 0,
+    images INTEGER NOT NULL DEFAULT 0,
+    paragraphs INTEGER NOT NULL DEFAULT 0,
+    total_text_length INTEGER NOT NULL DEFAULT 0,
+    word_count INTEGER,
+    data TEXT NOT NULL
+);
+"""
+
+
+def is_analytics_file(name):
+    return name.startswith('analytics_') and name.endswith('.json')
+
+
+def row_from_data(filename, mtime, size, data):
+    """Flatten the fields the viewer sorts and sums on into columns (a null count is 0)"""
+    return (
+        filename, mtime, size,
+        data.get('url'), urlparse(data.get('url') or '').netloc.lower() or None,
+        data.get('timestamp'), data.get('title'),
+        data.get('links') or 0, data.get('images') or 0, data.get('paragraphs') or 0,
+        data.get('total_text_length') or 0, data.get('word_count'),
+        json.dumps(data),
+    )
+
+
+class AnalyticsIndex:
+    """
+    Persistent index of the analytics files in a directory.
+
+        index = AnalyticsIndex()
+        index.refresh()            # picks up new / changed / deleted files
+        index.filenames()          # newest first, like find_analytics_files()
+        index.load(filename)       # the parsed dict
+        index.totals()             # sums over all files
+    """
+
+    def __init__(self, directory='.', index_file=INDEX_FILE):
+        self.directory = directory
+        self.db = sqlite3.connect(os.path.join(directory, index_file))
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS analytics;")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the directory.
+        Returns (added_or_changed, removed, errors).
+        """
+        known = {name: (mtime, size) for name, mtime, size
+                 in self.db.execute("SELECT filename, mtime, size FROM analytics")}
+
+        seen = set()
+        changed = []
+        errors = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not is_analytics_file(entry.name) or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                if known.get(entry.name) == (stat.st_mtime, stat.st_size):
+                    continue
+                try:
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    errors.append((entry.name, e))
+                    continue
+                if not isinstance(data, dict):
+                    errors.append((entry.name, ValueError("not a JSON object")))
+                    continue
+                changed.append(row_from_data(entry.name, stat.st_mtime, stat.st_size, data))
+
+        removed = [(name,) for name in known if name not in seen]
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO analytics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                changed)
+            self.db.executemany("DELETE FROM analytics WHERE filename = ?", removed)
+
+        return len(changed), len(removed), errors
+
+    def filenames(self):
+        """All indexed files, newest name first"""
+        return [name for (name,) in
+                self.db.execute("SELECT filename FROM analytics ORDER BY filename DESC")]
+
+    def load(self, filename):
+        """The analytics dict of one file, or None"""
+        row = self.db.execute("SELECT data FROM analytics WHERE filename = ?",
+                              (filename,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def sizes(self):
+        """{filename: size in bytes}"""
+        return dict(self.db.execute("SELECT filename, size FROM analytics"))
+
+    def summary_rows(self, limit=-1):
+        """(filename, url, title, links, images) for the newest `limit` files (all by default)"""
+        return self.db.execute(
+            "SELECT filename, url, title, links, images FROM analytics "
+            "ORDER BY filename DESC LIMIT ?", (limit,))
+
+    def stat_rows(self):
+        """(host, links, images, paragraphs, word_count, total_text_length) for every file"""
+        return self.db.execute(
+            "SELECT host, links, images, paragraphs, COALESCE(word_count, 0), total_text_length "
+            "FROM analytics")
+
+    def totals(self):
+        """Page count and summed links / images / words over all files"""
+        pages, links, images, words = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(links), 0), COALESCE(SUM(images), 0), "
+            "COALESCE(SUM(word_count), 0) FROM analytics").fetchone()
+        return {'pages': pages, 'links': links, 'images': images, 'words': words}
+
+    def close(self):
+        self.db.close()
@@ -1,14 +1,32 @@
 # 🚀 Batch Web Scraper - Scrape Multiple URLs from File!
 # Reads URLs from urls.txt and scrapes them all automatically
 
-from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
-from bs4 import BeautifulSoup
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import argparse
 import json
+import os
 import time
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Sibling modules (aggregate_stats, reports, ...) also resolve when imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.analytics import StreamingCensus, take_census, normalized_text_stats
+from common.cache import cache_from_environment
+from common.http_client import configure_client, get_client
+from common.parsers import available_backends, make_soup, pick_parser, set_parser
+from common.throttle import HostThrottle, host_of
+
+from aggregate_stats import FIELDS, display_statistics, make_columns, numpy_available
+from reports import write_batch_report
+
+# Pages with more characters than this are analyzed without a parse tree
+STREAM_THRESHOLD = 5 * 1024 * 1024
+
 
 class ColorText:
     """Terminal colors"""
@@ -55,18 +73,17 @@ def read_urls_from_file(filename='urls.txt'):
         return []
 
 
-def fetch_page(url):
-    """Fetch a web page with error handling"""
+def fetch_page(url, reader=None):
+    """Fetch a web page with error handling (with a PageReader, the text streams into it)"""
     try:
         print(f"{ColorText.YELLOW}⏳ Fetching: {ColorText.CYAN}{url}{ColorText.END}")
 
         headers = {'User-Agent': 'Mozilla/5.0 (Batch Scraper)'}
-        req = Request(url, headers=headers)
-
-        page = urlopen(req, timeout=10)
-        html = page.read().decode("utf-8")
+        # Shared keep-alive client: streamed with a size limit, decoded with the page's own charset
+        html = get_client().get_text(url, headers=headers, feed=reader and reader.feed)
 
-        print(f"{ColorText.GREEN}✅ Success! {len(html):,} bytes{ColorText.END}")
+        size = reader.size if reader is not None else len(html)
+        print(f"{ColorText.GREEN}✅ Success! {size:,} bytes{ColorText.END}")
         return html
 
     except HTTPError as e:
@@ -80,33 +97,58 @@ def fetch_page(url):
         return None
 
 
+class PageReader:
+    """
+    Collects a page's text as it streams in. Past `threshold` characters it
+    stops keeping the text and feeds a StreamingCensus instead, so a huge
+    page is analyzed without ever building its tree.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.pieces = []
+        self.size = 0
+        self.census = None
+
+    def feed(self, text):
+        self.size += len(text)
+        if self.census is not None:
+            self.census.feed(text)
+            return
+        self.pieces.append(text)
+        if self.size > self.threshold:
+            self.census = StreamingCensus()
+            for piece in self.pieces:
+                self.census.feed(piece)
+            self.pieces = []
+
+    def html(self):
+        return ''.join(self.pieces)
+
+
 def analyze_page(html):
     """Parse and analyze HTML"""
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html)
 
-    # Remove scripts and styles
-    for script in soup(["script", "style"]):
-        script.decompose()
-
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = '\n'.join(chunk for chunk in chunks if chunk)
+    # Single pass over the tree, scripts and styles removed
+    census = take_census(soup)
+    tags = census['tags']
+    text_length, word_count = normalized_text_stats(census['text'])
 
     analytics = {
-        'title': soup.title.string if soup.title else 'No title',
-        'links': len(soup.find_all('a')),
-        'images': len(soup.find_all('img')),
+        'title': census['title'],
+        'links': tags['a'],
+        'images': tags['img'],
         'headings': {
-            'h1': len(soup.find_all('h1')),
-            'h2': len(soup.find_all('h2')),
-            'h3': len(soup.find_all('h3')),
+            'h1': tags['h1'],
+            'h2': tags['h2'],
+            'h3': tags['h3'],
         },
-        'paragraphs': len(soup.find_all('p')),
-        'forms': len(soup.find_all('form')),
-        'tables': len(soup.find_all('table')),
-        'total_text_length': len(text),
-        'word_count': len(text.split())
+        'paragraphs': tags['p'],
+        'forms': tags['form'],
+        'tables': tags['table'],
+        'total_text_length': text_length,
+        'word_count': word_count
     }
 
     return soup, analytics
@@ -124,122 +166,374 @@ def display_progress_bar(current, total, bar_length=40):
         print()  # New line when complete
 
 
-def scrape_urls(urls, delay=1):
-    """Scrape multiple URLs with progress tracking"""
-    total = len(urls)
-    results = []
-    successful = 0
-    failed = 0
-
-    print(f"\n{ColorText.BOLD}Starting batch scrape of {total} URLs...{ColorText.END}\n")
-
-    for i, url in enumerate(urls, 1):
-        print(f"\n{ColorText.BOLD}[{i}/{total}]{ColorText.END}")
-        print("─" * 60)
+def analyze_stream(census):
+    """The analyze_page() dict from a StreamingCensus that has seen the whole page"""
+    census = census.result()
+    tags = census['tags']
+    return {
+        'title': census['title'],
+        'links': tags['a'],
+        'images': tags['img'],
+        'headings': {
+            'h1': tags['h1'],
+            'h2': tags['h2'],
+            'h3': tags['h3'],
+        },
+        'paragraphs': tags['p'],
+        'forms': tags['form'],
+        'tables': tags['table'],
+        'total_text_length': census['text_length'],
+        'word_count': census['word_count']
+    }
 
-        html = fetch_page(url)
 
-        if html:
-            soup, analytics = analyze_page(html)
-            analytics['url'] = url
-            analytics['scraped_at'] = datetime.now().isoformat()
+def scrape_one(url, stream_threshold=STREAM_THRESHOLD):
+    """Fetch and analyze one URL (runs in a worker thread)"""
+    reader = PageReader(stream_threshold)
+    if fetch_page(url, reader) is None:
+        return {'url': url, 'status': 'failed'}
+
+    if reader.census is not None:
+        print(f"{ColorText.CYAN}🌊 Large page, analyzed while streaming: {url}{ColorText.END}")
+        analytics = analyze_stream(reader.census)
+    else:
+        soup, analytics = analyze_page(reader.html())
+    # An empty <title> or one with tags inside has no single string
+    analytics['title'] = analytics['title'] or 'No title'
+    analytics['url'] = url
+    analytics['scraped_at'] = datetime.now().isoformat()
+
+    return {
+        'url': url,
+        'status': 'success',
+        'analytics': analytics
+    }
 
-            results.append({
-                'url': url,
-                'status': 'success',
-                'analytics': analytics
-            })
 
-            # Display quick stats
-            print(f"{ColorText.GREEN}📊 Quick Stats:{ColorText.END}")
-            print(f"   Title: {analytics['title'][:50]}")
-            print(f"   Links: {analytics['links']}, Images: {analytics['images']}, Words: {analytics['word_count']:,}")
+def scrape_urls(urls, sink, delay=1, workers=8, per_host=2, stream_threshold=STREAM_THRESHOLD):
+    """
+    Scrape multiple URLs concurrently with progress tracking.
+    Every result is handed to `sink` (a BatchSink) as soon as it is done,
+    so the results come out in completion order, not in the order of `urls`.
 
-            successful += 1
+    Up to `workers` fetches run at the same time. Politeness is per host:
+    each host gets at most one new request every `delay` seconds and at
+    most `per_host` requests in flight, so URLs on different hosts never
+    wait for each other. Pages over `stream_threshold` characters are
+    analyzed while they stream in (see PageReader).
+    """
+    total = len(urls)
+    completed = 0
+
+    print(f"\n{ColorText.BOLD}Starting batch scrape of {total} URLs "
+          f"({workers} workers, {delay}s per host)...{ColorText.END}\n")
+
+    # Queue the URLs per host, keeping the file order within each host
+    pending = OrderedDict()
+    for index, url in enumerate(urls):
+        pending.setdefault(host_of(url), deque()).append((index, url))
+
+    throttle = HostThrottle(delay)
+    host_busy = Counter()
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or in_flight:
+            # Start fetches on every host that is allowed to go right now
+            next_ready = None
+            for host in list(pending):
+                # A host may take several slots (up to per_host) if its throttle allows
+                while host in pending and len(in_flight) < workers and host_busy[host] < per_host:
+                    if not throttle.try_acquire(host):
+                        wait_time = throttle.ready_in(host)
+                        next_ready = wait_time if next_ready is None else min(next_ready, wait_time)
+                        break
+
+                    index, url = pending[host].popleft()
+                    if pending[host]:
+                        pending.move_to_end(host)  # round-robin between hosts
+                    else:
+                        del pending[host]
+
+                    host_busy[host] += 1
+                    in_flight[pool.submit(scrape_one, url, stream_threshold)] = (index, host)
+                if len(in_flight) >= workers:
+                    break
+
+            if not in_flight:
+                time.sleep(next_ready or 0.05)
+                continue
+
+            # Wake up when a fetch finishes or the next host becomes ready
+            timeout = next_ready if pending and len(in_flight) < workers else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index, host = in_flight.pop(future)
+                host_busy[host] -= 1
+                completed += 1
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"{ColorText.RED}❌ Error analyzing {urls[index]}: {e}{ColorText.END}")
+                    result = {'url': urls[index], 'status': 'failed'}
+                sink.write(result)
+
+                print(f"\n{ColorText.BOLD}[{completed}/{total}]{ColorText.END} {result['url']}")
+                print("─" * 60)
+
+                if result['status'] == 'success':
+                    analytics = result['analytics']
+
+                    # Display quick stats
+                    print(f"{ColorText.GREEN}📊 Quick Stats:{ColorText.END}")
+                    print(f"   Title: {(analytics['title'] or 'No title')[:50]}")
+                    print(f"   Links: {analytics['links']}, Images: {analytics['images']}, Words: {analytics['word_count']:,}")
+
+                # Progress bar
+                display_progress_bar(completed, total)
+
+    return sink.totals
+
+
+def load_previous_results(results_file):
+    """
+    Read a batch_results_*.jsonl file from an earlier run.
+    Returns {url: result}; when a URL appears more than once (it was
+    retried) the last line wins. A torn last line from a crash is ignored.
+    """
+    previous = {}
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            previous[result['url']] = result
+    return previous
+
+
+def find_latest_results():
+    """Newest batch_results_*.jsonl in the working directory, or None"""
+    files = sorted(f for f in os.listdir('.') if f.startswith('batch_results_') and f.endswith('.jsonl'))
+    return files[-1] if files else None
+
+
+def trim_torn_line(filename):
+    """Cut a half-written last line off a file so appending stays valid JSONL"""
+    with open(filename, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class BatchSink:
+    """
+    Writes batch results while the run is going:
+
+        batch_results_<timestamp>.jsonl  one compact JSON line per URL, in
+                                         the order the fetches finished
+        batch_summary_<timestamp>.txt    the human readable summary
+
+    Both files are buffered and checkpointed (flushed and fsync'ed) every
+    `checkpoint_every` results or `checkpoint_seconds` seconds, so a crash
+    loses at most that much work. Aggregates are kept as running totals
+    instead of holding every result in memory.
+
+    With `resume_from` the sink appends to an earlier run's files and
+    starts its totals from the results already in them.
+    """
+
+    def __init__(self, timestamp=None, checkpoint_every=100, checkpoint_seconds=30,
+                 resume_from=None, previous=None):
+        if resume_from:
+            self.results_file = resume_from
+            self.summary_file = resume_from.replace('batch_results_', 'batch_summary_', 1)
+            self.summary_file = self.summary_file[:-len('.jsonl')] + '.txt'
+            trim_torn_line(self.results_file)
+            mode = 'a'
         else:
-            results.append({
-                'url': url,
-                'status': 'failed'
-            })
-            failed += 1
-
-        # Progress bar
-        display_progress_bar(i, total)
+            timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.results_file = f"batch_results_{timestamp}.jsonl"
+            self.summary_file = f"batch_summary_{timestamp}.txt"
+            mode = 'w'
+
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
+        self.totals = {
+            'total': 0,
+            'successful': 0,
+            'failed': 0,
+            'links': 0,
+            'images': 0,
+            'words': 0,
+        }
+
+        # One compact column per field for the final statistics (8 bytes a page)
+        self.values = {field: array('q') for field in FIELDS}
+        self.host_codes = array('q')
+        self.hosts = {}
+
+        # Status of every URL already counted, so a retried URL is not counted twice
+        self.status = {}
+        for result in (previous or {}).values():
+            self.count(result)
+
+        self.results = open(self.results_file, mode, encoding='utf-8', buffering=1024 * 1024)
+        self.summary = open(self.summary_file, mode, encoding='utf-8', buffering=1024 * 1024)
+
+        self.summary.write("=" * 70 + "\n")
+        self.summary.write("BATCH SCRAPING SUMMARY" + (" (RESUMED)" if resume_from else "") + "\n")
+        self.summary.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.summary.write("=" * 70 + "\n\n")
+
+    def count(self, result):
+        """Add a result to the running totals (replacing an earlier failure)"""
+        url = result['url']
+        if self.status.get(url) == 'failed':
+            self.totals['failed'] -= 1
+            self.totals['total'] -= 1
+        elif url in self.status:
+            return
+
+        self.status[url] = result['status']
+        self.totals['total'] += 1
+        if result['status'] == 'success':
+            analytics = result['analytics']
+            self.totals['successful'] += 1
+            self.totals['links'] += analytics['links']
+            self.totals['images'] += analytics['images']
+            self.totals['words'] += analytics['word_count']
+            for field in FIELDS:
+                self.values[field].append(analytics.get(field) or 0)
+            self.host_codes.append(self.hosts.setdefault(host_of(url), len(self.hosts)))
+        else:
+            self.totals['failed'] += 1
 
-        # Delay between requests (be nice to servers!)
-        if i < total:
-            time.sleep(delay)
+    def columns(self):
+        """The successful pages' fields as NumPy columns (see aggregate_stats)"""
+        return make_columns(self.values, self.host_codes, self.hosts)
 
-    return results, successful, failed
+    def write(self, result):
+        """Append one result to both files and update the totals"""
+        self.results.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + "\n")
 
+        url = result['url']
+        status = result['status']
+        self.summary.write(f"URL: {url}\n")
+        self.summary.write(f"Status: {status.upper()}\n")
 
-def save_batch_results(results):
-    """Save batch scraping results"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if status == 'success':
+            analytics = result['analytics']
+            self.summary.write(f"Title: {analytics['title']}\n")
+            self.summary.write(f"Links: {analytics['links']}, Images: {analytics['images']}\n")
+            self.summary.write(f"Words: {analytics['word_count']:,}\n")
 
-    # Save complete results
-    results_file = f"batch_results_{timestamp}.json"
-    with open(results_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+        self.summary.write("-" * 70 + "\n\n")
+        self.count(result)
 
-    # Create summary report
-    summary_file = f"batch_summary_{timestamp}.txt"
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 70 + "\n")
-        f.write("BATCH SCRAPING SUMMARY\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 70 + "\n\n")
+        self.pending += 1
+        if (self.pending >= self.checkpoint_every
+                or time.monotonic() - self.last_checkpoint >= self.checkpoint_seconds):
+            self.checkpoint()
 
-        for result in results:
-            url = result['url']
-            status = result['status']
+    def checkpoint(self):
+        """Flush both files and make sure they are on disk"""
+        for f in (self.results, self.summary):
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
 
-            f.write(f"URL: {url}\n")
-            f.write(f"Status: {status.upper()}\n")
+    def close(self):
+        self.checkpoint()
+        self.results.close()
+        self.summary.close()
 
-            if status == 'success':
-                analytics = result['analytics']
-                f.write(f"Title: {analytics['title']}\n")
-                f.write(f"Links: {analytics['links']}, Images: {analytics['images']}\n")
-                f.write(f"Words: {analytics['word_count']:,}\n")
+        print(f"\n{ColorText.GREEN}💾 Results saved:{ColorText.END}")
+        print(f"   Complete data: {self.results_file}")
+        print(f"   Summary: {self.summary_file}")
 
-            f.write("-" * 70 + "\n\n")
+    def __enter__(self):
+        return self
 
-    print(f"\n{ColorText.GREEN}💾 Results saved:{ColorText.END}")
-    print(f"   Complete data: {results_file}")
-    print(f"   Summary: {summary_file}")
+    def __exit__(self, *exc):
+        self.close()
 
 
-def display_final_summary(results, successful, failed):
-    """Display final summary"""
+def display_final_summary(totals, columns=None):
+    """Display final summary from the running totals (and columns) of a BatchSink"""
     print(f"\n{ColorText.BOLD}{ColorText.HEADER}📊 FINAL SUMMARY{ColorText.END}")
     print("═" * 60)
-    print(f"{ColorText.GREEN}✅ Successful:{ColorText.END} {successful}")
-    print(f"{ColorText.RED}❌ Failed:{ColorText.END} {failed}")
-    print(f"{ColorText.CYAN}📄 Total:{ColorText.END} {len(results)}")
-
-    if successful > 0:
-        # Calculate aggregate stats
-        total_links = sum(r['analytics']['links'] for r in results if r['status'] == 'success')
-        total_images = sum(r['analytics']['images'] for r in results if r['status'] == 'success')
-        total_words = sum(r['analytics']['word_count'] for r in results if r['status'] == 'success')
+    print(f"{ColorText.GREEN}✅ Successful:{ColorText.END} {totals['successful']}")
+    print(f"{ColorText.RED}❌ Failed:{ColorText.END} {totals['failed']}")
+    print(f"{ColorText.CYAN}📄 Total:{ColorText.END} {totals['total']}")
 
+    if totals['successful'] > 0:
         print(f"\n{ColorText.YELLOW}Aggregate Statistics:{ColorText.END}")
-        print(f"  🔗 Total Links: {total_links:,}")
-        print(f"  🖼️  Total Images: {total_images:,}")
-        print(f"  💬 Total Words: {total_words:,}")
+        print(f"  🔗 Total Links: {totals['links']:,}")
+        print(f"  🖼️  Total Images: {totals['images']:,}")
+        print(f"  💬 Total Words: {totals['words']:,}")
 
     print("═" * 60)
 
+    if columns is not None and totals['successful'] > 0:
+        display_statistics(columns)
+
 
 def main():
     """Main function"""
     print_banner()
 
-    # Allow custom file via command line argument
-    filename = 'urls.txt'
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Scrape every URL listed in a file")
+    parser.add_argument('filename', nargs='?', default='urls.txt',
+                        help="file with one URL per line (default: urls.txt)")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="number of fetches in flight (default: 8)")
+    parser.add_argument('--delay', type=float, default=1,
+                        help="seconds between requests to the same host (default: 1)")
+    parser.add_argument('--per-host', type=int, default=2,
+                        help="max requests in flight per host (default: 2)")
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RESULTS_JSONL',
+                        help="continue an earlier run, skipping URLs already done "
+                             "(default: the newest batch_results_*.jsonl)")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="with --resume, fetch URLs that failed last time again")
+    parser.add_argument('--checkpoint-every', type=int, default=100,
+                        help="write results to disk every N URLs (default: 100)")
+    parser.add_argument('--checkpoint-seconds', type=float, default=30,
+                        help="... or every this many seconds (default: 30)")
+    parser.add_argument('--pool-size', type=int, default=4,
+                        help="keep-alive connections kept per host (default: 4)")
+    parser.add_argument('--idle-timeout', type=float, default=30,
+                        help="seconds before an idle connection is closed (default: 30)")
+    parser.add_argument('--max-body-mb', type=float, default=50,
+                        help="skip pages larger than this many MB (default: 50)")
+    parser.add_argument('--stream-threshold-mb', type=float, default=STREAM_THRESHOLD / 2**20,
+                        help="analyze pages bigger than this while they stream in, "
+                             "without a parse tree (default: 5)")
+    parser.add_argument('--cache', action='store_true',
+                        help="keep responses in the on-disk cache and revalidate them next run "
+                             "(also SCRAPER_CACHE=on)")
+    parser.add_argument('--parser', dest='html_parser', choices=available_backends(),
+                        help="force a BeautifulSoup backend")
+    parser.add_argument('--report', action='store_true',
+                        help="write a paginated HTML report of the run when it is done")
+    parser.add_argument('--report-per-page', type=int, default=500,
+                        help="results per report page (default: 500)")
+    args = parser.parse_args()
+
+    if args.html_parser:
+        set_parser(args.html_parser)
+    configure_client(pool_size=args.pool_size, idle_timeout=args.idle_timeout,
+                     max_body_bytes=int(args.max_body_mb * 1024 * 1024),
+                     cache=cache_from_environment(enabled=args.cache))
+    print(f"{ColorText.CYAN}🧩 HTML parser: {pick_parser()}{ColorText.END}")
+
+    filename = args.filename
 
     print(f"\n{ColorText.CYAN}📋 Reading URLs from: {filename}{ColorText.END}")
 
@@ -254,6 +548,27 @@ def main():
         return
 
     print(f"{ColorText.GREEN}✓ Found {len(urls)} URL(s) to scrape{ColorText.END}")
+
+    # Resume: skip what the earlier run already finished
+    resume_from = None
+    previous = {}
+    if args.resume:
+        resume_from = find_latest_results() if args.resume == 'latest' else args.resume
+        if not resume_from or not os.path.exists(resume_from):
+            print(f"{ColorText.RED}❌ No previous results to resume from!{ColorText.END}")
+            return
+
+        previous = load_previous_results(resume_from)
+        skip = {url for url, result in previous.items()
+                if result['status'] == 'success' or not args.retry_failed}
+        urls = [url for url in urls if url not in skip]
+
+        print(f"{ColorText.CYAN}↩️  Resuming {resume_from}: {len(previous)} URL(s) done before, "
+              f"{len(urls)} left{ColorText.END}")
+        if not urls:
+            print(f"{ColorText.GREEN}Nothing left to scrape!{ColorText.END}")
+            return
+
     print(f"\n{ColorText.YELLOW}URLs to scrape:{ColorText.END}")
     for i, url in enumerate(urls, 1):
         print(f"  {i}. {url}")
@@ -265,13 +580,21 @@ def main():
         print(f"{ColorText.YELLOW}Cancelled!{ColorText.END}")
         return
 
-    # Scrape all URLs
-    results, successful, failed = scrape_urls(urls, delay=1)
+    # Scrape all URLs, saving each result as soon as it is done
+    with BatchSink(checkpoint_every=args.checkpoint_every,
+                   checkpoint_seconds=args.checkpoint_seconds,
+                   resume_from=resume_from, previous=previous) as sink:
+        totals = scrape_urls(urls, sink, delay=args.delay,
+                             workers=args.workers, per_host=args.per_host,
+                             stream_threshold=int(args.stream_threshold_mb * 2**20))
+
+    display_final_summary(totals, sink.columns() if numpy_available() else None)
+
+    print(f"\n{ColorText.CYAN}🔌 Connections: {get_client().describe_stats()}{ColorText.END}")
 
-    # Save results
-    if results:
-        save_batch_results(results)
-        display_final_summary(results, successful, failed)
+    if args.report:
+        index, _ = write_batch_report(sink.results_file, per_page=args.report_per_page)
+        print(f"{ColorText.GREEN}📄 HTML report saved: {index}{ColorText.END}")
 
     print(f"\n{ColorText.BOLD}{ColorText.GREEN}✨ Batch scraping complete! ✨{ColorText.END}\n")
 
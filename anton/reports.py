@@ -0,0 +1,324 @@
+# 📄 Report Engine - HTML reports written straight to disk
+# Templates are parsed once when this module is imported; rendering writes
+# their pieces to the output file as it goes, so no report is ever built up
+# in memory. All reports link one shared report.css instead of embedding it.
+#
+# Batch mode turns a whole batch_scraper run into a paginated report:
+#   python3 anton/reports.py batch_results_20240101_120000.jsonl --per-page 500
+
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+from html import escape
+from string import Formatter
+
+CSS_FILE = 'report.css'
+CSS_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), CSS_FILE)
+BUFFER_SIZE = 256 * 1024
+
+
+class ColorText:
+    """Terminal colors"""
+    HEADER = '\033[95m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+
+class Template:
+    """
+    A str.format-style template split into literal text and fields once.
+    Values are HTML-escaped; {name!s} inserts a value as it is (markup).
+
+        ROW = Template('<li>{text}</li>\\n')
+        ROW.render(f, text='a < b')
+    """
+
+    def __init__(self, text):
+        self.pieces = [(literal, field, spec, conversion)
+                       for literal, field, spec, conversion in Formatter().parse(text)]
+
+    def render(self, out, **values):
+        write = out.write
+        for literal, field, spec, conversion in self.pieces:
+            if literal:
+                write(literal)
+            if field is None:
+                continue
+            value = values[field]
+            text = format(value, spec) if spec else str(value)
+            write(text if conversion == 's' else escape(text))
+
+
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="{css}">
+</head>
+<body>
+    <div class="container">
+        <h1>{heading}</h1>
+""")
+
+PAGE_FOOT = Template("""
+        <footer>
+            <p>Generated by <strong>Mega Web Scraper 9000</strong> 🚀</p>
+        </footer>
+    </div>
+</body>
+</html>
+""")
+
+METADATA = Template("""
+        <div class="metadata">
+            <p><strong>URL:</strong> <a href="{url}" target="_blank">{url}</a></p>
+            <p><strong>Scraped on:</strong> {scraped_on}</p>
+            <p><strong>Page Title:</strong> {title}</p>
+        </div>
+""")
+
+STATS_START = Template("""
+        <h2>{heading}</h2>
+        <div class="stats">
+""")
+
+STAT_CARD = Template("""            <div class="stat-card">
+                <div class="stat-number">{emoji} {value:,}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+""")
+
+STATS_END = Template("""        </div>
+""")
+
+SECTION_START = Template("""
+        <h2>{heading}</h2>
+        <ul{css_class!s}>
+""")
+
+SECTION_END = Template("""        </ul>
+""")
+
+HEADING_ITEM = Template("""            <li><strong>{level}:</strong> {text}</li>
+""")
+
+LINK_ITEM = Template("""            <li><a href="{href}" target="_blank">{text}</a></li>
+""")
+
+PAGER = Template("""
+        <div class="pager"><span>{previous!s}</span><span>Page {page:,} of {pages:,}</span><span>{next!s}</span></div>
+""")
+
+TABLE_START = Template("""
+        <table class="results">
+            <tr><th>#</th><th>URL</th><th>Title</th><th>Links</th><th>Images</th><th>Words</th></tr>
+""")
+
+RESULT_ROW = Template("""            <tr><td class="number">{number:,}</td><td><a href="{url}" target="_blank">{url}</a></td><td>{title}</td><td class="number">{links:,}</td><td class="number">{images:,}</td><td class="number">{words:,}</td></tr>
+""")
+
+FAILED_ROW = Template("""            <tr class="failed"><td class="number">{number:,}</td><td><a href="{url}" target="_blank">{url}</a></td><td colspan="4">❌ {error}</td></tr>
+""")
+
+TABLE_END = Template("""        </table>
+""")
+
+PAGE_ITEM = Template("""            <li><a href="{href}">Page {page:,}</a> — {first} … {last}</li>
+""")
+
+
+def install_css(directory):
+    """Put report.css next to the reports (once, or again when it changed)"""
+    target = os.path.join(directory or '.', CSS_FILE)
+    if not os.path.exists(target) or os.path.getsize(target) != os.path.getsize(CSS_SOURCE):
+        shutil.copyfile(CSS_SOURCE, target)
+    return target
+
+
+def open_report(filename):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    install_css(directory)
+    return open(filename, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+
+
+def write_stat_cards(f, heading, cards):
+    STATS_START.render(f, heading=heading)
+    for emoji, value, label in cards:
+        STAT_CARD.render(f, emoji=emoji, value=value, label=label)
+    STATS_END.render(f)
+
+
+def write_page_report(filename, url, analytics, headings, links):
+    """
+    Report for one scraped page.
+        headings  - iterable of (level, text), e.g. ('H2', 'Intro')
+        links     - iterable of (href, text)
+    """
+    with open_report(filename) as f:
+        PAGE_HEAD.render(f, title=f"Web Scraping Report - {analytics['title']}",
+                         css=CSS_FILE, heading="🌐 Web Scraping Report")
+        METADATA.render(f, url=url, title=analytics['title'],
+                        scraped_on=datetime.now().strftime("%B %d, %Y at %I:%M %p"))
+        write_stat_cards(f, "📊 Quick Statistics", [
+            ('🔗', analytics['links'], 'Links'),
+            ('🖼️', analytics['images'], 'Images'),
+            ('📝', analytics['paragraphs'], 'Paragraphs'),
+            ('💬', analytics['word_count'], 'Words'),
+        ])
+
+        SECTION_START.render(f, heading="📰 Headings Found", css_class='')
+        for level, text in headings:
+            HEADING_ITEM.render(f, level=level, text=text)
+        SECTION_END.render(f)
+
+        SECTION_START.render(f, heading="🔗 Top Links", css_class=' class="link-list"')
+        for href, text in links:
+            LINK_ITEM.render(f, href=href, text=text)
+        SECTION_END.render(f)
+
+        PAGE_FOOT.render(f)
+    return filename
+
+
+def latest_results(results_file):
+    """Byte offset of the last line of every URL (a retried URL appears twice)"""
+    last = {}
+    with open(results_file, 'rb') as f:
+        offset = 0
+        for line in f:
+            try:
+                last[json.loads(line)['url']] = offset
+            except (ValueError, KeyError):
+                pass  # torn last line
+            offset += len(line)
+    return last
+
+
+def iter_results(results_file, last=None):
+    """Each URL's final result, in file order, one at a time"""
+    last = last if last is not None else latest_results(results_file)
+    with open(results_file, 'rb') as f:
+        offset = 0
+        for line in f:
+            here, offset = offset, offset + len(line)
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # torn last line
+            if last.get(result.get('url')) == here:
+                yield result
+
+
+def page_name(number):
+    return f"page_{number:04d}.html"
+
+
+def write_batch_report(results_file, output_dir=None, per_page=500):
+    """
+    Paginated report of a batch_results_*.jsonl file: index.html with the
+    totals plus page_0001.html, ... with `per_page` results each. Results
+    are streamed from the file, never all in memory at once.
+    """
+    base = os.path.basename(results_file)
+    if output_dir is None:
+        stem = base[:-len('.jsonl')] if base.endswith('.jsonl') else base
+        output_dir = 'report_' + stem.replace('batch_results_', 'batch_', 1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    last = latest_results(results_file)
+    total_urls = len(last)
+    pages = max((total_urls + per_page - 1) // per_page, 1)
+    totals = {'total': 0, 'successful': 0, 'failed': 0, 'links': 0, 'images': 0, 'words': 0}
+    page_index = []  # (page, first url, last url): a few hundred entries for 50k URLs
+
+    f = None
+    page = 0
+    first_url = last_url = None
+
+    def close_page():
+        TABLE_END.render(f)
+        write_pager(f, page, pages)
+        PAGE_FOOT.render(f)
+        f.close()
+        page_index.append((page, first_url, last_url))
+
+    for number, result in enumerate(iter_results(results_file, last), 1):
+        if (number - 1) % per_page == 0:
+            if f is not None:
+                close_page()
+            page += 1
+            f = open_report(os.path.join(output_dir, page_name(page)))
+            PAGE_HEAD.render(f, title=f"Batch Report - {base} - page {page}", css=CSS_FILE,
+                             heading=f"📚 Batch Report: page {page:,} of {pages:,}")
+            write_pager(f, page, pages)
+            TABLE_START.render(f)
+            first_url = result['url']
+        last_url = result['url']
+
+        totals['total'] += 1
+        if result.get('status') == 'success':
+            analytics = result['analytics']
+            totals['successful'] += 1
+            totals['links'] += analytics['links']
+            totals['images'] += analytics['images']
+            totals['words'] += analytics['word_count']
+            RESULT_ROW.render(f, number=number, url=result['url'], title=analytics['title'],
+                              links=analytics['links'], images=analytics['images'],
+                              words=analytics['word_count'])
+        else:
+            totals['failed'] += 1
+            FAILED_ROW.render(f, number=number, url=result['url'],
+                              error=result.get('error') or 'Failed')
+    if f is not None:
+        close_page()
+
+    with open_report(os.path.join(output_dir, 'index.html')) as index:
+        PAGE_HEAD.render(index, title=f"Batch Report - {base}", css=CSS_FILE,
+                         heading="📚 Batch Scraping Report")
+        write_stat_cards(index, f"📊 {base}", [
+            ('📄', totals['total'], 'URLs'),
+            ('✅', totals['successful'], 'Successful'),
+            ('❌', totals['failed'], 'Failed'),
+            ('🔗', totals['links'], 'Links'),
+            ('🖼️', totals['images'], 'Images'),
+            ('💬', totals['words'], 'Words'),
+        ])
+        SECTION_START.render(index, heading="📑 Pages", css_class=' class="link-list"')
+        for number, first, last in page_index:
+            PAGE_ITEM.render(index, href=page_name(number), page=number, first=first, last=last)
+        SECTION_END.render(index)
+        PAGE_FOOT.render(index)
+
+    return os.path.join(output_dir, 'index.html'), totals
+
+
+def write_pager(f, page, pages):
+    previous = f'<a href="{page_name(page - 1)}">← Previous</a>' if page > 1 else '<a href="index.html">↑ Index</a>'
+    following = f'<a href="{page_name(page + 1)}">Next →</a>' if page < pages else '<a href="index.html">↑ Index</a>'
+    PAGER.render(f, previous=previous, next=following, page=page, pages=pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paginated HTML report of a batch_scraper run")
+    parser.add_argument('results', help="batch_results_*.jsonl file")
+    parser.add_argument('--per-page', type=int, default=500, help="results per page (default: 500)")
+    parser.add_argument('--output-dir', help="default: report_batch_<timestamp>/")
+    args = parser.parse_args()
+
+    index, totals = write_batch_report(args.results, args.output_dir, args.per_page)
+    print(f"{ColorText.GREEN}📄 Batch report for {totals['total']:,} URLs saved: {index}{ColorText.END}")
+
+
+if __name__ == "__main__":
+    main()
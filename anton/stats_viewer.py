@@ -3,8 +3,17 @@
 
 import json
 import os
+import sys
 from datetime import datetime
 
+# Sibling modules (aggregate_stats, analytics_index) also resolve when imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from aggregate_stats import columns_from_rows, display_statistics, numpy_available
+from analytics_index import AnalyticsIndex
+
+# The summary lists only this many files by name; the statistics cover all
+SUMMARY_LISTING = 50
+
 
 class ColorText:
     """Terminal colors"""
@@ -29,14 +38,32 @@ def print_banner():
 {ColorText.END}""")
 
 
+_index = None
+
+
+def get_index():
+    """The SQLite index of the analytics files (opened on first use)"""
+    global _index
+    if _index is None:
+        _index = AnalyticsIndex()
+    return _index
+
+
 def find_analytics_files():
-    """Find all analytics JSON files"""
-    files = [f for f in os.listdir('.') if f.startswith('analytics_') and f.endswith('.json')]
-    return sorted(files, reverse=True)
+    """Find all analytics JSON files (only new or changed ones are read)"""
+    index = get_index()
+    _, _, errors = index.refresh()
+    for filename, e in errors:
+        print(f"{ColorText.RED}Error loading {filename}: {e}{ColorText.END}")
+    return index.filenames()
 
 
 def load_analytics(filename):
-    """Load analytics from JSON file"""
+    """Load analytics from the index, falling back to the JSON file"""
+    data = get_index().load(filename)
+    if data is not None:
+        return data
+
     try:
         with open(filename, 'r') as f:
             return json.load(f)
@@ -138,31 +165,33 @@ def generate_summary():
     print(f"\n{ColorText.BOLD}{ColorText.BLUE}📈 SUMMARY OF ALL SCRAPED PAGES{ColorText.END}")
     print("═" * 70)
 
-    total_links = 0
-    total_images = 0
-    total_words = 0
-
-    for filename in files:
-        data = load_analytics(filename)
-        if data:
-            total_links += data.get('links', 0)
-            total_images += data.get('images', 0)
-            total_words += data.get('word_count', 0)
+    index = get_index()
+    for filename, url, title, links, images in index.summary_rows(SUMMARY_LISTING):
+        url = url if url is not None else 'Unknown'
+        title = title if title is not None else 'No title'
+        print(f"\n{ColorText.CYAN}{filename}{ColorText.END}")
+        print(f"  URL: {url[:60]}")
+        print(f"  Title: {title[:60]}")
+        print(f"  Links: {links}, Images: {images}")
+    if len(files) > SUMMARY_LISTING:
+        print(f"\n  ... and {len(files) - SUMMARY_LISTING:,} older file(s)")
 
-            print(f"\n{ColorText.CYAN}{filename}{ColorText.END}")
-            print(f"  URL: {data.get('url', 'Unknown')[:60]}")
-            print(f"  Title: {data.get('title', 'No title')[:60]}")
-            print(f"  Links: {data.get('links', 0)}, Images: {data.get('images', 0)}")
+    totals = index.totals()
 
     print("\n" + "═" * 70)
     print(f"{ColorText.BOLD}{ColorText.GREEN}TOTALS:{ColorText.END}")
     print(f"  📄 Pages scraped: {len(files)}")
-    print(f"  🔗 Total links found: {total_links:,}")
-    print(f"  🖼️  Total images found: {total_images:,}")
-    if total_words > 0:
-        print(f"  💬 Total words analyzed: {total_words:,}")
+    print(f"  🔗 Total links found: {totals['links']:,}")
+    print(f"  🖼️  Total images found: {totals['images']:,}")
+    if totals['words'] > 0:
+        print(f"  💬 Total words analyzed: {totals['words']:,}")
     print("═" * 70)
 
+    if numpy_available():
+        display_statistics(columns_from_rows(index.stat_rows()))
+    else:
+        print(f"{ColorText.YELLOW}Install numpy for means, percentiles and per-host statistics{ColorText.END}")
+
 
 def main():
     """Main function"""
@@ -187,6 +216,9 @@ def main():
 
         choice = input(f"\n{ColorText.BOLD}Choose option: {ColorText.END}").strip()
 
+        # Cheap now: only files that changed since the last look are parsed
+        files = find_analytics_files()
+
         if choice == '1':
             print(f"\n{ColorText.CYAN}Available files:{ColorText.END}")
             for i, f in enumerate(files, 1):
@@ -228,8 +260,9 @@ def main():
 
         elif choice == '4':
             print(f"\n{ColorText.CYAN}All analytics files:{ColorText.END}")
+            sizes = get_index().sizes()
             for i, f in enumerate(files, 1):
-                size = os.path.getsize(f)
+                size = sizes[f]
                 print(f"  {ColorText.GREEN}{i:2d}.{ColorText.END} {f} ({size:,} bytes)")
 
         elif choice == '0':
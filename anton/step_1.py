@@ -1,11 +1,17 @@
 # Enhanced Web Scraper with Beautiful Output and Cool Features! 🚀
 # This program fetches web pages and extracts useful information in style.
 
-from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
-from bs4 import BeautifulSoup
 from datetime import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.analytics import take_census
+from common.capture_store import CaptureStore
+from common.http_client import get_client
+from common.parsers import make_soup, take_parser_option
 
 
 class ColorText:
@@ -43,10 +49,8 @@ def fetch_page(url):
 
         # Add a user agent to avoid being blocked
         headers = {'User-Agent': 'Mozilla/5.0 (Web Scraper 3000)'}
-        req = Request(url, headers=headers)
-
-        page = urlopen(req, timeout=10)
-        html = page.read().decode("utf-8")
+        # Shared keep-alive client: streamed with a size limit, decoded with the page's own charset
+        html = get_client().get_text(url, headers=headers)
 
         print(f"{ColorText.GREEN}✅ Success! Fetched {len(html)} bytes{ColorText.END}\n")
         return html
@@ -67,16 +71,20 @@ def analyze_page(html):
     Parse HTML and extract interesting information.
     Returns a BeautifulSoup object and analytics.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html)
+
+    # Count everything in one pass; this scraper keeps scripts in the soup
+    census = take_census(soup, skip=())
+    tags = census['tags']
 
     # Gather analytics
     analytics = {
-        'title': soup.title.string if soup.title else 'No title',
-        'links': len(soup.find_all('a')),
-        'images': len(soup.find_all('img')),
-        'headings': len(soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])),
-        'paragraphs': len(soup.find_all('p')),
-        'total_text_length': len(soup.get_text())
+        'title': census['title'],
+        'links': tags['a'],
+        'images': tags['img'],
+        'headings': sum(tags[h] for h in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')),
+        'paragraphs': tags['p'],
+        'total_text_length': len(census['text'])
     }
 
     return soup, analytics
@@ -132,27 +140,28 @@ def save_to_file(html, url):
     """Save HTML and analytics to files"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    # Save HTML
-    html_filename = f"scraped_page_{timestamp}.html"
-    with open(html_filename, 'w', encoding='utf-8') as f:
-        f.write(html)
+    # Save HTML into the compressed, deduplicated capture store
+    store = CaptureStore()
+    digest = store.save(url, html, timestamp)
 
     # Save analytics as JSON
     soup, analytics = analyze_page(html)
     analytics['url'] = url
     analytics['timestamp'] = timestamp
+    analytics['html_sha256'] = digest
 
     json_filename = f"analytics_{timestamp}.json"
     with open(json_filename, 'w', encoding='utf-8') as f:
         json.dump(analytics, f, indent=2)
 
     print(f"{ColorText.GREEN}💾 Saved:{ColorText.END}")
-    print(f"   HTML: {html_filename}")
+    print(f"   HTML: {store.directory}/ (sha256 {digest[:12]}…)")
     print(f"   Analytics: {json_filename}\n")
 
 
 def main():
     """Main program function"""
+    take_parser_option(sys.argv)
     print_banner()
 
     # The URL to scrape
@@ -1,15 +1,28 @@
 # MEGA WEB SCRAPER 9000 - Interactive Edition! 🚀✨
 # Enhanced with interactive menu, multi-URL support, and HTML reports!
 
-from urllib.request import urlopen, Request, urlretrieve
 from urllib.error import URLError, HTTPError
-from bs4 import BeautifulSoup
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 import json
 import os
+import re
+import sys
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Sibling modules (aggregate_stats, reports, ...) also resolve when imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.analytics import take_census, normalized_text_stats
+from common.cache import cache_from_environment
+from common.capture_store import DEFAULT_DIR as CAPTURE_DIR, CaptureStore
+from common.http_client import configure_client, get_client
+from common.images import download_images as fetch_images, probe_images
+from common.parsers import make_soup, pick_parser, take_parser_option
+from common.search import TermMatcher, parse_query
+
+from reports import write_page_report
+
 
 class ColorText:
     """Add cool colors to terminal output"""
@@ -58,10 +71,8 @@ def fetch_page(url):
         print(f"{ColorText.YELLOW}⏳ Fetching: {ColorText.CYAN}{url}{ColorText.END}")
 
         headers = {'User-Agent': 'Mozilla/5.0 (Mega Scraper 9000)'}
-        req = Request(url, headers=headers)
-
-        page = urlopen(req, timeout=10)
-        html = page.read().decode("utf-8")
+        # Shared keep-alive client: streamed with a size limit, decoded with the page's own charset
+        html = get_client().get_text(url, headers=headers)
 
         print(f"{ColorText.GREEN}✅ Success! Fetched {len(html):,} bytes{ColorText.END}")
         return html
@@ -79,37 +90,32 @@ def fetch_page(url):
 
 def analyze_page(html):
     """Parse HTML and extract comprehensive analytics"""
-    soup = BeautifulSoup(html, 'html.parser')
-
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
+    soup = make_soup(html)
 
-    # Get text
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = '\n'.join(chunk for chunk in chunks if chunk)
+    # One pass over the tree; script and style elements are removed
+    census = take_census(soup)
+    tags = census['tags']
+    text_length, word_count = normalized_text_stats(census['text'])
 
     # Gather comprehensive analytics
     analytics = {
-        'title': soup.title.string if soup.title else 'No title',
-        'links': len(soup.find_all('a')),
-        'images': len(soup.find_all('img')),
+        'title': census['title'],
+        'links': tags['a'],
+        'images': tags['img'],
         'headings': {
-            'h1': len(soup.find_all('h1')),
-            'h2': len(soup.find_all('h2')),
-            'h3': len(soup.find_all('h3')),
-            'h4': len(soup.find_all('h4')),
-            'h5': len(soup.find_all('h5')),
-            'h6': len(soup.find_all('h6'))
+            'h1': tags['h1'],
+            'h2': tags['h2'],
+            'h3': tags['h3'],
+            'h4': tags['h4'],
+            'h5': tags['h5'],
+            'h6': tags['h6']
         },
-        'paragraphs': len(soup.find_all('p')),
-        'forms': len(soup.find_all('form')),
-        'tables': len(soup.find_all('table')),
-        'lists': len(soup.find_all(['ul', 'ol'])),
-        'total_text_length': len(text),
-        'word_count': len(text.split())
+        'paragraphs': tags['p'],
+        'forms': tags['form'],
+        'tables': tags['table'],
+        'lists': tags['ul'] + tags['ol'],
+        'total_text_length': text_length,
+        'word_count': word_count
     }
 
     return soup, analytics
@@ -171,197 +177,115 @@ def extract_images(soup, base_url):
     return image_data
 
 
-def download_images(image_data, output_dir="downloaded_images"):
-    """Download all images to a directory"""
+def download_images(image_data, output_dir="downloaded_images", workers=8,
+                    max_file_mb=None, max_total_mb=None):
+    """Download all images to a directory (concurrently, identical images kept once)"""
     if not image_data:
         print(f"{ColorText.YELLOW}No images to download{ColorText.END}")
         return
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    urls = [img['url'] for img in image_data]
+    print(f"\n{ColorText.YELLOW}📥 Downloading {len(set(urls))} images with {workers} workers...{ColorText.END}")
+
+    def progress(result):
+        if result['status'] == 'saved':
+            print(f"{ColorText.GREEN}✓{ColorText.END} Downloaded: {result['file']} ({result['bytes']:,} bytes)")
+        elif result['status'] == 'duplicate':
+            print(f"{ColorText.CYAN}={ColorText.END} Duplicate of {result['file']}: {result['url'][:60]}")
+        elif result['status'] == 'skipped':
+            print(f"{ColorText.YELLOW}-{ColorText.END} Skipped ({result['reason']}): {result['url'][:60]}")
+        else:
+            print(f"{ColorText.RED}✗{ColorText.END} Failed to download {result['url'][:60]}: {result['reason']}")
+
+    results = fetch_images(urls, output_dir, workers=workers,
+                           max_file_bytes=max_file_mb and int(max_file_mb * 1024 * 1024),
+                           max_total_bytes=max_total_mb and int(max_total_mb * 1024 * 1024),
+                           progress=progress)
 
-    print(f"\n{ColorText.YELLOW}📥 Downloading {len(image_data)} images...{ColorText.END}")
+    saved = [r for r in results if r['status'] == 'saved']
+    duplicates = sum(1 for r in results if r['status'] == 'duplicate')
+    print(f"{ColorText.GREEN}✅ Download complete! {len(saved)} saved "
+          f"({sum(r['bytes'] for r in saved):,} bytes), {duplicates} duplicate(s) not kept{ColorText.END}")
+    return results
 
+
+def probe_image_data(image_data, workers=8):
+    """Add content type, size and dimensions to each image, reading only its first bytes"""
+    print(f"\n{ColorText.YELLOW}🔎 Probing {len(image_data)} images...{ColorText.END}")
+    probes = {info['url']: info for info in probe_images([img['url'] for img in image_data], workers=workers)}
+
+    transferred = 0
     for i, img in enumerate(image_data, 1):
-        try:
-            filename = os.path.join(output_dir, f"image_{i:03d}.{img['url'].split('.')[-1][:4]}")
-            urlretrieve(img['url'], filename)
-            print(f"{ColorText.GREEN}✓{ColorText.END} Downloaded: {filename}")
-        except Exception as e:
-            print(f"{ColorText.RED}✗{ColorText.END} Failed to download image {i}: {e}")
+        info = probes[img['url']]
+        img.update(info)
+        transferred += info['transferred']
+        if info['error']:
+            print(f"{ColorText.RED}{i:3d}. ✗ {info['error']}{ColorText.END}")
+            continue
+        size = f"{info['bytes']:,} bytes" if info['bytes'] is not None else "size unknown"
+        dims = f"{info['width']}×{info['height']}" if info['width'] else "?×?"
+        print(f"{ColorText.GREEN}{i:3d}.{ColorText.END} {dims:>11} {size:>16}  "
+              f"{info['content_type'] or '?':<14} {img['url'][-40:]}")
+
+    total = sum(img['bytes'] or 0 for img in image_data)
+    print(f"{ColorText.CYAN}Read {transferred:,} bytes to describe {total:,} bytes of images{ColorText.END}")
+    return image_data
+
+
+def filter_images(image_data):
+    """Keep the probed images that pass a minimum size and a maximum byte size"""
+    try:
+        min_side = int(input(f"{ColorText.CYAN}Minimum width/height in px (Enter for any): {ColorText.END}") or 0)
+        max_kb = float(input(f"{ColorText.CYAN}Maximum size in KB (Enter for any): {ColorText.END}") or 0)
+    except ValueError:
+        print(f"{ColorText.RED}Not a number, keeping all images{ColorText.END}")
+        return image_data
 
-    print(f"{ColorText.GREEN}✅ Download complete!{ColorText.END}")
+    kept = [img for img in image_data
+            if not img.get('error')
+            and (not min_side or min(img['width'] or 0, img['height'] or 0) >= min_side)
+            and (not max_kb or (img['bytes'] or 0) <= max_kb * 1024)]
+    print(f"{ColorText.GREEN}{len(kept)} of {len(image_data)} images kept{ColorText.END}")
+    return kept
 
 
 def search_text(soup, query):
-    """Search for specific text in the page"""
-    text = soup.get_text()
-    count = text.lower().count(query.lower())
+    """
+    Search the page for one or many terms at once.
+    `query` is a comma-separated list; /pattern/ is a regex, @file reads terms from a file.
+    """
+    try:
+        terms, regexes = parse_query(query)
+        matcher = TermMatcher(terms, regexes)
+    except re.error as e:
+        print(f"{ColorText.RED}❌ Invalid regex: {e}{ColorText.END}")
+        return None
+    except OSError as e:
+        print(f"{ColorText.RED}❌ Cannot read term file: {e}{ColorText.END}")
+        return None
+    results = matcher.search(soup)
 
-    print(f"\n{ColorText.BOLD}{ColorText.BLUE}🔍 SEARCH RESULTS for '{query}':{ColorText.END}")
+    print(f"\n{ColorText.BOLD}{ColorText.BLUE}🔍 SEARCH RESULTS for {len(results)} term(s):{ColorText.END}")
     print("─" * 60)
-    print(f"{ColorText.GREEN}Found {count} occurrence(s){ColorText.END}")
 
-    if count > 0:
-        # Find elements containing the text
-        elements = soup.find_all(string=lambda text: text and query.lower() in text.lower())
-        print(f"\n{ColorText.CYAN}First 5 matches:{ColorText.END}")
-        for i, elem in enumerate(elements[:5], 1):
-            print(f"{ColorText.YELLOW}{i}.{ColorText.END} {elem.strip()[:80]}...")
+    for term, found in sorted(results.items(), key=lambda item: -item[1]['count']):
+        print(f"\n{ColorText.GREEN}'{term}': found {found['count']} occurrence(s){ColorText.END}")
+        if found['count'] > 0 and len(results) <= 20:
+            print(f"{ColorText.CYAN}First {len(found['matches'])} matches:{ColorText.END}")
+            for i, match in enumerate(found['matches'], 1):
+                print(f"{ColorText.YELLOW}{i}.{ColorText.END} <{match['tag']}> {match['context']}")
+
+    return results
 
 
 def generate_html_report(url, soup, analytics, timestamp):
-    """Generate a beautiful HTML report"""
+    """Generate a beautiful HTML report (styles come from the shared report.css)"""
     filename = f"report_{timestamp}.html"
 
-    links = soup.find_all('a')[:20]
-    images = soup.find_all('img')[:10]
-    headings = soup.find_all(['h1', 'h2', 'h3'])
-
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Web Scraping Report - {analytics['title']}</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #333;
-        }}
-        .container {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-        }}
-        h1 {{
-            color: #667eea;
-            border-bottom: 3px solid #667eea;
-            padding-bottom: 10px;
-        }}
-        h2 {{
-            color: #764ba2;
-            margin-top: 30px;
-        }}
-        .stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin: 20px 0;
-        }}
-        .stat-card {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-        }}
-        .stat-number {{
-            font-size: 2em;
-            font-weight: bold;
-        }}
-        .stat-label {{
-            font-size: 0.9em;
-            opacity: 0.9;
-        }}
-        .link-list {{
-            list-style: none;
-            padding: 0;
-        }}
-        .link-list li {{
-            background: #f8f9fa;
-            margin: 10px 0;
-            padding: 15px;
-            border-radius: 5px;
-            border-left: 4px solid #667eea;
-        }}
-        .link-list a {{
-            color: #667eea;
-            text-decoration: none;
-            font-weight: bold;
-        }}
-        .link-list a:hover {{
-            text-decoration: underline;
-        }}
-        .metadata {{
-            background: #f8f9fa;
-            padding: 15px;
-            border-radius: 5px;
-            margin: 20px 0;
-        }}
-        .emoji {{
-            font-size: 1.2em;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🌐 Web Scraping Report</h1>
-        
-        <div class="metadata">
-            <p><strong>URL:</strong> <a href="{url}" target="_blank">{url}</a></p>
-            <p><strong>Scraped on:</strong> {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
-            <p><strong>Page Title:</strong> {analytics['title']}</p>
-        </div>
-        
-        <h2>📊 Quick Statistics</h2>
-        <div class="stats">
-            <div class="stat-card">
-                <div class="stat-number">🔗 {analytics['links']}</div>
-                <div class="stat-label">Links</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">🖼️ {analytics['images']}</div>
-                <div class="stat-label">Images</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">📝 {analytics['paragraphs']}</div>
-                <div class="stat-label">Paragraphs</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">💬 {analytics['word_count']:,}</div>
-                <div class="stat-label">Words</div>
-            </div>
-        </div>
-        
-        <h2>📰 Headings Found</h2>
-        <ul>
-"""
-
-    for heading in headings:
-        html_content += f"            <li><strong>{heading.name.upper()}:</strong> {heading.get_text(strip=True)}</li>\n"
-
-    html_content += """
-        </ul>
-        
-        <h2>🔗 Top Links</h2>
-        <ul class="link-list">
-"""
-
-    for link in links:
-        href = link.get('href', '#')
-        text = link.get_text(strip=True) or 'No text'
-        html_content += f'            <li><a href="{href}" target="_blank">{text[:100]}</a></li>\n'
-
-    html_content += """
-        </ul>
-        
-        <footer style="margin-top: 50px; text-align: center; color: #666; padding-top: 20px; border-top: 1px solid #ddd;">
-            <p>Generated by <strong>Mega Web Scraper 9000</strong> 🚀</p>
-        </footer>
-    </div>
-</body>
-</html>
-"""
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    headings = ((h.name.upper(), h.get_text(strip=True)) for h in soup.find_all(['h1', 'h2', 'h3']))
+    links = ((a.get('href', '#'), (a.get_text(strip=True) or 'No text')[:100])
+             for a in soup.find_all('a', limit=20))
+    write_page_report(filename, url, analytics, headings, links)
 
     print(f"\n{ColorText.GREEN}📄 HTML Report saved: {filename}{ColorText.END}")
     return filename
@@ -369,21 +293,21 @@ def generate_html_report(url, soup, analytics, timestamp):
 
 def save_data(html, url, analytics, timestamp):
     """Save scraped data to files"""
-    # Save HTML
-    html_filename = f"scraped_{timestamp}.html"
-    with open(html_filename, 'w', encoding='utf-8') as f:
-        f.write(html)
+    # Save HTML into the compressed, deduplicated capture store
+    store = CaptureStore()
+    digest = store.save(url, html, timestamp)
 
     # Save analytics as JSON
     analytics['url'] = url
     analytics['timestamp'] = timestamp
+    analytics['html_sha256'] = digest
 
     json_filename = f"analytics_{timestamp}.json"
     with open(json_filename, 'w', encoding='utf-8') as f:
         json.dump(analytics, f, indent=2)
 
     print(f"\n{ColorText.GREEN}💾 Data saved:{ColorText.END}")
-    print(f"   HTML: {html_filename}")
+    print(f"   HTML: {store.directory}/ (sha256 {digest[:12]}…)")
     print(f"   Analytics: {json_filename}")
 
 
@@ -462,11 +386,15 @@ def extract_images_mode():
     if not html:
         return
 
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html)
     image_data = extract_images(soup, url)
 
     if image_data:
-        download_choice = input(f"\n{ColorText.YELLOW}Download all images? (y/n): {ColorText.END}").strip().lower()
+        probe_choice = input(f"\n{ColorText.YELLOW}Probe sizes and dimensions first? (y/n): {ColorText.END}").strip().lower()
+        if probe_choice == 'y':
+            image_data = filter_images(probe_image_data(image_data))
+
+        download_choice = input(f"\n{ColorText.YELLOW}Download all {len(image_data)} images? (y/n): {ColorText.END}").strip().lower()
         if download_choice == 'y':
             download_images(image_data)
 
@@ -482,9 +410,10 @@ def search_mode():
     if not html:
         return
 
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html)
 
-    query = input(f"{ColorText.CYAN}Enter search term: {ColorText.END}").strip()
+    query = input(f"{ColorText.CYAN}Enter search term(s), comma-separated "
+                  f"(/regex/, @file for a list): {ColorText.END}").strip()
     search_text(soup, query)
 
 
@@ -502,10 +431,30 @@ def view_saved_files():
     else:
         print(f"{ColorText.YELLOW}No saved files found{ColorText.END}")
 
+    # Raw HTML pages are no longer scraped_*.html files but captures in the store
+    print(f"\n{ColorText.BOLD}{ColorText.BLUE}🗜️  HTML CAPTURES ({CAPTURE_DIR}/):{ColorText.END}")
+    store = CaptureStore() if os.path.isdir(CAPTURE_DIR) else None
+    captures = list(store.entries()) if store else []
+    if captures:
+        for i, entry in enumerate(captures, 1):
+            print(f"{ColorText.GREEN}{i:2d}.{ColorText.END} {entry['timestamp']} {entry['url']} "
+                  f"({entry['size']:,} bytes, sha256 {entry['sha256'][:12]}…)")
+        stats = store.stats()
+        print(f"{ColorText.CYAN}{stats['captures']} capture(s) in {stats['blobs']} blob(s), "
+              f"{stats['captured_bytes']:,} bytes stored as {stats['stored_bytes']:,} bytes{ColorText.END}")
+    else:
+        print(f"{ColorText.YELLOW}No HTML captures found{ColorText.END}")
+
 
 def main():
     """Main program with interactive menu"""
+    take_parser_option(sys.argv)
+
+    # Menu options often look at the same page again; reuse it for 10 minutes
+    configure_client(cache=cache_from_environment(default_ttl=600, enabled=True))
+
     print_banner()
+    print(f"{ColorText.CYAN}🧩 HTML parser: {pick_parser()}{ColorText.END}")
 
     while True:
         print_menu()
@@ -531,6 +480,7 @@ def main():
         elif choice == '6':
             view_saved_files()
         elif choice == '0':
+            print(f"\n{ColorText.CYAN}🔌 Connections: {get_client().describe_stats()}{ColorText.END}")
             print(f"\n{ColorText.CYAN}Thanks for using Mega Web Scraper 9000! 🚀{ColorText.END}\n")
             break
         else:
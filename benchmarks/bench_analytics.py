@@ -0,0 +1,105 @@
+# Benchmark: single-pass census vs. the old find_all-per-tag analyze_page.
+# Builds large synthetic pages, checks both give identical analytics and
+# prints the timings.
+#
+#   python3 benchmarks/bench_analytics.py [number_of_blocks ...]
+
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.analytics import take_census, normalized_text_stats
+
+
+def make_page(blocks):
+    """Build a page with `blocks` repetitions of a typical content block"""
+    block = """
+    <div class="entry">
+      <h2>Entry heading</h2>
+      <h3>Sub  heading</h3>
+      <p>Some   paragraph text with <a href="/x">a link</a> and <b>bold</b> words.
+         Second line  of the paragraph.</p>
+      <img src="/img.png" alt="picture">
+      <ul><li>one</li><li>two</li></ul>
+      <ol><li>three</li></ol>
+      <table><tr><td>cell</td><td>cell</td></tr></table>
+      <form><input name="q"></form>
+      <script>var x = "<p>not a tag</p>";</script>
+      <style>p { color: red; }</style>
+      <!-- a comment -->
+    </div>
+"""
+    return ("<html><head><title>Benchmark page</title></head><body><h1>Top</h1>"
+            + block * blocks + "</body></html>")
+
+
+def legacy_analyze(soup):
+    """analyze_page from anton/step_2.py before the census engine"""
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return {
+        'title': soup.title.string if soup.title else 'No title',
+        'links': len(soup.find_all('a')),
+        'images': len(soup.find_all('img')),
+        'headings': {h: len(soup.find_all(h)) for h in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')},
+        'paragraphs': len(soup.find_all('p')),
+        'forms': len(soup.find_all('form')),
+        'tables': len(soup.find_all('table')),
+        'lists': len(soup.find_all(['ul', 'ol'])),
+        'total_text_length': len(text),
+        'word_count': len(text.split())
+    }
+
+
+def census_analyze(soup):
+    """Same dict, built from one census walk"""
+    census = take_census(soup)
+    tags = census['tags']
+    text_length, word_count = normalized_text_stats(census['text'])
+    return {
+        'title': census['title'],
+        'links': tags['a'],
+        'images': tags['img'],
+        'headings': {h: tags[h] for h in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')},
+        'paragraphs': tags['p'],
+        'forms': tags['form'],
+        'tables': tags['table'],
+        'lists': tags['ul'] + tags['ol'],
+        'total_text_length': text_length,
+        'word_count': word_count
+    }
+
+
+def time_analysis(func, html):
+    """Time only the analysis part, not the parse that both versions share"""
+    soup = BeautifulSoup(html, 'html.parser')
+    start = time.perf_counter()
+    result = func(soup)
+    return time.perf_counter() - start, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 5000]
+
+    print(f"{'blocks':>8} {'size':>10} {'legacy':>10} {'census':>10} {'speedup':>8}")
+    for blocks in sizes:
+        html = make_page(blocks)
+        legacy_time, legacy = time_analysis(legacy_analyze, html)
+        census_time, census = time_analysis(census_analyze, html)
+        if legacy != census:
+            print(f"MISMATCH at {blocks} blocks:\n  legacy: {legacy}\n  census: {census}")
+            sys.exit(1)
+
+        print(f"{blocks:>8} {len(html):>10,} {legacy_time:>9.3f}s {census_time:>9.3f}s "
+              f"{legacy_time / census_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Benchmark: rule-file extraction (common/extract.py) vs. the hand-written
+# DOTALL regexes of andreas/step_2.py and christian/step_2.py on large
+# synthetic listing pages. The regex side is the scripts' code as it was,
+# BASE + link included; the synthetic links are relative, so urljoin in the
+# rules gives the same URLs. The rules, with and without their regex fast
+# path, must find the same records as the regexes on the clean pages,
+# otherwise the script exits 1.
+#
+# The tag-by-tag scan ("scan") runs at about 0.1-0.3x the speed of the
+# regexes (best of 3): a record costs some Python work (attributes, fields,
+# URL) where findall stays in C. That is why the rule files keep the old
+# patterns as a fast path: records() ("rules") uses them when their record
+# counts agree with the loose count patterns and only scans otherwise. It
+# still runs at about 0.3-0.5x the regexes: the counts and the entity and
+# whitespace clean-up the scan also does cost more than a strip(). The
+# other tables are why the scan is there: with shifted markup the lazy
+# regexes lose records, and once the class they look for is renamed they
+# backtrack over the rest of the page for every candidate, which grows
+# quadratically (qalamos) or worse (Perseus). The count check sends both
+# cases to the scan.
+#
+#   python3 benchmarks/bench_extract.py [number_of_entries ...]
+
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.extract import load_rules
+
+QALAMOS_BASE = "https://www.qalamos.net"
+PERSEUS_BASE = "https://www.perseus.tufts.edu/hopper/"
+
+# The regexes as they were in the step_2 scripts
+QALAMOS_PATTERN = re.compile(
+    r'<a href="(.*?)" class="link-manuscript[^"]*">\s*'
+    r'\[(.*?)\]\s*'
+    r'([^:]+):\s*'
+    r'(.*?)\s*'
+    r'\(([^()]+)\)\s*'
+    r'</a>',
+    re.DOTALL
+)
+PERSEUS_PATTERN = re.compile(r"<td class=\'tdAuthor\'.*?>\s*(.*?)\s*"
+                             r"<a href=\"(.*?)\" class=\"aResultsHeader\".*?>\s*(.*?)\s*</a>",
+                             re.DOTALL)
+
+NOISE = """
+  <!-- listing entry -->
+  <script>var hits = hits + 1; if (a < b) { x = "<a href='#'>"; }</script>
+  <a class="nav" href="/browse">Browse</a> <a class="nav" href="/help">Help</a>
+  <p>Some description text that is <em>not</em> part of any record.</p>
+"""
+
+
+def qalamos_page(entries, shifted=False):
+    rows = []
+    for i in range(entries):
+        extra = " (vol. 2)" if i % 5 == 0 else ""
+        if shifted and i % 2:
+            start = f'<a class="link-manuscript" href="/receive/DE1Book_manuscript_{i:08d}">'
+        else:
+            start = f'<a href="/receive/DE1Book_manuscript_{i:08d}" class="link-manuscript">'
+        author = "" if shifted and i % 50 == 2 else " (Tilimsānī, Sulaimān Ibn-ʿAlī at-)"
+        rows.append(f"""<li class="result">
+    {start}
+      [DE-SBB] Wetzstein II {i}: Dīwān {i}{extra}{author}
+    </a>
+  </li>{NOISE}""")
+    return "<html><head><title>Person</title></head><body><ul>" + "".join(rows) + "</ul></body></html>"
+
+
+def perseus_page(entries, shifted=False):
+    rows = []
+    for i in range(entries):
+        link = f'<a href="text?doc=Perseus:text:1999.01.{i:04d}" class="aResultsHeader">Work {i}</a>'
+        if shifted and i % 2:
+            link = f'<a class="aResultsHeader" href="text?doc=Perseus:text:1999.01.{i:04d}">Work {i}</a>'
+        rows.append(f"""<tr class="trResultsRow">
+    <td class='tdAuthor' valign="top">Author {i}
+      {link}
+    </td></tr>{NOISE}""")
+    return "<html><body><table>" + "".join(rows) + "</table></body></html>"
+
+
+def renamed(html, site):
+    """The same page after the site renamed the class of its record links"""
+    if site == 'qalamos':
+        return html.replace('class="link-manuscript"', 'class="manuscript-link"')
+    return html.replace('class="aResultsHeader"', 'class="aResultsTitle"')
+
+
+# The loops of the step_2 scripts, unchanged (they joined links with BASE + link)
+def qalamos_regex(html):
+    records = []
+    for link, library, code, title, author in QALAMOS_PATTERN.findall(html):
+        link = QALAMOS_BASE + link.strip()
+        library = library.strip()
+        code = code.strip()
+        title = re.sub(r'\s*\([^()]+\)\s*$', '', title.strip())
+        author = author.strip()
+        records.append((author, title, code, library, link))
+    return records
+
+
+def perseus_regex(html):
+    results = []
+    for author, link, title in PERSEUS_PATTERN.findall(html):
+        author = author.strip()
+        title = title.strip()
+        link = PERSEUS_BASE + link.strip()
+        results.append((author, title, link))
+    return results
+
+
+def qalamos_rules(extractor, html, regex=True):
+    return [(r['author'], r['title'], r['code'], r['library'], r['link'])
+            for _, r in extractor.records(html, regex=regex)]
+
+
+def perseus_rules(extractor, html, regex=True):
+    return [(r['author'], r['title'], r['link']) for _, r in extractor.records(html, regex=regex)]
+
+
+def timed(func, *args, repeat=1):
+    """(best time of `repeat` runs, result)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5000, 20000]
+    qalamos = load_rules(os.path.join(ROOT, 'andreas', 'qalamos_rules.json'))
+    perseus = load_rules(os.path.join(ROOT, 'christian', 'perseus_rules.json'))
+    sites = [
+        ('qalamos', qalamos_page, qalamos_regex, lambda html, regex=True: qalamos_rules(qalamos, html, regex)),
+        ('perseus', perseus_page, perseus_regex, lambda html, regex=True: perseus_rules(perseus, html, regex)),
+    ]
+
+    print(f"{'page':<22} {'size':>11} {'records':>8} {'regex':>9} {'rules':>9} {'scan':>9} "
+          f"{'rules/regex':>12} {'scan/regex':>11}")
+    for name, make, regex, rules in sites:
+        for entries in sizes:
+            html = make(entries)
+            regex_time, old = timed(regex, html, repeat=3)
+            rules_time, new = timed(rules, html, repeat=3)
+            scan_time, scanned = timed(rules, html, False, repeat=3)
+            for label, records in (('rule', new), ('scan', scanned)):
+                if old != records:
+                    print(f"MISMATCH {name} x{entries}: {len(old)} regex vs {len(records)} {label} records")
+                    first = next(i for i, (a, b) in enumerate(zip(old + [None], records + [None])) if a != b)
+                    print(f"  regex: {(old + [None])[first]}\n  {label}: {(records + [None])[first]}")
+                    sys.exit(1)
+            print(f"{name + ' x' + str(entries):<22} {len(html):>11,} {len(new):>8,} "
+                  f"{regex_time:>8.3f}s {rules_time:>8.3f}s {scan_time:>8.3f}s "
+                  f"{regex_time / rules_time:>11.2f}x {regex_time / scan_time:>10.2f}x")
+
+    # Every other entry with swapped attributes, a few without an author
+    extractors = {'qalamos': qalamos, 'perseus': perseus}
+    shifted = [
+        ("Shifted markup", lambda make, name, n: make(n, shifted=True),
+         {'qalamos': (500, 1000, 2000), 'perseus': (500, 1000, 2000)}),
+        ("Renamed class", lambda make, name, n: renamed(make(n), name),
+         {'qalamos': (250, 500, 1000), 'perseus': (5, 10, 15)}),
+    ]
+    for title, build, sizes_for in shifted:
+        print(f"\n{title:<22} {'size':>11} {'entries':>8} {'regex':>17} {'rules':>17} {'skipped':>8}")
+        for name, make, regex, rules in sites:
+            for entries in sizes_for[name]:
+                html = build(make, name, entries)
+                regex_time, old = timed(regex, html)
+                rules_time, new = timed(rules, html)
+                skipped = sum(extractors[name].skipped.values())
+                print(f"{name + ' x' + str(entries):<22} {len(html):>11,} {entries:>8,} "
+                      f"{len(old):>6,} in {regex_time:>6.3f}s {len(new):>6,} in {rules_time:>6.3f}s "
+                      f"{skipped:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Benchmark and parity check for the BeautifulSoup parser backends.
+# Every installed backend parses the same pages: the recorded ones, the
+# fixture corpus (benchmarks/corpus) and synthetic large pages. The analytics
+# dict must come out identical to the html.parser one, otherwise the script
+# exits 1. html5lib skips the pathological corpus pages, on which it needs
+# gigabytes of memory.
+#
+# The small markup cases at the end are known to parse differently; they are
+# listed, not failed, and are why html.parser stays the default backend.
+#
+#   python3 benchmarks/bench_parsers.py [number_of_blocks ...]
+
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.parsers import available_backends, make_soup
+from bench_analytics import census_analyze, make_page
+
+# Recorded pages checked into the repository
+RECORDED_PAGES = [
+    'christian.html',
+    'index.html',
+    'Elnar/berkshire_extracted.html',
+    'lingyue/brihat_samhita_urls.html',
+]
+MANIFEST = os.path.join(ROOT, 'benchmarks', 'corpus', 'manifest.json')
+
+# Markup on which lxml / html5lib build another tree than html.parser
+EDGE_CASES = [
+    ('CDATA section', '<p>a<![CDATA[bcdefghijk]]></p>'),
+    ('tag inside title', '<title>t<b>x</b></title><p>y</p>'),
+]
+
+
+def load_pages(sizes):
+    """(label, html, kind) triples: recorded pages, the corpus, synthetic large ones"""
+    pages = []
+    for name in RECORDED_PAGES:
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                pages.append((name, f.read(), 'recorded'))
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, encoding='utf-8') as f:
+            entries = json.load(f)['pages']
+        for entry in entries:
+            if entry['path'].startswith('benchmarks/'):  # the recorded ones are in already
+                with open(os.path.join(ROOT, entry['path']), encoding='utf-8') as f:
+                    pages.append((entry['name'], f.read(), entry['kind']))
+    for blocks in sizes:
+        pages.append((f"synthetic x{blocks}", make_page(blocks), 'large'))
+    return pages
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000]
+    backends = available_backends()
+    print(f"Installed backends: {', '.join(backends)}\n")
+
+    mismatches = 0
+    print(f"{'page':<36} {'size':>10} " + " ".join(f"{b:>12}" for b in backends))
+    for label, html, kind in load_pages(sizes):
+        reference = census_analyze(make_soup(html, 'html.parser'))
+        timings = []
+        for backend in backends:
+            if backend == 'html5lib' and kind == 'pathological':
+                timings.append(None)
+                continue
+            start = time.perf_counter()
+            analytics = census_analyze(make_soup(html, backend))
+            timings.append(time.perf_counter() - start)
+            if analytics != reference:
+                mismatches += 1
+                print(f"MISMATCH {label} [{backend}]:\n  html.parser: {reference}\n  {backend}: {analytics}")
+
+        print(f"{label:<36} {len(html):>10,} "
+              + " ".join(f"{t:>11.3f}s" if t is not None else f"{'-':>12}" for t in timings))
+
+    print("\nKnown differences (not failed):")
+    for label, html in EDGE_CASES:
+        reference = census_analyze(make_soup(html, 'html.parser'))
+        for backend in backends:
+            analytics = census_analyze(make_soup(html, backend))
+            changed = {key: (reference[key], analytics.get(key)) for key in reference
+                       if analytics.get(key) != reference[key]}
+            if changed:
+                print(f"  {label} [{backend}]: " + ", ".join(
+                    f"{key} {before!r} -> {after!r}" for key, (before, after) in changed.items()))
+
+    if mismatches:
+        print(f"\n{mismatches} analytics mismatch(es) between backends")
+        sys.exit(1)
+    print("\nAnalytics identical across all backends")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Benchmark: normalized_text_stats vs. the old splitlines / split / join
+# chain it replaced. Checks that both give identical numbers on recorded
+# pages, large synthetic pages and random whitespace soup, then prints the
+# timings (best of a few runs, text extraction not included).
+#
+#   python3 benchmarks/bench_text.py [number_of_blocks ...]
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.analytics import normalized_text_stats, take_census
+from common.parsers import make_soup
+from bench_analytics import make_page
+from bench_parsers import RECORDED_PAGES
+
+REPEATS = 5
+# Every kind of whitespace the cleanup treats differently
+FUZZ_ALPHABET = ' \t\n\r\x0b\x0c\x1c\x1f\x85\xa0 　ab'
+
+
+def legacy_text_stats(text):
+    """normalized_text_stats before the single pass: builds the cleaned-up text"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return len(text), len(text.split())
+
+
+def page_text(html):
+    return take_census(make_soup(html))['text']
+
+
+def load_texts(sizes):
+    """(label, text) pairs: the recorded pages plus synthetic large ones"""
+    texts = []
+    for name in RECORDED_PAGES:
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                texts.append((name, page_text(f.read())))
+    for blocks in sizes:
+        texts.append((f"synthetic x{blocks}", page_text(make_page(blocks))))
+    return texts
+
+
+def best_time(func, text):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def fuzz(cases=20000, seed=1):
+    """Number of random strings on which the two versions disagree"""
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(cases):
+        text = ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 30)))
+        if normalized_text_stats(text) != legacy_text_stats(text):
+            failures += 1
+            print(f"MISMATCH on {text!r}: {legacy_text_stats(text)} vs {normalized_text_stats(text)}")
+    return failures
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [2000, 10000]
+
+    print(f"{'text':<36} {'chars':>11} {'legacy':>10} {'single':>10} {'speedup':>8}")
+    for label, text in load_texts(sizes):
+        legacy_time, legacy = best_time(legacy_text_stats, text)
+        single_time, single = best_time(normalized_text_stats, text)
+        if legacy != single:
+            print(f"MISMATCH {label}:\n  legacy: {legacy}\n  single: {single}")
+            sys.exit(1)
+        print(f"{label:<36} {len(text):>11,} {legacy_time:>9.4f}s {single_time:>9.4f}s "
+              f"{legacy_time / single_time:>7.1f}x")
+
+    if fuzz():
+        sys.exit(1)
+    print("\nIdentical results on all texts and 20,000 random strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Benchmark: verse segmentation of the Brihat Samhita (common/wisdomlib.py)
+# vs. the soup / get_text / string += loop lingyue/step_2.py used.
+# The chapter pages are rebuilt from lingyue/brihat_samhita_output_sa.txt
+# in wisdomlib's markup (one <p> per verse, '|' halves on their own lines,
+# the "Analyze grammar" UI spans that have to be dropped). Every variant
+# must give back exactly the verses of the text file, otherwise the script
+# exits 1.
+#
+#   python3 benchmarks/bench_verses.py [repeat_book ...]
+
+import html
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.parsers import make_soup
+from common.wisdomlib import chapter_verses, segment_verses, stream_verses
+
+BOOK = os.path.join(ROOT, 'lingyue', 'brihat_samhita_output_sa.txt')
+VERSE_END = re.compile(r'(.*?)\s*(\|\|(?: [^|\s]+ \|\|)?)$')
+
+
+def load_book():
+    """[(chapter name, [verse, ...]), ...] from the exported text file"""
+    chapters = []
+    lines = open(BOOK, encoding='utf-8').read().split('\n')
+    for i, line in enumerate(lines):
+        if line.startswith('Chapter ') and i + 1 < len(lines) and lines[i + 1] == '':
+            chapters.append((line, []))
+        elif line and chapters:
+            chapters[-1][1].append(line)
+    return chapters
+
+
+def chapter_page(name, verses):
+    rows = []
+    for verse in verses:
+        match = VERSE_END.match(verse)
+        body, number = (match.group(1), match.group(2)) if match else (verse, '')
+        halves = ' |<br>\n'.join(html.escape(half) for half in body.split(' | '))
+        rows.append(f'<p class="verse">{halves}<br>\n'
+                    f'<span class="sanskrit-av"><a href="#">Analyze grammar</a> '
+                    f'<span class="en">English text</span></span>\n'
+                    f'<span class="num">{html.escape(number)}</span></p>')
+    return (f'<html><head><title>{html.escape(name)}</title></head><body>'
+            f'<nav><div class="menu">Contents</div></nav>'
+            f'<div class="chapter-content">\n<!-- verses -->\n' + '\n'.join(rows) +
+            '\n</div><footer>wisdomlib</footer></body></html>')
+
+
+def legacy_chapter_verses(html):
+    """chapter_verses as lingyue/step_2.py had it"""
+    soup = make_soup(html)
+    content_div = soup.find('div', class_='chapter-content')
+    if content_div is None:
+        return None
+    for ui in content_div.find_all("span", class_="sanskrit-av"):
+        ui.decompose()
+    return legacy_segment(content_div)
+
+
+def legacy_segment(content_div):
+    raw_text = content_div.get_text(separator="\n")
+    lines = [line.strip() for line in raw_text.split("\n")]
+    lines = [line for line in lines if line]
+
+    verses = []
+    current = ""
+    for line in lines:
+        if line.startswith("||"):
+            current += " " + line
+            verses.append(current.strip())
+            current = ""
+        elif line == "|":
+            current += " |"
+        else:
+            if current:
+                current += " " + line
+            else:
+                current = line
+    if current:
+        verses.append(current.strip())
+    return verses
+
+
+def content_of(page):
+    content_div = make_soup(page).find('div', class_='chapter-content')
+    for ui in content_div.find_all("span", class_="sanskrit-av"):
+        ui.decompose()
+    return content_div
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def check(label, expected, result):
+    if result != expected:
+        first = next(i for i, (a, b) in enumerate(zip(expected + [None], result + [None])) if a != b)
+        print(f"MISMATCH {label} at verse {first}:\n  expected: {(expected + [None])[first]}\n"
+              f"  got:      {(result + [None])[first]}")
+        sys.exit(1)
+
+
+def main():
+    repeats = [int(arg) for arg in sys.argv[1:]] or [1, 4]
+    chapters = load_book()
+    pages = [chapter_page(name, verses) for name, verses in chapters]
+    expected = [verse for _, verses in chapters for verse in verses]
+    print(f"{len(chapters)} chapters, {len(expected):,} verses, "
+          f"{sum(map(len, pages)):,} characters of HTML\n")
+
+    print(f"{'variant':<44} {'verses':>8} {'time':>9} {'speedup':>8}")
+    for times in repeats:
+        book = pages * times
+        want = expected * times
+        label = f"x{times}"
+        base, verses = timed(lambda: [v for page in book for v in legacy_chapter_verses(page)])
+        check("legacy", want, verses)
+        rows = [
+            ("soup + segment_verses", lambda: [v for page in book for v in segment_verses(content_of(page).strings)]),
+            ("chapter_verses (no tree)", lambda: [v for page in book for v in chapter_verses(page)]),
+            ("stream_verses (whole book, no tree)", lambda: list(stream_verses(book))),
+            ("stream_verses (4 KB pieces)",
+             lambda: list(stream_verses([page[i:i + 4096] for i in range(0, len(page), 4096)]
+                                        for page in book))),
+        ]
+        print(f"{'legacy get_text loop ' + label:<44} {len(verses):>8,} {base:>8.3f}s")
+        for name, func in rows:
+            elapsed, verses = timed(func)
+            check(name, want, verses)
+            print(f"{name + ' ' + label:<44} {len(verses):>8,} {elapsed:>8.3f}s {base / elapsed:>7.1f}x")
+
+    # Segmentation alone, on already parsed chapters
+    divs = [content_of(page) for page in pages]
+    legacy_time, verses = timed(lambda: [v for div in divs for v in legacy_segment(div)])
+    check("legacy segment", expected, verses)
+    segment_time, verses = timed(lambda: [v for div in divs for v in segment_verses(div.strings)])
+    check("segment_verses", expected, verses)
+    print(f"\nSegmentation only: {legacy_time:.3f}s legacy, {segment_time:.3f}s segment_verses "
+          f"({legacy_time / segment_time:.1f}x)")
+
+    # One huge verse: no '||' anywhere, so the legacy loop keeps growing one string
+    for lines in (100000, 400000):
+        text = "\n".join(f"pada {i} |" if i % 2 else f"pada {i}" for i in range(lines))
+        legacy_time, old = timed(lambda: legacy_segment(_Text(text)))
+        segment_time, new = timed(lambda: list(segment_verses([text])))
+        check("long verse", old, new)
+        print(f"One {lines:,}-line verse: {legacy_time:.3f}s legacy, {segment_time:.3f}s segment_verses")
+
+    print("\nIdentical verses in every variant")
+
+
+class _Text:
+    """Stands in for a parsed div holding a single text node"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def get_text(self, separator=""):
+        return self.text
+
+
+if __name__ == "__main__":
+    main()
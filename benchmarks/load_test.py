@@ -0,0 +1,209 @@
+# Load test: runs the scrapers against the local mock sites (mocksite.py)
+# and reports pages per second and the p50/p99 time the server took to
+# send each response (latency, bandwidth limit and slow-loris included).
+#
+# Scenarios:
+#   batch      anton/batch_scraper.py's scrape_urls over a mix of all sites
+#   perseus    the next-arrow crawlers of christian/, andreas/ and lingyue/step_3.py
+#   wisdomlib  lingyue/step_2.py's index rules and concurrent chapter fetcher
+#   images     gallery pages and the concurrent image downloader
+#
+#   python3 benchmarks/load_test.py [--scenarios batch,perseus] [--pages 200]
+#                                   [--workers 8] [--delay 0] [--latency 0.05]
+#                                   [--error-rate 0.02] [--slowloris-rate 0.01]
+#                                   [--json results.json]
+#
+# The politeness delays default to 0 here: the point is to see how fast
+# the code itself can go. Pass --delay to measure with real-world pacing.
+# Files the scrapers write go to a temporary directory.
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urljoin, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'anton'))
+from common.extract import load_rules
+from common.http_client import configure_client, fetch_html, get_client
+from common.images import download_images
+from common.parsers import make_soup
+from common.wisdomlib import fetch_chapters
+from mocksite import WISDOMLIB_BOOK, add_config_options, config_from_args, serve
+from suite import load_script
+
+SCENARIOS = ('batch', 'perseus', 'wisdomlib', 'images')
+PERSEUS_START = "/hopper/text?doc=Perseus%3Atext%3A{text}%3Abook%3D1%3Achapter%3D1%3Asection%3D1"
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def batch_urls(base, pages):
+    """`pages` distinct URLs spread over every mock site"""
+    chapters = [f"{WISDOMLIB_BOOK}/d/doc{1218033 + i}.html" for i in range(107)]
+    kinds = [
+        lambda i: (PERSEUS_START.format(text='1999.01.0125')
+                   .replace('chapter%3D1', f'chapter%3D{i // 120 + 1}')
+                   .replace('section%3D1', f'section%3D{i // 6 % 20 + 1}')),
+        lambda i: f"/receive/MyMssPerson_agent_{i:08d}",
+        lambda i: f"/receive/DE1Book_manuscript_{i:08d}",
+        lambda i: chapters[i // 6 % len(chapters)] + ("" if i < 6 * len(chapters) else f"?copy={i}"),
+        lambda i: f"/gallery/{i}",
+        lambda i: f"/hopper/collection?collection=Perseus:collection:Greco-Roman&page={i}",
+    ]
+    return [base + kinds[i % len(kinds)](i) for i in range(pages)]
+
+
+def run_batch(base, args):
+    batch = load_script('batch_scraper', 'anton/batch_scraper.py')
+    urls = batch_urls(base, args.pages)
+    with batch.BatchSink() as sink:
+        totals = batch.scrape_urls(urls, sink, delay=args.delay, workers=args.workers,
+                                   per_host=args.workers)
+    return f"{totals['successful']} of {len(urls)} URLs scraped"
+
+
+def run_perseus(base, args):
+    christian = load_script('christian_step_3', 'christian/step_3.py')
+    andreas = load_script('andreas_step_3', 'andreas/step_3.py')
+    lingyue = load_script('lingyue_step_3', 'lingyue/step_3.py')
+    crawls = [
+        ('christian', lambda: christian.scrape_book1_chapter1(
+            base + PERSEUS_START.format(text='1999.01.0125'), delay=args.delay)),
+        ('andreas', lambda: andreas.scrape_book_chapter(
+            base + PERSEUS_START.format(text=andreas.TEXT_ID), delay=args.delay)),
+        ('lingyue', lambda: lingyue.scrape_book1(
+            base + PERSEUS_START.format(text='1999.01.0167'), delay=args.delay)),
+    ]
+    done = []
+    for name, crawl in crawls:
+        try:
+            done.append(f"{name} {len(crawl())} sections")
+        except Exception as e:
+            done.append(f"{name} stopped: {e}")
+    return ", ".join(done)
+
+
+def run_wisdomlib(base, args):
+    rules = load_rules(os.path.join(ROOT, 'lingyue', 'wisdomlib_rules.json'))
+    index = fetch_html(base + WISDOMLIB_BOOK, encoding="UTF-8")
+    # The rules join links with the real site; point them at the mock instead
+    chapters = [(urljoin(base, urlsplit(record['link']).path), record['name'])
+                for name, record in rules.records(index) if name == 'chapter']
+    failed = 0
+    for _, _, _, verses in fetch_chapters(chapters, workers=args.workers, per_host=args.workers,
+                                          delay=args.delay):
+        failed += verses is None
+    return f"{len(chapters) - failed} of {len(chapters)} chapters"
+
+
+def run_images(base, args):
+    urls = []
+    for number in range(1, args.galleries + 1):
+        page_url = f"{base}/gallery/{number}"
+        try:
+            soup = make_soup(fetch_html(page_url))
+        except Exception as e:
+            print(f"Gallery {number} failed: {e}")
+            continue
+        urls += [urljoin(page_url, img['src']) for img in soup.find_all('img') if img.get('src')]
+    with tempfile.TemporaryDirectory() as directory:
+        results = download_images(urls, directory, workers=args.workers)
+    saved = sum(r['status'] == 'saved' for r in results)
+    return f"{saved} of {len(urls)} images saved"
+
+
+RUNNERS = {'batch': run_batch, 'perseus': run_perseus, 'wisdomlib': run_wisdomlib, 'images': run_images}
+
+
+def run_scenario(name, server, args):
+    """Run one scenario (its own output discarded) and summarize the server log"""
+    mark = server.site.mark()
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        outcome = RUNNERS[name](server.base_url, args)
+    elapsed = time.perf_counter() - started
+
+    server.site.wait_idle()
+    entries = server.site.entries_since(mark)
+    pages = [e for e in entries if e[0] != 'image' and e[1] == 200]
+    seconds = [e[2] for e in entries]
+    return {
+        'scenario': name,
+        'outcome': outcome,
+        'seconds': round(elapsed, 3),
+        'requests': len(entries),
+        'pages': len(pages),
+        'pages_per_s': round(len(pages) / elapsed, 2) if elapsed else None,
+        'requests_per_s': round(len(entries) / elapsed, 2) if elapsed else None,
+        'mb': round(sum(e[3] for e in entries) / 2**20, 2),
+        'errors': sum(1 for e in entries if e[1] == 'aborted' or e[1] >= 500),
+        'statuses': dict(Counter(str(e[1]) for e in entries)),
+        'p50': round(percentile(seconds, 50), 4) if seconds else None,
+        'p99': round(percentile(seconds, 99), 4) if seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the scrapers against the local mock sites")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated, from {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--pages', type=int, default=200, help="URLs in the batch scenario (default: 200)")
+    parser.add_argument('--galleries', type=int, default=3, help="gallery pages in the images scenario")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent requests (default: 8)")
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help="politeness delay between requests to the host (default: 0)")
+    parser.add_argument('--timeout', type=float, default=10, help="client socket timeout (default: 10)")
+    parser.add_argument('--port', type=int, default=0, help="mock server port (default: any free one)")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    add_config_options(parser)
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    server = serve(config_from_args(args), port=args.port)
+    # No response cache: every page has to come from the server
+    configure_client(pool_size=args.workers, timeout=args.timeout, cache=None)
+    print(f"Mock sites on {server.base_url} ({server.site.config.describe()})")
+    print(f"{args.workers} workers, {args.delay}s politeness delay\n")
+
+    results = []
+    print(f"{'scenario':<10} {'time':>8} {'reqs':>6} {'req/s':>7} {'pages/s':>8} {'p50':>8} {'p99':>8} "
+          f"{'errors':>6}  outcome")
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)  # the scrapers write their output files into the current directory
+        try:
+            for name in scenarios:
+                result = run_scenario(name, server, args)
+                results.append(result)
+                print(f"{name:<10} {result['seconds']:>7.2f}s {result['requests']:>6} "
+                      f"{result['requests_per_s']:>7.1f} {result['pages_per_s']:>8.1f} {result['p50']:>7.3f}s {result['p99']:>7.3f}s "
+                      f"{result['errors']:>6}  {result['outcome']}")
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+    print(f"\nConnections: {get_client().describe_stats()}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# Rebuilds the fixture pages of benchmarks/corpus/ used by suite.py.
+#
+# The site pages are put back together from what the scrapers saved in this
+# repository (Herodotus and Republic sections from Perseus, the qalamos
+# manuscript list, the Brihat Samhita chapters from wisdomlib) in the markup
+# the scrapers read, so the suite runs offline and always on the same bytes.
+# The pathological pages stress the parsers: deep nesting, unclosed tags,
+# one huge text node, attribute-heavy markup. Output is deterministic;
+# commit the regenerated files together with the change that needed them.
+#
+#   python3 benchmarks/make_corpus.py
+
+import html
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(ROOT, 'benchmarks', 'corpus')
+sys.path.insert(0, ROOT)
+from bench_verses import chapter_page, load_book
+
+PERSEUS_BASE = "https://www.perseus.tufts.edu/hopper/"
+PERSEUS_DOC = "Perseus%3Atext%3A{text}%3Abook%3D{book}%3Achapter%3D{chapter}%3Asection%3D{section}"
+
+# Recorded pages already checked into the repository: (name, path, kind, site, url)
+RECORDED = [
+    ('index', 'index.html', 'small', None, "https://example.org/index.html"),
+    ('christian', 'christian.html', 'small', None, "https://example.org/christian.html"),
+    ('berkshire', 'Elnar/berkshire_extracted.html', 'typical', None,
+     "https://www.berkshirehathaway.com/letters/1977.html"),
+    ('wisdomlib_index', 'lingyue/brihat_samhita_urls.html', 'typical', 'wisdomlib',
+     "https://www.wisdomlib.org/hinduism/book/brihat-samhita-sanskrit"),
+]
+
+
+def read_sections(path):
+    """The '[Section n]' paragraphs a Perseus crawler wrote"""
+    text = open(os.path.join(ROOT, path), encoding='utf-8').read()
+    return [s.strip() for s in re.split(r'\[Section \d+\]\n', text) if s.strip()]
+
+
+def perseus_section(title, text_id, chapter, section, count, body, lang='greek'):
+    """A Perseus text page: navigation arrows, the text container, a long table of contents"""
+    def doc(n):
+        return PERSEUS_DOC.format(text=text_id, book=1, chapter=chapter, section=n)
+
+    arrows = []
+    if section > 1:
+        arrows.append(f'<a class="arrow" href="text?doc={doc(section - 1)}">'
+                      f'<img src="/img/prev.gif" alt="previous"></a>')
+    if section < count:
+        arrows.append(f'<a class="arrow" href="text?doc={doc(section + 1)}">'
+                      f'<img src="/img/next.gif" alt="next"></a>')
+    words = body.split(' ')
+    paragraphs = [' '.join(words[i:i + 60]) for i in range(0, len(words), 60)]
+    text = ''.join(f'<p>{html.escape(p)} <a class="footnote" href="#note{i}">{i + 1}</a></p>\n'
+                   for i, p in enumerate(paragraphs))
+    toc = ''.join(f'<li><a href="text?doc={doc(n)}">section {n}</a></li>' for n in range(1, count + 1))
+    return f"""<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN">
+<html><head><title>{html.escape(title)}, book 1, chapter {chapter}, section {section}</title>
+<link rel="stylesheet" href="/css/hopper.css"><script src="/js/hopper.js"></script>
+<script>var reference = "{doc(section)}"; if (a < b) {{ load(); }}</script>
+</head><body>
+<div id="header"><a href="/hopper/"><img src="/img/perseus_logo.gif" alt="Perseus Digital Library"></a>
+<ul id="navlinks"><li><a href="/hopper/">Home</a></li><li><a href="/hopper/collections">Collections/Texts</a></li>
+<li><a href="/hopper/search">Searching</a></li><li><a href="/hopper/help">Help</a></li></ul></div>
+<div id="main"><div id="header_nav">{''.join(arrows)}</div>
+<div class="text_container {lang}"><div class="text" lang="{lang}">
+{text}</div></div>
+<div id="right_col"><h4>Table of Contents</h4><ul class="toc">{toc}</ul>
+<img src="/img/cc-by-sa.png" alt="license"></div></div>
+<div id="footer"><a href="/hopper/about">About</a> <a href="/hopper/opensource">Open source</a></div>
+</body></html>
+"""
+
+
+def qalamos_agent(records):
+    """The manuscript list of a qalamos person page, one entry per saved record"""
+    rows = []
+    for record in records:
+        link = record['Link'].replace("https://www.qalamos.net", "")
+        rows.append(f"""<li class="result">
+    <a href="{html.escape(link)}" class="link-manuscript">
+      [{html.escape(record['Library'])}] {html.escape(record['Code'])}: {html.escape(record['Title'])} ({html.escape(record['Author'])})
+    </a>
+    <span class="badge">manuscript</span>
+  </li>""")
+    return f"""<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>Tilimsānī, Sulaimān Ibn-ʿAlī at- - Qalamos</title>
+<link rel="stylesheet" href="/css/qalamos.css"></head>
+<body><header><a href="/"><img src="/images/qalamos-logo.svg" alt="Qalamos"></a>
+<nav><a href="/browse">Browse</a> <a href="/search">Search</a> <a href="/about">About</a></nav></header>
+<main><h1>Tilimsānī, Sulaimān Ibn-ʿAlī at-</h1>
+<section class="manuscripts"><h2>Manuscripts</h2><ul>
+{chr(10).join(rows)}
+</ul></section></main>
+<footer><p>Qalamos - Connecting Manuscript Traditions</p></footer></body></html>
+"""
+
+
+def read_records(path):
+    records = []
+    for block in open(os.path.join(ROOT, path), encoding='utf-8').read().strip().split('\n\n'):
+        records.append(dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line))
+    return records
+
+
+def perseus_collection(entries):
+    """A Perseus collection listing: author cell with the work link inside"""
+    authors = ["Aeschylus", "Apollodorus", "Aristophanes", "Demosthenes", "Euripides",
+               "Herodotus", "Homer", "Lysias", "Plato", "Sophocles", "Thucydides", "Xenophon"]
+    rows = []
+    for i in range(entries):
+        author = authors[i % len(authors)]
+        rows.append(f"""<tr class="trResultsRow">
+  <td class='tdAuthor' valign="top">{author}
+    <a href="text?doc=Perseus:text:1999.01.{i:04d}" class="aResultsHeader">{author}, Work {i + 1}</a>
+    <span class="tdDesc">(Greek) <a href="text?doc=Perseus:text:1999.01.{i:04d}:toc">contents</a></span>
+  </td></tr>""")
+    return ('<html><head><title>Greco-Roman Collection</title></head><body><table class="tResults">\n'
+            + '\n'.join(rows) + '\n</table></body></html>\n')
+
+
+def deep_nesting(depth):
+    return ("<html><body>" + "<div><span>" * depth + "deep text"
+            + "</span></div>" * depth + "</body></html>\n")
+
+
+def unclosed_tags(count):
+    rows = ''.join(f'<p>paragraph {i} <b>bold <i>italic <a href="/p{i}">link {i}<li>item'
+                   for i in range(count))
+    return "<html><body><ul>" + rows + "\n"
+
+
+def huge_text_node(size):
+    sentence = "verba volant scripta manent & <nothing> here  \t "
+    return ("<html><body><pre>" + html.escape(sentence) * (size // len(sentence))
+            + "</pre></body></html>\n")
+
+
+def attribute_soup(count):
+    rows = ''.join(
+        f'<img src="/img/{i}.png" alt="image {i}" data-a="{i}" data-b=\'{i}\' data-c={i} '
+        f'class="a b c d" style="width:{i}px" width="{i}" height="{i}" loading=lazy '
+        f'srcset="/img/{i}@2x.png 2x, /img/{i}@3x.png 3x">\n' for i in range(count))
+    return "<html><body>" + rows + "</body></html>\n"
+
+
+def build():
+    pages = []
+
+    def add(name, text, kind, site, url):
+        with open(os.path.join(CORPUS, name + '.html'), 'w', encoding='utf-8', newline='\n') as f:
+            f.write(text)
+        pages.append({'name': name, 'path': f'benchmarks/corpus/{name}.html',
+                      'kind': kind, 'site': site, 'url': url})
+
+    os.makedirs(CORPUS, exist_ok=True)
+    for name, path, kind, site, url in RECORDED:
+        pages.append({'name': name, 'path': path, 'kind': kind, 'site': site, 'url': url})
+
+    for source, title, text_id, chapter in (
+            ('herodotus_chapter_1.txt', "Herodotus, Histories", '1999.01.0125', 1),
+            ('lingyue/Republic_chapter_1.txt', "Plato, Republic", '1999.01.0167', 1)):
+        sections = read_sections(source)
+        for section in (1, len(sections) // 2, len(sections)):
+            url = PERSEUS_BASE + "text?doc=" + PERSEUS_DOC.format(
+                text=text_id, book=1, chapter=chapter, section=section)
+            add(f"perseus_{text_id}_section_{section}",
+                perseus_section(title, text_id, chapter, section, len(sections), sections[section - 1]),
+                'typical', 'perseus', url)
+    add('perseus_collection', perseus_collection(300), 'typical', 'perseus_listing',
+        PERSEUS_BASE + "collection?collection=Perseus:collection:Greco-Roman")
+    add('qalamos_agent', qalamos_agent(read_records('andreas/step_2_output.txt')), 'typical',
+        'qalamos', "https://www.qalamos.net/receive/MyMssPerson_agent_00001577")
+
+    chapters = load_book()
+    for index in (0, 1, 22):
+        name, verses = chapters[index]
+        add(f"wisdomlib_chapter_{index + 1}", chapter_page(name, verses), 'typical', 'wisdomlib',
+            f"https://www.wisdomlib.org/hinduism/book/brihat-samhita-sanskrit/d/doc{index}.html")
+
+    add('deep_nesting', deep_nesting(3000), 'pathological', None, "https://example.org/deep")
+    add('unclosed_tags', unclosed_tags(5000), 'pathological', None, "https://example.org/unclosed")
+    add('huge_text_node', huge_text_node(500000), 'pathological', None, "https://example.org/text")
+    add('attribute_soup', attribute_soup(1500), 'pathological', None, "https://example.org/images")
+
+    with open(os.path.join(CORPUS, 'manifest.json'), 'w', encoding='utf-8', newline='\n') as f:
+        json.dump({'pages': pages}, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    return pages
+
+
+def main():
+    pages = build()
+    for page in pages:
+        size = os.path.getsize(os.path.join(ROOT, page['path']))
+        print(f"{page['name']:<40} {page['kind']:<13} {size:>10,}")
+    print(f"\n{len(pages)} pages, manifest in {os.path.relpath(CORPUS, ROOT)}/manifest.json")
+
+
+if __name__ == "__main__":
+    main()
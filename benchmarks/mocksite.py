@@ -0,0 +1,357 @@
+# Local mock of the sites the scrapers target, for load tests without
+# touching the real servers (see load_test.py).
+#
+#   /hopper/text?doc=Perseus:text:ID:book=1:chapter=C:section=S
+#                                  Perseus reader pages chained by next arrows
+#   /hopper/collection?collection=...   Perseus collection listing
+#   /receive/MyMssPerson_agent_N    qalamos person page listing manuscripts
+#   /receive/DE1Book_manuscript_N   qalamos manuscript page
+#   /hinduism/book/brihat-samhita-sanskrit          wisdomlib book index (recorded)
+#   /hinduism/book/brihat-samhita-sanskrit/d/docN.html   its chapters
+#   /gallery/N                      image-heavy page, /img/N-I.png its images
+#
+# Pages are built with the fixture builders of make_corpus.py from the text
+# saved in the repository. Every response can be delayed (latency, jitter),
+# throttled (bandwidth per response), replaced by a 503 (error rate) or
+# trickled out over many seconds after the headers (slow-loris rate), and
+# the server records how long each response took.
+#
+#   python3 benchmarks/mocksite.py --port 8800 --latency 0.05 --error-rate 0.02
+
+import argparse
+import html
+import os
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench_verses import chapter_page, load_book
+from make_corpus import perseus_collection, perseus_section, qalamos_agent, read_sections
+
+WISDOMLIB_INDEX = os.path.join(ROOT, 'lingyue', 'brihat_samhita_urls.html')
+WISDOMLIB_BOOK = '/hinduism/book/brihat-samhita-sanskrit'
+PERSEUS_TEXTS = {
+    '1999.01.0125': ("Herodotus, Histories", 'herodotus_chapter_1.txt'),
+    '1999.01.0126': ("Herodotus, The Histories", 'perseus_1999.01.0126_book1_chapter1.txt'),
+    '1999.01.0167': ("Plato, Republic", 'lingyue/Republic_chapter_1.txt'),
+}
+DOC_PART = re.compile(r'^(\w+)=(\w+)$')
+
+
+class SiteConfig:
+    """
+    Shape of the mock sites and the faults they inject.
+        latency, jitter      seconds before a response starts (uniform jitter on top)
+        bandwidth            bytes per second per response, 0 for unlimited
+        error_rate           share of requests answered with a 503
+        slowloris_rate       share of responses sent in dribbles over slowloris_seconds
+        sections             sections per Perseus chapter chain
+        manuscripts          entries on a qalamos person page
+        images, image_kb     images per gallery page and their size
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=0, error_rate=0.0,
+                 slowloris_rate=0.0, slowloris_seconds=15.0, sections=20, manuscripts=50,
+                 images=40, image_kb=30, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.slowloris_rate = slowloris_rate
+        self.slowloris_seconds = slowloris_seconds
+        self.sections = sections
+        self.manuscripts = manuscripts
+        self.images = images
+        self.image_kb = image_kb
+        self.seed = seed
+
+    def describe(self):
+        return (f"latency {self.latency}s (+{self.jitter}s), bandwidth "
+                f"{self.bandwidth // 1024 if self.bandwidth else 'unlimited'} KB/s, "
+                f"errors {self.error_rate:.0%}, slow-loris {self.slowloris_rate:.0%}")
+
+
+class MockSite:
+    """Builds the pages and keeps the log of served responses; thread safe"""
+
+    def __init__(self, config=None):
+        self.config = config or SiteConfig()
+        self.random = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.log = []  # (kind, status, seconds, bytes sent)
+        self.busy = 0  # requests being answered right now
+
+        self.texts = {text_id: (title, read_sections(path))
+                      for text_id, (title, path) in PERSEUS_TEXTS.items()}
+        self.chapters = load_book()
+        with open(WISDOMLIB_INDEX, encoding='utf-8') as f:
+            self.index = f.read()
+        doc_ids = re.findall(re.escape(WISDOMLIB_BOOK) + r'/d/doc(\d+)\.html', self.index)
+        self.doc_chapter = {doc_id: number for number, doc_id in enumerate(dict.fromkeys(doc_ids))}
+
+    # -- bookkeeping --------------------------------------------------------
+
+    def roll(self, rate):
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self):
+        jitter = 0.0
+        if self.config.jitter:
+            with self.lock:
+                jitter = self.random.uniform(0, self.config.jitter)
+        return self.config.latency + jitter
+
+    def begin(self):
+        with self.lock:
+            self.busy += 1
+
+    def record(self, kind, status, seconds, sent):
+        with self.lock:
+            self.log.append((kind, status, seconds, sent))
+            self.busy -= 1
+
+    def wait_idle(self, timeout=5.0):
+        """Wait (up to timeout) until no response is being sent, so the log is complete"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not self.busy:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def mark(self):
+        """Position in the log, for entries_since()"""
+        with self.lock:
+            return len(self.log)
+
+    def entries_since(self, mark):
+        with self.lock:
+            return self.log[mark:]
+
+    # -- pages --------------------------------------------------------------
+
+    def route(self, target):
+        """(status, content type, body bytes, kind) for a request target"""
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        query = parse_qs(parts.query)
+
+        if path == '/':
+            return self.page(200, self.front_page(), 'front')
+        if path == '/hopper/text' and 'doc' in query:
+            return self.perseus(query['doc'][0])
+        if path == '/hopper/collection':
+            return self.page(200, perseus_collection(300), 'listing')
+        match = re.fullmatch(r'/receive/MyMssPerson_agent_(\d+)', path)
+        if match:
+            return self.page(200, self.qalamos_person(int(match.group(1))), 'qalamos')
+        match = re.fullmatch(r'/receive/(\w+)Book_manuscript_(\d+)', path)
+        if match:
+            return self.page(200, self.manuscript(match.group(1), match.group(2)), 'manuscript')
+        if path == WISDOMLIB_BOOK:
+            return self.page(200, self.index, 'wisdomlib_index')
+        match = re.fullmatch(re.escape(WISDOMLIB_BOOK) + r'/d/doc(\d+)\.html', path)
+        if match and match.group(1) in self.doc_chapter:
+            name, verses = self.chapters[self.doc_chapter[match.group(1)] % len(self.chapters)]
+            return self.page(200, chapter_page(name, verses), 'wisdomlib_chapter')
+        match = re.fullmatch(r'/gallery/(\d+)', path)
+        if match:
+            return self.page(200, self.gallery(int(match.group(1))), 'gallery')
+        match = re.fullmatch(r'/img/(\d+)-(\d+)\.png', path)
+        if match:
+            return 200, 'image/png', self.png(int(match.group(1)), int(match.group(2))), 'image'
+        return self.page(404, "<html><body><h1>Not found</h1></body></html>", 'missing')
+
+    @staticmethod
+    def page(status, text, kind):
+        return status, 'text/html; charset=utf-8', text.encode('utf-8'), kind
+
+    def front_page(self):
+        links = [f"/hopper/text?doc=Perseus:text:{text_id}:book=1:chapter=1:section=1"
+                 for text_id in self.texts]
+        links += ["/hopper/collection?collection=Perseus:collection:Greco-Roman",
+                  "/receive/MyMssPerson_agent_00001577", WISDOMLIB_BOOK, "/gallery/1"]
+        items = ''.join(f'<li><a href="{html.escape(link)}">{html.escape(link)}</a></li>' for link in links)
+        return f"<html><head><title>Mock sites</title></head><body><ul>{items}</ul></body></html>"
+
+    def perseus(self, doc):
+        fields = doc.split(':')
+        if len(fields) < 3 or fields[2] not in self.texts:
+            return self.page(404, "<html><body>Unknown text</body></html>", 'missing')
+        ref = dict(m.groups() for m in map(DOC_PART.match, fields[3:]) if m)
+        chapter = int(ref['chapter']) if ref.get('chapter', '').isdigit() else 1
+        section = int(ref['section']) if ref.get('section', '').isdigit() else 0
+        if ref.get('book', '1') != '1' or section > self.config.sections:
+            return self.page(404, "<html><body>No such section</body></html>", 'missing')
+        title, sections = self.texts[fields[2]]
+        body = sections[(chapter * self.config.sections + section) % len(sections)]
+        return self.page(200, perseus_section(title, fields[2], chapter, section,
+                                              self.config.sections, body), 'perseus')
+
+    def qalamos_person(self, number):
+        libraries = ("DE-BSB", "DE-SBB", "DE-FBG", "DE-12")
+        records = [{'Author': f"Person {number}",
+                    'Title': f"Kitāb {i + 1} (vol. {i % 3 + 1})" if i % 4 == 0 else f"Kitāb {i + 1}",
+                    'Code': f"Cod. arab. {1000 + i}",
+                    'Library': libraries[i % len(libraries)],
+                    'Link': f"https://www.qalamos.net/receive/DE1Book_manuscript_{number * 1000 + i:08d}"}
+                   for i in range(self.config.manuscripts)]
+        return qalamos_agent(records)
+
+    @staticmethod
+    def manuscript(prefix, number):
+        return (f"<html><head><title>{prefix}Book_manuscript_{number} - Qalamos</title></head><body>"
+                f"<h1>Manuscript {number}</h1><dl><dt>Library</dt><dd>{prefix}</dd>"
+                f"<dt>Folios</dt><dd>{int(number) % 300 + 10}</dd></dl>"
+                f'<a href="/receive/MyMssPerson_agent_00001577">Author</a></body></html>')
+
+    def gallery(self, number):
+        figures = ''.join(
+            f'<figure><img src="/img/{number}-{i}.png" alt="Plate {i + 1}" loading="lazy">'
+            f'<figcaption>Plate {i + 1} of gallery {number}</figcaption></figure>\n'
+            for i in range(self.config.images))
+        return (f"<html><head><title>Gallery {number}</title></head><body><h1>Gallery {number}</h1>"
+                f'{figures}<p><a href="/gallery/{number + 1}">Next gallery</a></p></body></html>')
+
+    def png(self, gallery, index):
+        """A PNG with a real header (for the probes) padded to about image_kb"""
+        width, height = 200 + index % 7 * 100, 150 + index % 5 * 75
+
+        def chunk(kind, data):
+            return (struct.pack('>I', len(data)) + kind + data
+                    + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+        header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+        filler = f"{gallery}-{index}".encode() * (self.config.image_kb * 1024 // 8)
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', filler)
+                + chunk(b'IEND', b''))
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real sites
+
+    def do_GET(self):
+        site = self.server.site
+        config = site.config
+        started = time.perf_counter()
+        site.begin()
+        status, content_type, body, kind = site.route(self.path)
+        if site.roll(config.error_rate):
+            status, content_type = 503, 'text/html; charset=utf-8'
+            body = b"<html><body><h1>503 Service Unavailable</h1></body></html>"
+
+        time.sleep(site.delay())
+        headers = {'Content-Type': content_type, 'Accept-Ranges': 'bytes'}
+        if status == 200 and kind == 'image':
+            status, body, headers = self.byte_range(body, headers)
+        slow = site.roll(config.slowloris_rate)
+
+        sent = 0
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            sent = self.send_body(body, config, slow)
+        except (BrokenPipeError, ConnectionResetError):
+            status = 'aborted'  # the client gave up, e.g. on a slow-loris response
+            self.close_connection = True
+        site.record(kind, status, time.perf_counter() - started, sent)
+
+    def byte_range(self, body, headers):
+        """206 for a 'bytes=a-b' Range header (the image probes use one)"""
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if not match:
+            return 200, body, headers
+        first = int(match.group(1))
+        last = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+        headers['Content-Range'] = f"bytes {first}-{last}/{len(body)}"
+        return 206, body[first:last + 1], headers
+
+    def send_body(self, body, config, slow):
+        if slow:
+            # Headers are out; the body follows in 20 dribbles over slowloris_seconds
+            step = max(1, len(body) // 20)
+            pause = config.slowloris_seconds / 20
+        elif config.bandwidth:
+            step = max(1024, config.bandwidth // 20)
+            pause = step / config.bandwidth
+        else:
+            self.wfile.write(body)
+            return len(body)
+        sent = 0
+        for start in range(0, len(body), step):
+            if sent:
+                time.sleep(pause)
+            self.wfile.write(body[start:start + step])
+            self.wfile.flush()
+            sent += len(body[start:start + step])
+        return sent
+
+    def log_message(self, format, *args):
+        pass  # the log would swamp the load test output
+
+
+def serve(config=None, host='127.0.0.1', port=0):
+    """Start the mock sites on a background thread; returns the server (see .base_url, .site)"""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.site = MockSite(config)
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_options(parser):
+    """The SiteConfig command line options, shared with load_test.py"""
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--bandwidth-kb', type=int, default=0, help="KB/s per response (0 = unlimited)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--slowloris-rate', type=float, default=0.0,
+                        help="share of responses trickled out after the headers")
+    parser.add_argument('--slowloris-seconds', type=float, default=15.0,
+                        help="how long a trickled response takes (default: 15)")
+    parser.add_argument('--sections', type=int, default=20, help="sections per Perseus chapter")
+    parser.add_argument('--images', type=int, default=40, help="images per gallery page")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the injected faults")
+
+
+def config_from_args(args):
+    return SiteConfig(latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth_kb * 1024,
+                      error_rate=args.error_rate, slowloris_rate=args.slowloris_rate,
+                      slowloris_seconds=args.slowloris_seconds, sections=args.sections,
+                      images=args.images, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the scraped sites")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    add_config_options(parser)
+    args = parser.parse_args()
+
+    server = serve(config_from_args(args), args.host, args.port)
+    print(f"Mock sites on {server.base_url}/ ({server.site.config.describe()}), Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
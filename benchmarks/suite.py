@@ -0,0 +1,253 @@
+# Offline benchmark suite: times the page functions of the scrapers on the
+# fixture corpus (benchmarks/corpus/manifest.json, rebuilt by make_corpus.py)
+# plus synthetic pages of 10-100 MB, and writes the timings as JSON so two
+# runs (say, two releases) can be compared.
+#
+#   python3 benchmarks/suite.py [--output results.json] [--large-mb 10,100]
+#                               [--repeat 5] [--only analyze_page,extract_links]
+#                               [--compare baseline.json [--tolerance 1.25]]
+#
+# With --compare, every benchmark/page pair that got slower than the
+# baseline by more than the tolerance (and by at least a millisecond) is
+# listed and the script exits 1. Large pages run once each; the tree of a
+# 100 MB page takes gigabytes of memory, so on a small machine restrict the
+# run to the tree-free benchmarks:
+#   python3 benchmarks/suite.py --large-mb 100 --only stream_census,chapter_verses,qalamos_rules
+# Functions that print (extract_links, search_text, ...) run with stdout
+# sent to /dev/null; formatting the output is part of what they cost.
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST = os.path.join(ROOT, 'benchmarks', 'corpus', 'manifest.json')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'anton'))
+import bs4
+from common.analytics import StreamingCensus
+from common.extract import load_rules
+from common.parsers import make_soup, pick_parser
+from common.wisdomlib import chapter_verses
+from bench_analytics import make_page
+from bench_extract import PERSEUS_PATTERN, QALAMOS_PATTERN
+
+FORMAT_VERSION = 1
+# Benchmarks that never look at page.soup (the rest get it parsed beforehand)
+TREE_FREE = {'analyze_page', 'qalamos_rules', 'qalamos_regex', 'perseus_rules', 'perseus_regex',
+             'chapter_verses', 'stream_census'}
+# Pieces fed to the streaming benchmarks, as they would come off the network
+CHUNK = 64 * 1024
+# --compare ignores differences smaller than this (timer and scheduler noise)
+MIN_DIFFERENCE = 0.001
+SEARCH_QUERY = "the, and, ὁ, καὶ, verse, /[0-9]+/"
+# Synthetic pages are built from this block until they reach the asked size
+BLOCK_BYTES = len(make_page(1)) - len(make_page(0))
+
+
+def load_script(name, path):
+    """Import a scraper script as a module (they all guard their main part)"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Page:
+    """One page of the corpus, parsed lazily and only once"""
+
+    def __init__(self, name, html, kind, site=None, url=None):
+        self.name = name
+        self.html = html
+        self.kind = kind
+        self.site = site
+        self.url = url or f"https://example.org/{name}"
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.html)
+        return self._soup
+
+
+def load_corpus(path=MANIFEST):
+    pages = []
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for entry in manifest['pages']:
+        with open(os.path.join(ROOT, entry['path']), encoding='utf-8') as f:
+            pages.append(Page(entry['name'], f.read(), entry['kind'], entry.get('site'), entry.get('url')))
+    return pages
+
+
+def synthetic_page(megabytes):
+    page = make_page(max(1, int(megabytes * 1024 * 1024 / BLOCK_BYTES)))
+    return Page(f"synthetic_{megabytes:g}mb", page, 'large')
+
+
+def build_benchmarks():
+    """
+    (name, sites, func) triples; func(page) does the work being timed.
+    sites None means every page, otherwise only pages of those sites.
+    Functions taking a soup get the page parsed once, outside the timing.
+    """
+    anton = load_script('anton_step_2', 'anton/step_2.py')
+    andreas = load_script('andreas_step_3', 'andreas/step_3.py')
+    christian = load_script('christian_step_3', 'christian/step_3.py')
+    qalamos = load_rules(os.path.join(ROOT, 'andreas', 'qalamos_rules.json'))
+    perseus = load_rules(os.path.join(ROOT, 'christian', 'perseus_rules.json'))
+
+    return [
+        ('parse', None, lambda page: make_soup(page.html)),
+        ('analyze_page', None, lambda page: anton.analyze_page(page.html)),
+        ('extract_links', None, lambda page: anton.extract_links(page.soup)),
+        ('extract_images', None, lambda page: anton.extract_images(page.soup, page.url)),
+        ('search_text', None, lambda page: anton.search_text(page.soup, SEARCH_QUERY)),
+        ('extract_text', None, lambda page: andreas.extract_text(page.soup)),
+        ('find_next_url', None, lambda page: christian.find_next_url(page.soup, page.url)),
+        ('qalamos_rules', {'qalamos'}, lambda page: list(qalamos.records(page.html))),
+        ('qalamos_regex', {'qalamos'}, lambda page: QALAMOS_PATTERN.findall(page.html)),
+        ('perseus_rules', {'perseus_listing'}, lambda page: list(perseus.records(page.html))),
+        ('perseus_regex', {'perseus_listing'}, lambda page: PERSEUS_PATTERN.findall(page.html)),
+        ('chapter_verses', {'wisdomlib'}, lambda page: chapter_verses(page.html)),
+        ('stream_census', None, stream_census),
+    ]
+
+
+def stream_census(page):
+    census = StreamingCensus()
+    for start in range(0, len(page.html), CHUNK):
+        census.feed(page.html[start:start + CHUNK])
+    return census.result()
+
+
+def measure(func, page, repeat):
+    """Timings of `repeat` runs, stdout discarded"""
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(page)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(pages, repeat=5, only=None, progress=None):
+    """The JSON-ready report of every applicable benchmark/page pair"""
+    benchmarks = [(name, sites, func) for name, sites, func in build_benchmarks()
+                  if not only or name in only]
+    results = []
+    for page in pages:
+        runs = 1 if page.kind == 'large' else repeat
+        size = len(page.html.encode('utf-8'))
+        for name, sites, func in benchmarks:
+            if sites is not None and page.site not in sites:
+                continue
+            if name != 'parse' and name not in TREE_FREE:
+                page.soup  # parse outside the timing
+            timings = measure(func, page, runs)
+            best = min(timings)
+            results.append({
+                'benchmark': name,
+                'page': page.name,
+                'kind': page.kind,
+                'bytes': size,
+                'runs': runs,
+                'best': round(best, 6),
+                'median': round(statistics.median(timings), 6),
+                'mb_per_s': round(size / 1024 / 1024 / best, 3) if best else None,
+            })
+            if progress:
+                progress(results[-1])
+        page._soup = None  # one tree alive at a time: large pages take gigabytes
+
+    return {
+        'format': FORMAT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'beautifulsoup': bs4.__version__,
+        'parser': pick_parser(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """[(benchmark, page, old best, new best)] for every pair slower than tolerance x baseline"""
+    old = {(r['benchmark'], r['page']): r['best'] for r in baseline['results']}
+    slower = []
+    for r in report['results']:
+        before = old.get((r['benchmark'], r['page']))
+        if before and r['best'] > before * tolerance and r['best'] - before > MIN_DIFFERENCE:
+            slower.append((r['benchmark'], r['page'], before, r['best']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite over the fixture corpus")
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--large-mb', default='10',
+                        help="comma-separated sizes of the synthetic pages in MB, 0 for none (default: 10)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per benchmark on corpus pages (default: 5)")
+    parser.add_argument('--only', help="comma-separated benchmark names to run")
+    parser.add_argument('--compare', help="baseline JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown factor tolerated by --compare (default: 1.25)")
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    for size in args.large_mb.split(','):
+        if float(size) > 0:
+            pages.append(synthetic_page(float(size)))
+    only = set(args.only.split(',')) if args.only else None
+
+    def progress(result):
+        print(f"{result['benchmark']:<16} {result['page']:<36} {result['bytes']:>12,} "
+              f"{result['best']:>10.4f}s", file=sys.stderr)
+
+    report = run_suite(pages, repeat=args.repeat, only=only, progress=progress)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"\n{len(report['results'])} timings written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        slower = compare(report, baseline, args.tolerance)
+        for benchmark, page, before, after in slower:
+            print(f"SLOWER {benchmark} on {page}: {before:.4f}s -> {after:.4f}s "
+                  f"({after / before:.2f}x)", file=sys.stderr)
+        print(f"{len(slower)} regression(s) against {args.compare} "
+              f"(baseline commit {baseline.get('commit')})", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
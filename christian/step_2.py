@@ -1,38 +1,32 @@
-# Load the HTML content of a webpage using urllib
+# Load the HTML content of a webpage through the shared keep-alive client
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extract import load_rules
+from common.http_client import fetch_html
 
-from urllib.request import urlopen
 url = "https://www.perseus.tufts.edu/hopper/collection?collection=Perseus:collection:Greco-Roman"
-page = urlopen(url)
-html = page.read().decode("utf-8")
+html = fetch_html(url)
 print(html)
 
 # quit()  # Stop execution here for now
 
-# Base for constructing full URLs
-BASE = "https://www.perseus.tufts.edu/hopper/"
-
-# Define a regex pattern
-import re
-pattern = re.compile(r"<td class=\'tdAuthor\'.*?>\s*(.*?)\s*"
-                     r"<a href=\"(.*?)\" class=\"aResultsHeader\".*?>\s*(.*?)\s*</a>",
-                     re.DOTALL)
+# Author, title and link of each work are declared in perseus_rules.json
+rules = load_rules(os.path.join(os.path.dirname(os.path.abspath(__file__)), "perseus_rules.json"))
 
 # Match and extract data
 results = []
 
-matches = pattern.findall(html)
-# print(matches)
-# quit()
-
-# Loop through results and collect them
-for author, link, title in matches:
-    # Clean up whitespace
-    author = author.strip()
-    title = title.strip()
-    link = BASE + link.strip()
+# Loop through the records and collect them (whitespace is already cleaned
+# up and links are made absolute against the "base" of the rule file)
+for _, record in rules.records(html):
+    results.append((record["author"], record["title"], record["link"]))
 
-    # Store the extracted data in the results list
-    results.append((author, title, link))
+if rules.skipped or not results:
+    print(f"Warning: {len(results)} works found, {sum(rules.skipped.values())} entries "
+          f"did not match perseus_rules.json - has the page layout changed?\n")
 
 # Print the results
 for author, title, link in results:
@@ -1,8 +1,11 @@
-import time
+import os
+import sys
 from urllib.parse import urljoin, parse_qs, urlparse
-from urllib.request import urlopen
 
-from bs4 import BeautifulSoup
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.crawl import follow_chain
+from common.http_client import fetch_html, get_client
+from common.parsers import make_soup, take_parser_option
 
 START_URL = "https://www.perseus.tufts.edu/hopper/text?doc=Perseus%3atext%3a1999.01.0125%3Abook%3D1%3Achapter%3D1%3Asection%3D0"
 BASE_URL = "https://www.perseus.tufts.edu/hopper/"
@@ -12,9 +15,8 @@ def get_soup(url):
     """
     Download one page and turn it into a BeautifulSoup object.
     """
-    page = urlopen(url)
-    html = page.read().decode("utf-8")
-    return BeautifulSoup(html, "html.parser")
+    html = fetch_html(url)
+    return make_soup(html)
 
 
 def extract_greek_text(soup):
@@ -68,49 +70,63 @@ def doc_still_in_book1_chapter1(url):
     return (":book=1:" in doc_value) and (":chapter=1:" in doc_value)
 
 
-def scrape_book1_chapter1(start_url):
+def next_url_in_chapter(soup, current_url):
     """
-    Follow 'next' links, collect Greek text, stop when leaving book 1 chapter 1.
+    The next URL to visit, or None when there is none or it leaves chapter 1.
     """
-    url = start_url
-    all_sections = []
+    next_url = find_next_url(soup, current_url)
+    if next_url is None:
+        return None
 
-    while True:
-        soup = get_soup(url)
+    # Stop once the next URL is no longer chapter 1
+    if not doc_still_in_book1_chapter1(next_url):
+        return None
 
-        greek = extract_greek_text(soup)
-        if greek:
-            all_sections.append(greek)
+    return next_url
 
-        next_url = find_next_url(soup, url)
-        if next_url is None:
-            break
 
-        # Stop once the next URL is no longer chapter 1
-        if not doc_still_in_book1_chapter1(next_url):
-            break
+def write_section(f, i, section_text):
+    """
+    Write one section to the output file and echo it to the console.
+    """
+    # Write each section to a single text file
+    f.write(f"[Section {i}]\n")
+    f.write(section_text)
+    f.write("\n\n")
 
-        url = next_url
+    # Also print to console
+    print(f"[Section {i}]")
+    print(section_text)
+    print()
 
-        # Be polite to the server
-        time.sleep(0.5)
+
+def scrape_book1_chapter1(start_url, out=None, pipelined=True, delay=0.5):
+    """
+    Follow 'next' links, collect Greek text, stop when leaving book 1 chapter 1.
+    With pipelined=True the next page is already downloading while the
+    current one is extracted and written to `out`. `delay` is the pause
+    between two requests to the server.
+    """
+    all_sections = []
+
+    # Be polite to the server: `delay` (0.5 s) between requests, prefetching or not
+    for url, soup in follow_chain(start_url, get_soup, next_url_in_chapter,
+                                  delay=delay, pipelined=pipelined):
+        greek = extract_greek_text(soup)
+        if greek:
+            all_sections.append(greek)
+            if out is not None:
+                write_section(out, len(all_sections), greek)
 
     return all_sections
 
 
 if __name__ == "__main__":
-    sections = scrape_book1_chapter1(START_URL)
+    take_parser_option(sys.argv)
+    pipelined = "--serial" not in sys.argv
 
     with open("herodotus_chapter_1.txt", "w", encoding="utf-8") as f:
-        for i, section_text in enumerate(sections, start=1):
-            # Write each section to a single text file
-            f.write(f"[Section {i}]\n")
-            f.write(section_text)
-            f.write("\n\n")
-
-            # Also print to console
-            print(f"[Section {i}]")
-            print(section_text)
-            print()
+        sections = scrape_book1_chapter1(START_URL, out=f, pipelined=pipelined)
 
     print(f"Saved {len(sections)} sections to herodotus_chapter_1.txt")
+    print(f"Connections: {get_client().describe_stats()}")
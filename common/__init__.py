@@ -0,0 +1,5 @@
+# Shared building blocks for the scrapers in this repository.
+#
+# The scripts live in one folder per author and are started directly
+# (python3 anton/step_2.py), so they put the repository root on sys.path
+# before importing from here.
@@ -0,0 +1,256 @@
+# Page analytics engine shared by the anton scrapers.
+# Walks a BeautifulSoup tree exactly once and collects everything the
+# analytics dicts need: tag counts, the title, and the page text.
+
+from collections import Counter
+from itertools import chain
+from html.parser import HTMLParser
+
+from bs4 import CData, NavigableString, Tag
+from bs4.builder import HTMLTreeBuilder
+
+# Tags whose content never counts as page text
+SKIPPED_TAGS = ('script', 'style')
+# Tags whose strings BeautifulSoup gives a class of their own, left out by get_text()
+TEXT_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS) - set(SKIPPED_TAGS)
+VOID_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+
+
+def take_census(soup, skip=SKIPPED_TAGS, decompose=True):
+    """
+    Walk the tree once and return a census dict:
+
+        title        - the title string (same as soup.title.string),
+                       or 'No title' when the page has no <title>
+        tags         - Counter of tag names, e.g. tags['a'] == 42
+        text         - text of the page, same as soup.get_text()
+
+    Subtrees of the tags listed in `skip` are neither counted nor read.
+    With decompose=True they are removed from the soup afterwards, which
+    leaves the soup exactly as the old `soup(["script", "style"])` loop did.
+    """
+    string_types = soup.interesting_string_types or {NavigableString, CData}
+
+    tags = Counter()
+    pieces = []
+    skipped = []
+    title_tag = None
+
+    # Explicit stack instead of recursion: big pages nest deeply
+    stack = [iter(soup.contents)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                name = node.name
+                if name in skip:
+                    skipped.append(node)
+                    continue
+                tags[name] += 1
+                if name == 'title' and title_tag is None:
+                    title_tag = node
+                stack.append(iter(node.contents))
+                break
+            if type(node) in string_types:
+                pieces.append(node)
+        else:
+            stack.pop()
+
+    if decompose:
+        for tag in skipped:
+            tag.decompose()
+
+    return {
+        'title': title_tag.string if title_tag is not None else 'No title',
+        'tags': tags,
+        'text': ''.join(pieces),
+    }
+
+
+def chunk_lengths(text):
+    """
+    Lengths of the non-empty chunks of the usual cleanup (see below).
+    Splitting on double spaces before lines gives the same chunks, as
+    neither separator can contain the other, and keeps the loop in C.
+    """
+    pieces = chain.from_iterable(map(str.splitlines, text.split("  ")))
+    return list(map(len, filter(None, map(str.strip, pieces))))
+
+
+def normalized_text_stats(text):
+    """
+    Return (text_length, word_count) of the text after the usual cleanup:
+    strip every line, split on double spaces, drop empty chunks, join
+    with newlines. Computed without building the cleaned-up text: its
+    length is the chunks plus one newline between each two, and as chunks
+    only ever end at whitespace the words can be counted in `text` itself.
+    """
+    lengths = chunk_lengths(text)
+    return sum(lengths) + max(len(lengths) - 1, 0), len(text.split())
+
+
+class TextStats:
+    """
+    normalized_text_stats() for text that arrives in pieces. Only the text
+    after the last line break or double space is held back (as a list of
+    pieces, joined once the run ends), so memory is bounded by the longest
+    such run, not by the page, and every piece is searched only once.
+    """
+
+    def __init__(self):
+        self.tail = []
+        self.length = 0
+        self.chunks = 0
+        self.words = 0
+
+    def _count(self, text):
+        lengths = chunk_lengths(text)
+        self.chunks += len(lengths)
+        self.length += sum(lengths)
+        self.words += len(text.split())
+
+    def feed(self, text):
+        if not text:
+            return
+        # Cut after the last separator; what follows may still continue
+        double = text.rfind("  ")
+        cut = max(text.rfind("\n") + 1, text.rfind("\r") + 1, double + 2 if double != -1 else 0)
+        if not cut and text[0] == ' ' and self.tail and self.tail[-1][-1] == ' ':
+            cut = 1  # a double space split between two pieces
+        if not cut:
+            self.tail.append(text)
+            return
+        self.tail.append(text[:cut])
+        self._count(''.join(self.tail))
+        self.tail = [text[cut:]] if cut < len(text) else []
+
+    def result(self):
+        """(text_length, word_count), same as normalized_text_stats(all the text)"""
+        if self.tail:
+            self._count(''.join(self.tail))
+            self.tail = []
+        return self.length + max(self.chunks - 1, 0), self.words
+
+
+class StreamingCensus(HTMLParser):
+    """
+    take_census() without building a tree: feed it the page in pieces and
+    read result(). No tree is built, so memory does not grow with the page
+    but with its longest parts: an unfinished tag, comment or script that
+    HTMLParser holds back, and the longest run of text without a line break
+    or double space (see TextStats).
+
+        census = StreamingCensus()
+        for chunk in chunks:
+            census.feed(chunk)
+        census.result()   # {'title': ..., 'tags': Counter, 'text_length': ..., 'word_count': ...}
+
+    Text inside the tags whose strings BeautifulSoup keeps out of get_text()
+    (template, rt, rp) is not counted, and the title follows the rules of
+    soup.title.string: None unless the title holds a single string. Tag
+    counts follow the html.parser backend; lxml and html5lib add implied
+    tags (html, body, ...) to their trees, which these counts don't.
+    """
+
+    def __init__(self, skip=SKIPPED_TAGS):
+        super().__init__(convert_charrefs=True)
+        self.skip = skip
+        self.tags = Counter()
+        self.text = TextStats()
+        self.skipping = None
+        self.hidden = 0  # open TEXT_CONTAINERS tags
+        # Open elements inside the first <title>, as [children, only child]
+        self.title_nodes = None
+        self.title = None
+        self.seen_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.skipping:
+            return
+        if tag in self.skip:
+            self.skipping = tag
+            node = self.title_nodes and self.title_nodes[-1]
+            if node and node[0] == 1 and isinstance(node[1], str):
+                node[1] = (node[1],)  # decomposed later, but the text after it is a second string
+            return
+        self.tags[tag] += 1
+        void = tag in VOID_TAGS
+        if self.title_nodes:
+            node = [0, None]
+            title_child(self.title_nodes[-1], node)
+            if not void:
+                self.title_nodes.append(node)
+        elif tag == 'title' and not self.seen_title:
+            self.seen_title = True
+            self.title_nodes = [[0, None]]
+        if tag in TEXT_CONTAINERS and not void:
+            self.hidden += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skipping and tag not in self.skip:
+            self.tags[tag] += 1
+            if self.title_nodes:
+                title_child(self.title_nodes[-1], [0, None])
+
+    def handle_endtag(self, tag):
+        if tag == self.skipping:
+            self.skipping = None
+        elif self.skipping:
+            return
+        elif tag == 'title' and self.title_nodes:
+            self.title = title_string(self.title_nodes[0])
+            self.title_nodes = None
+        elif self.title_nodes and len(self.title_nodes) > 1 and tag not in VOID_TAGS:
+            self.title_nodes.pop()
+        if tag in TEXT_CONTAINERS and self.hidden:
+            self.hidden -= 1
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        if self.title_nodes:
+            title_child(self.title_nodes[-1], data)
+        if not self.hidden:
+            self.text.feed(data)
+
+    def handle_comment(self, data):
+        if self.title_nodes and not self.skipping:
+            title_child(self.title_nodes[-1], (data,))
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA[') and not self.skipping:
+            self.text.feed(data[6:])
+
+    def result(self):
+        self.close()
+        if self.title_nodes:  # never closed: the title runs to the end of the page
+            self.title = title_string(self.title_nodes[0])
+            self.title_nodes = None
+        text_length, word_count = self.text.result()
+        return {
+            'title': self.title if self.seen_title else 'No title',
+            'tags': self.tags,
+            'text_length': text_length,
+            'word_count': word_count,
+        }
+
+
+def title_child(node, child):
+    """Add a child (text, (string,) that takes no more text, or [children, only child]) to a title node"""
+    if node[0] == 1 and isinstance(node[1], str) and isinstance(child, str):
+        node[1] += child  # adjacent text is one string in the tree
+    elif node[0] == 0:
+        node[0], node[1] = 1, child
+    else:
+        node[0], node[1] = 2, None  # .string is None from here on, whatever follows
+
+
+def title_string(node):
+    """soup.title.string for a title node: its only string, looking through single children"""
+    while node[0] == 1:
+        child = node[1]
+        if isinstance(child, str):
+            return child
+        if isinstance(child, tuple):
+            return child[0]
+        node = child
+    return None
@@ -0,0 +1,226 @@
+# Persistent HTTP response cache.
+#
+# Responses are stored in a small SQLite database (body + headers), keyed
+# by the normalized URL. Entries younger than `ttl` seconds are served
+# straight from disk; older ones are revalidated with If-None-Match /
+# If-Modified-Since, so an unchanged page costs a 304 instead of a full
+# download. The cache is bounded by `max_bytes` and evicts the least
+# recently used bodies first. Hits only touch memory: access times are
+# written back in batches, together with the next store or eviction.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.client import HTTPMessage
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_DIR = '.scraper_cache'
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+# Access times kept in memory before they are written back
+TOUCH_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+"""
+
+
+def normalize_url(url):
+    """
+    Cache key for a URL: lowercase scheme and host, no default port,
+    no fragment, query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def headers_to_json(headers):
+    return json.dumps(list(headers.items()))
+
+
+def headers_from_json(text):
+    message = HTTPMessage()
+    for name, value in json.loads(text):
+        message[name] = value
+    return message
+
+
+class CachedResponse:
+    """A row of the cache; `fresh` tells whether it may be used without asking"""
+
+    def __init__(self, row, ttl):
+        (self.key, self.url, self.status, self.reason, headers, self.body,
+         self.size, self.etag, self.last_modified, self.stored_at, _) = row
+        self.headers = headers_from_json(headers)
+        self.fresh = time.time() - self.stored_at < ttl
+
+    def validators(self):
+        """Conditional request headers for revalidation"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk response cache.
+
+        cache = ResponseCache('.scraper_cache', ttl=3600, max_bytes=200 * 1024 * 1024)
+
+    ttl        - seconds an entry is used without revalidation (0 = always ask)
+    max_bytes  - total body size kept; least recently used entries go first
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, ttl=0, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(directory, 'responses.sqlite'),
+                                  check_same_thread=False)
+        # A crash may lose the last commits but never corrupts the file: fine for a cache
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.touched = {}  # key -> last access not yet written
+        self.counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def lookup(self, url):
+        """CachedResponse for the URL, or None"""
+        key = normalize_url(url)
+        with self.lock:
+            row = self.db.execute("SELECT * FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.touched[key] = time.time()
+            if len(self.touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self.db.commit()
+        return CachedResponse(row, self.ttl)
+
+    def store(self, url, response):
+        """Save a 200 response (anything with url/status/reason/headers/body)"""
+        key = normalize_url(url)
+        now = time.time()
+        headers = response.headers
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status, response.reason, headers_to_json(headers),
+                 response.body, len(response.body), headers.get('ETag'),
+                 headers.get('Last-Modified'), now, now))
+            self.touched.pop(key, None)
+            self.total_bytes += len(response.body) - (old[0] if old else 0)
+            self._write_touched()
+            self._shrink()
+            self.db.commit()
+            self.counters['stored'] += 1
+
+    def refresh(self, url, headers):
+        """A 304 came back: restart the TTL and pick up new validators"""
+        key = normalize_url(url)
+        with self.lock:
+            self.db.execute(
+                "UPDATE responses SET stored_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE key = ?",
+                (time.time(), headers.get('ETag'), headers.get('Last-Modified'), key))
+            self._write_touched()
+            self.db.commit()
+
+    def _write_touched(self):
+        """Write the pending access times (lock held, caller commits)"""
+        if self.touched:
+            self.db.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                [(when, key) for key, when in self.touched.items()])
+            self.touched.clear()
+
+    def _shrink(self):
+        """Drop least recently used entries until under max_bytes (lock held, caller commits)"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.counters['evicted'] += len(doomed)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            stats['bytes'] = self.total_bytes
+        return stats
+
+    def describe_stats(self):
+        s = self.stats()
+        return (f"cache: {s['hits']} hits, {s['revalidated']} revalidated (304), "
+                f"{s['misses']} misses, {s['evicted']} evicted, "
+                f"{s['entries']} entries / {s['bytes']:,} bytes")
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+            self.touched.clear()
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self._write_touched()
+            self.db.commit()
+            self.db.close()
+
+
+def cache_from_environment(default_ttl=0, enabled=False):
+    """
+    The default cache, configured by environment variables:
+        SCRAPER_CACHE=on|off       overrides `enabled` (caching is opt-in)
+        SCRAPER_CACHE_DIR=path     where to keep it (default .scraper_cache)
+        SCRAPER_CACHE_TTL=seconds  serve without revalidating (default: default_ttl)
+        SCRAPER_CACHE_MAX_MB=n     size bound (default 500)
+    """
+    setting = os.environ.get('SCRAPER_CACHE', '').lower()
+    if setting in ('1', 'on', 'yes', 'true'):
+        enabled = True
+    elif setting in ('0', 'off', 'no', 'false'):
+        enabled = False
+    if not enabled:
+        return None
+    return ResponseCache(
+        os.environ.get('SCRAPER_CACHE_DIR', DEFAULT_DIR),
+        ttl=float(os.environ.get('SCRAPER_CACHE_TTL', default_ttl)),
+        max_bytes=int(float(os.environ.get('SCRAPER_CACHE_MAX_MB', 500)) * 1024 * 1024))
@@ -0,0 +1,149 @@
+# Content-addressed store for raw HTML captures.
+#
+# Each capture is compressed and saved under the SHA-256 of its content,
+# so capturing an unchanged page again costs no extra disk space. A small
+# JSONL manifest records which URL was captured when, and with which hash.
+#
+#   captures/
+#     manifest.jsonl                 {"url": ..., "timestamp": ..., "sha256": ..., ...}
+#     blobs/ab/abcdef....html.zst    (or .html.gz when zstandard is not installed)
+#
+# zstd is used when the optional `zstandard` package is installed (see
+# anton/requirements.txt), gzip from the standard library otherwise. Reading
+# .zst blobs back needs zstandard too. The store directory is in .gitignore.
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_DIR = 'captures'
+MANIFEST = 'manifest.jsonl'
+
+
+class CaptureStore:
+    """
+        store = CaptureStore('captures')
+        digest = store.save(url, html)          # dedups identical captures
+        html = store.read(digest)               # decoded text again
+        for entry in store.history(url): ...    # every capture of a URL
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, level=None):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, 'blobs')
+        self.manifest_path = os.path.join(directory, MANIFEST)
+        self.codec = 'zst' if zstandard is not None else 'gz'
+        self.level = level
+        self.lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+    def blob_path(self, digest, codec):
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.html.{codec}")
+
+    def find_blob(self, digest):
+        """Path of an existing blob for this hash (any codec), or None"""
+        for codec in ('zst', 'gz'):
+            path = self.blob_path(digest, codec)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def compress(self, data):
+        if self.codec == 'zst':
+            return zstandard.ZstdCompressor(level=self.level or 10).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 9)
+
+    def save(self, url, html, timestamp=None, **extra):
+        """
+        Store one capture and return its content hash. `extra` keys (for
+        example analytics file names) are written into the manifest entry.
+        """
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        with self.lock:
+            path = self.find_blob(digest)
+            stored = path is None
+            if stored:
+                path = self.blob_path(digest, self.codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write then rename, so a crash never leaves a half blob
+                tmp = path + '.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(self.compress(data))
+                os.replace(tmp, path)
+
+            entry = {
+                'url': url,
+                'timestamp': timestamp,
+                'sha256': digest,
+                'size': len(data),
+                'stored_bytes': os.path.getsize(path),
+                'new_blob': stored,
+            }
+            entry.update(extra)
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        return digest
+
+    def read_bytes(self, digest):
+        path = self.find_blob(digest)
+        if path is None:
+            raise KeyError(f"No capture with hash {digest}")
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError("Install 'zstandard' to read .zst captures")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def read(self, digest):
+        """Decoded HTML of a capture"""
+        return self.read_bytes(digest).decode('utf-8')
+
+    def entries(self):
+        """Every manifest entry, oldest first"""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def history(self, url):
+        """Manifest entries of one URL, oldest first"""
+        return [entry for entry in self.entries() if entry['url'] == url]
+
+    def latest(self, url):
+        """HTML of the newest capture of a URL, or None"""
+        captures = self.history(url)
+        return self.read(captures[-1]['sha256']) if captures else None
+
+    def stats(self):
+        """Raw bytes captured vs. bytes actually on disk"""
+        captured = 0
+        captures = 0
+        for entry in self.entries():
+            captures += 1
+            captured += entry['size']
+        on_disk = 0
+        blobs = 0
+        for root, _, files in os.walk(self.blob_dir):
+            for name in files:
+                if not name.endswith('.tmp'):
+                    blobs += 1
+                    on_disk += os.path.getsize(os.path.join(root, name))
+        return {'captures': captures, 'blobs': blobs,
+                'captured_bytes': captured, 'stored_bytes': on_disk}
@@ -0,0 +1,73 @@
+# Character set detection for fetched pages.
+#
+# Order of precedence, as in browsers: a byte order mark, then the charset
+# of the Content-Type header, then a <meta charset> / <meta http-equiv> tag
+# or XML declaration in the first few KB. Without any of those the first
+# bytes are tried as UTF-8 and fall back to windows-1252.
+
+import codecs
+import re
+
+# How much of the body is looked at for a <meta> charset
+SNIFF_BYTES = 4096
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([A-Za-z0-9_:.-]+)', re.IGNORECASE)
+XML_ENCODING = re.compile(rb'^\s*<\?xml[^>]+encoding\s*=\s*["\']([A-Za-z0-9_.-]+)', re.IGNORECASE)
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([A-Za-z0-9_:.-]+)', re.IGNORECASE)
+
+# Labels browsers decode with a superset (WHATWG encoding standard)
+SUPERSETS = {'latin-1': 'cp1252', 'iso8859-1': 'cp1252', 'ascii': 'cp1252',
+             'gb2312': 'gb18030', 'gbk': 'gb18030'}
+
+
+def normalize(label):
+    """Python codec name for a charset label, or None if unknown"""
+    if isinstance(label, bytes):
+        label = label.decode('ascii', errors='ignore')
+    try:
+        name = codecs.lookup(label.strip()).name
+    except (LookupError, ValueError):
+        return None
+    return SUPERSETS.get(name, name)
+
+
+def charset_from_header(content_type):
+    match = HEADER_CHARSET.search(content_type or '')
+    return normalize(match.group(1)) if match else None
+
+
+def charset_from_markup(head):
+    """Charset declared in the first bytes of an HTML or XML document"""
+    match = XML_ENCODING.match(head) or META_CHARSET.search(head[:SNIFF_BYTES])
+    return normalize(match.group(1)) if match else None
+
+
+def looks_like_utf8(head):
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A character cut in half at the end of the sample is fine
+        return e.start >= len(head) - 3 and e.reason == 'unexpected end of data'
+    return True
+
+
+def detect_charset(content_type, head, default='utf-8'):
+    """Codec name for a body whose Content-Type header and first bytes are given"""
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name
+    charset = charset_from_header(content_type)
+    if charset:
+        return charset
+    charset = charset_from_markup(head)
+    if charset:
+        # A <meta> readable as ASCII can't be in a UTF-16 document
+        return 'utf-8' if charset.startswith('utf-16') else charset
+    if not head:
+        return default
+    return 'utf-8' if looks_like_utf8(head) else 'cp1252'
@@ -0,0 +1,49 @@
+# Crawling helpers for "next arrow" chains such as the Perseus readers.
+#
+# The chain is serial by nature: the URL of page N+1 is only known after
+# page N has been parsed. What can overlap is everything else. As soon as
+# the next URL is known its download starts on a background thread, while
+# the caller extracts and writes the current page.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from common.throttle import HostThrottle
+
+
+def follow_chain(start_url, get_soup, next_url_of, delay=0.5, pipelined=True):
+    """
+    Yield (url, soup) for every page of a chain of "next" links.
+
+    get_soup(url)              downloads and parses one page
+    next_url_of(soup, url)     returns the next URL, or None to stop
+    delay                      seconds between requests to the same host
+    pipelined                  prefetch the next page while the caller
+                               works on the current one
+
+    Politeness is the same either way: requests to a host start at
+    least `delay` seconds apart.
+    """
+    throttle = HostThrottle(delay)
+
+    def load(url):
+        throttle.wait_for(url)
+        return url, get_soup(url)
+
+    if not pipelined:
+        url = start_url
+        while url:
+            url, soup = load(url)
+            next_url = next_url_of(soup, url)
+            yield url, soup
+            url = next_url
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(load, start_url)
+        while future is not None:
+            url, soup = future.result()
+            next_url = next_url_of(soup, url)
+
+            # Start the next download before handing this page to the caller
+            future = pool.submit(load, next_url) if next_url else None
+            yield url, soup
@@ -0,0 +1,580 @@
+# Declarative record extraction for listing and catalog pages.
+#
+# A rule file (JSON) says which records a page holds, which element each
+# record starts at and which fields to take from it, e.g.
+#
+#   {
+#     "base": "https://www.qalamos.net",
+#     "records": {
+#       "manuscript": {
+#         "select": {"tag": "a", "class": "link-manuscript"},
+#         "fields": {
+#           "link": {"attr": "href", "url": true},
+#           "text": {"text": true, "match": "\\[(?P<library>[^\\]]*)\\] (?P<code>[^:]+): ..."}
+#         }
+#       }
+#     }
+#   }
+#
+# The rules are compiled once. The page is scanned by a tokenizer that only
+# stops at the tags the rules mention (comments, scripts and styles are
+# skipped whole); every token pattern is anchored at a '<' and cannot run
+# past the next '>', so the scan is linear however big the page is. Field
+# patterns only ever see the text of one record. Pages can be fed in pieces
+# and records come out as soon as their element is closed.
+#
+#   extractor = load_rules('andreas/qalamos_rules.json')
+#   for name, record in extractor.records(html):
+#       print(record['author'], record['link'])
+#
+# Selector keys:   tag, class (one of the classes), attrs ({name: regex}),
+#                  text (regex searched in the element text)
+# Record keys:     select, until (optional: the record ends with the first
+#                  such element after the start instead of the start
+#                  element's own end tag), fields, regex (optional, below)
+# Field keys:      attr NAME | text true | before true (text from the record
+#                  start up to the `in` element), in (selector, default: the
+#                  record element), sub ([[pattern, replacement], ...]),
+#                  match (full-match regex; its named groups become the
+#                  fields), url (join with "base"), optional
+#
+# A record whose fields can't all be found is not yielded but counted in
+# `skipped`, so a change in the site's markup shows up instead of silently
+# producing fewer (or garbled) results.
+#
+# The scan costs Python work per tag and runs at a fraction of the speed of
+# a single findall. A record may therefore keep the site's old regex as a
+# fast path: "regex": {"pattern": ..., "count": [...]}. Its named groups are
+# the record's fields (text groups get text_of(), url fields are joined). A
+# whole page is first matched with these patterns, and their records are
+# used only if every rule finds as many as each of its loose `count`
+# patterns (e.g. the record's class name, in any attribute order; start
+# them with a literal so the search can skip ahead). Otherwise the page is
+# scanned. The counts are taken first, so a page whose markup changed never
+# reaches the old, backtracking patterns.
+#
+#   python3 common/extract.py RULES.json PAGE.html|URL
+
+import json
+import os
+import re
+import sys
+from collections import Counter
+from html import unescape
+from urllib.parse import urljoin
+
+# Everything inside a tag after its name, quoted values may contain '>'
+TAG_BODY = r'((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>'
+ATTR = re.compile(r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]*)))?')
+ANY_TAG = re.compile(r'<(/?)([A-Za-z][^\s/>]*)' + TAG_BODY)
+MARKUP = re.compile(r'<[^>]*>')
+HAS_SCHEME = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*:')
+# Comment, script or style block, each possibly cut off by the end of a piece
+SKIPPED = r'<!--(?:.*?-->|.*\Z)|<(script|style)\b(?:.*?</\1\s*>|.*\Z)'
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+             'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+
+class RuleError(ValueError):
+    """A rule file that can't be used"""
+
+
+def parse_attrs(body):
+    attrs = {}
+    for name, double, single, bare in ATTR.findall(body):
+        attrs.setdefault(name.lower(), unescape(double or single or bare))
+    return attrs
+
+
+def text_of(html):
+    """Text of an HTML fragment, tags dropped, whitespace collapsed"""
+    if '<' in html:
+        html = MARKUP.sub('', html)
+    return ' '.join(unescape(html).split())
+
+
+class Selector:
+    def __init__(self, spec):
+        if not isinstance(spec, dict) or 'tag' not in spec:
+            raise RuleError(f"Selector needs a 'tag': {spec!r}")
+        self.tag = spec['tag'].lower()
+        self.css_class = spec.get('class')
+        self.attrs = [(name.lower(), re.compile(pattern))
+                      for name, pattern in spec.get('attrs', {}).items()]
+        self.text = re.compile(spec['text']) if 'text' in spec else None
+
+    def may_match(self, tag, body):
+        """Cheap test on the raw tag, before its attributes are parsed"""
+        return tag == self.tag and (not self.css_class or self.css_class in body)
+
+    def matches_start(self, tag, attrs):
+        if tag != self.tag:
+            return False
+        if self.css_class and self.css_class not in attrs.get('class', '').split():
+            return False
+        return all(name in attrs and pattern.search(attrs[name]) for name, pattern in self.attrs)
+
+    def matches_text(self, inner):
+        return self.text is None or bool(self.text.search(text_of(inner)))
+
+
+def find_element(html, selector):
+    """(attrs, start, inner) of the first element in `html` matching selector"""
+    opened = None
+    depth = 0
+    for m in ANY_TAG.finditer(html):
+        closing, tag = m.group(1), m.group(2).lower()
+        if tag != selector.tag:
+            continue
+        if opened is None:
+            if closing or not selector.may_match(tag, m.group(3)):
+                continue
+            attrs = parse_attrs(m.group(3))
+            if not selector.matches_start(tag, attrs):
+                continue
+            if m.group(3).rstrip().endswith('/') or tag in VOID_TAGS:
+                if selector.matches_text(''):
+                    return attrs, m.start(), ''
+                continue
+            opened = (attrs, m.start(), m.end())
+            depth = 1
+        elif closing:
+            depth -= 1
+            if depth == 0:
+                attrs, start, inner_start = opened
+                inner = html[inner_start:m.start()]
+                if selector.matches_text(inner):
+                    return attrs, start, inner
+                opened = None
+        else:
+            depth += 1
+    return None
+
+
+class Field:
+    def __init__(self, name, spec, selectors):
+        self.name = name
+        # Fields looking in the same element share its Selector (see Rule)
+        self.inside = selectors(spec['in']) if 'in' in spec else None
+        self.attr = spec.get('attr')
+        self.before = spec.get('before', False)
+        if sum(bool(x) for x in (self.attr, spec.get('text'), self.before)) != 1:
+            raise RuleError(f"Field '{name}' needs exactly one of attr, text, before")
+        if self.before and self.inside is None:
+            raise RuleError(f"Field '{name}': 'before' needs 'in'")
+        self.subs = [(re.compile(pattern), repl) for pattern, repl in spec.get('sub', [])]
+        self.match = re.compile(spec['match'], re.DOTALL) if 'match' in spec else None
+        self.url = spec.get('url', False)
+        self.optional = spec.get('optional', False)
+
+    def extract(self, record, attrs, inner, join_url, found_elements):
+        """Add this field to `record`; False if it can't be found"""
+        if self.inside is not None:
+            if self.inside not in found_elements:
+                found_elements[self.inside] = find_element(inner, self.inside)
+            found = found_elements[self.inside]
+            if found is None:
+                return self._missing(record)
+            if self.before:
+                value = text_of(inner[:found[1]])
+            else:
+                attrs, _, inner = found
+        if not self.before:
+            if self.attr:
+                value = attrs.get(self.attr)
+                if value is None:
+                    return self._missing(record)
+                value = value.strip()
+            else:
+                value = text_of(inner)
+
+        for pattern, repl in self.subs:
+            value = pattern.sub(repl, value)
+        if self.url:
+            value = join_url(value)
+        if self.match is None:
+            record[self.name] = value
+            return True
+        m = self.match.fullmatch(value)
+        if m is None:
+            return self._missing(record)
+        for key, group in m.groupdict().items():
+            record[key] = group.strip() if group else group
+        return True
+
+    def _missing(self, record):
+        if self.optional:
+            record[self.name] = None
+            return True
+        return False
+
+
+class Rule:
+    def __init__(self, name, spec):
+        if 'select' not in spec or not spec.get('fields'):
+            raise RuleError(f"Record '{name}' needs 'select' and 'fields'")
+        self.name = name
+        shared = {}
+
+        def selectors(selector_spec):
+            key = json.dumps(selector_spec, sort_keys=True)
+            if key not in shared:
+                shared[key] = Selector(selector_spec)
+            return shared[key]
+
+        self.select = Selector(spec['select'])
+        # Shared with the fields, so the `until` element found by the scan is not looked for again
+        self.until = selectors(spec['until']) if 'until' in spec else None
+
+        self.fields = [Field(field, field_spec, selectors) for field, field_spec in spec['fields'].items()]
+
+        self.regex = None
+        if 'regex' in spec:
+            regex = spec['regex']
+            if 'pattern' not in regex or not regex.get('count'):
+                raise RuleError(f"Record '{name}': 'regex' needs 'pattern' and 'count'")
+            self.regex = re.compile(regex['pattern'], re.DOTALL)
+            counts = regex['count']
+            self.counts = [re.compile(pattern, re.DOTALL)
+                           for pattern in ([counts] if isinstance(counts, str) else counts)]
+            keys = set()
+            for field in self.fields:
+                keys |= set(field.match.groupindex) if field.match else {field.name}
+            if set(self.regex.groupindex) != keys:
+                raise RuleError(f"Record '{name}': the regex groups must be the fields "
+                                f"{sorted(keys)}")
+            urls = {field.name for field in self.fields if field.url}
+            names = sorted(self.regex.groupindex, key=self.regex.groupindex.get)
+            self.groups = [(name, name in urls) for name in names]
+
+    def from_matches(self, matches, join_url):
+        """The records of fast-path regex matches, worked out a field (column) at a time"""
+        columns = list(zip(*(m.groups() for m in matches))) or [()] * len(self.groups)
+        values = []
+        for (_, url), column in zip(self.groups, columns):
+            if None in column:
+                column = [None if value is None else self._clean(value, url, join_url) for value in column]
+            elif url:
+                column = [join_url(value) for value in map(str.strip, map(unescape, column))]
+            else:
+                whole = ''.join(column)
+                if '<' in whole:
+                    column = list(map(text_of, column))
+                else:
+                    if '&' in whole:
+                        column = map(unescape, column)
+                    column = list(map(' '.join, map(str.split, column)))
+            values.append(column)
+        names = [name for name, _ in self.groups]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    @staticmethod
+    def _clean(value, url, join_url):
+        return join_url(unescape(value).strip()) if url else text_of(value)
+
+
+class OpenRecord:
+    """A record whose start tag was seen but not yet its end"""
+    __slots__ = ('rule', 'attrs', 'start', 'inner_start', 'depth', 'until_depth', 'inner_end',
+                 'until_attrs', 'until_start', 'until_inner_start', 'until_element')
+
+    def __init__(self, rule, attrs, start, inner_start):
+        self.rule = rule
+        self.attrs = attrs
+        self.start = start
+        self.inner_start = inner_start
+        self.depth = 1
+        self.until_depth = 0 if rule.until else None
+        self.inner_end = None
+        # The `until` element: start tag offsets relative to inner_start, then (attrs, start, inner)
+        self.until_attrs = self.until_start = self.until_inner_start = self.until_element = None
+
+
+class Extractor:
+    """Compiled rules; feed() a page in pieces or iterate records(page)"""
+
+    def __init__(self, rules):
+        if not rules.get('records'):
+            raise RuleError("Rules need a 'records' section")
+        self.base = rules.get('base', '')
+        # urljoin() is slow next to the scan; most links only need a prefix
+        self.origin = urljoin(self.base, '/x')[:-2]
+        self.directory = urljoin(self.base, 'x')[:-1]
+        self.rules = [Rule(name, spec) for name, spec in rules['records'].items()]
+        self.by_tag = {}
+        for rule in self.rules:
+            self.by_tag.setdefault(rule.select.tag, []).append(rule)
+        tags = {rule.select.tag for rule in self.rules} | {rule.until.tag for rule in self.rules if rule.until}
+        names = '|'.join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True))
+        self.token = re.compile(SKIPPED + r'|<(/?)(' + names + r')(?=[\s/>])' + TAG_BODY,
+                                re.IGNORECASE | re.DOTALL)
+        # Between records only start tags matter; a required class is looked
+        # for up to the next '<' so other tags never reach Python at all
+        starts = []
+        for tag in sorted(self.by_tag, key=len, reverse=True):
+            hints = [rule.select.css_class for rule in self.by_tag[tag]]
+            start = re.escape(tag) + r'(?=[\s/>])'
+            if all(hints):
+                start += r'(?=[^<]*?(?:' + '|'.join(re.escape(hint) for hint in hints) + '))'
+            starts.append(start)
+        self.start_token = re.compile(SKIPPED + r'|<()(' + '|'.join(starts) + ')' + TAG_BODY,
+                                      re.IGNORECASE | re.DOTALL)
+        # Most records are plain: no tag the rules mention, comment or script
+        # inside. One regex match takes such a record whole; anything else
+        # goes through the tag-by-tag scan
+        plain = (r'([^<]*(?:<(?!/?(?:' + names + r')(?=[\s/>])|!--|(?:script|style)\b)[^<]*)*)')
+        self.fast = {}
+        for tag, rules in self.by_tag.items():
+            rule = rules[0]
+            if len(rules) > 1 or tag in VOID_TAGS or (rule.until and rule.until.tag in VOID_TAGS | {tag}):
+                continue
+            pattern = '<' + re.escape(tag) + r'(?=[\s/>])' + TAG_BODY + plain
+            if rule.until:
+                pattern += '<' + re.escape(rule.until.tag) + r'(?=[\s/>])' + TAG_BODY + plain
+                pattern += '</' + re.escape(rule.until.tag) + r'\s*>'
+            else:
+                pattern += '</' + re.escape(tag) + r'\s*>'
+            self.fast[tag] = (rule, re.compile(pattern, re.IGNORECASE | re.DOTALL))
+        self.skipped = Counter()  # since the start of the page
+        self.reset()
+
+    def reset(self):
+        self.buffer = ''
+        self.scanned = 0  # where in the buffer the next feed() goes on
+        self.open = []
+
+    def feed(self, text, final=False):
+        """Scan the next piece of the page; returns the (name, record) pairs it completed"""
+        buf = self.buffer + text
+        done = []
+        end = self.scanned
+        while True:
+            m = (self.token if self.open else self.start_token).search(buf, end)
+            if m is None:
+                if not final:
+                    # A tag may be cut off at the end of this piece
+                    lt = buf.rfind('<', end)
+                    end = lt if lt != -1 else len(buf)
+                break
+            if m.group(3) is None:
+                # Comment or script: wait for the rest if it may be cut off
+                if not final and m.end() == len(buf):
+                    end = m.start()
+                    break
+                end = m.end()
+                continue
+            end = m.end()
+            closing, tag, body = m.group(2, 3, 4)
+            tag = tag.lower()
+            if closing:
+                self._close(buf, tag, m, done)
+            elif self.open or tag not in self.fast or not self._take_whole(buf, tag, m, done):
+                self._open(buf, tag, body, m, done)
+            else:
+                end = self.taken
+
+        keep = min([end] + [record.start for record in self.open])
+        if keep:
+            for record in self.open:
+                record.start -= keep
+                record.inner_start -= keep
+                if record.inner_end is not None:
+                    record.inner_end -= keep
+        self.buffer = buf[keep:]
+        self.scanned = end - keep
+        if final:
+            for record in self.open:
+                self.skipped[record.rule.name] += 1
+            self.reset()
+        return done
+
+    def close(self):
+        """Finish the page; records left open at the end count as skipped"""
+        return self.feed('', final=True)
+
+    def records(self, page, regex=True):
+        """
+        Yield (name, record) for a whole page or an iterable of its pieces.
+        A whole page goes through the rules' regexes first (regex=False: scan it)
+        """
+        self.reset()
+        self.skipped.clear()
+        if regex and isinstance(page, str):
+            found = self._regex_records(page)
+            if found is not None:
+                yield from found
+                return
+        for piece in ([page] if isinstance(page, str) else page):
+            yield from self.feed(piece)
+        yield from self.close()
+
+    def _regex_records(self, page):
+        """Records of every rule's fast-path regex, or None if the counts disagree"""
+        if not all(rule.regex for rule in self.rules):
+            return None
+        expected = []
+        for rule in self.rules:
+            counts = {len(pattern.findall(page)) for pattern in rule.counts}
+            if len(counts) != 1 or 0 in counts:
+                return None
+            expected.append(counts.pop())
+        found = []
+        for rule, count in zip(self.rules, expected):
+            matches = list(rule.regex.finditer(page))
+            if len(matches) != count:
+                return None
+            records = rule.from_matches(matches, self.join_url)
+            if len(self.rules) == 1:
+                return [(rule.name, record) for record in records]
+            found.extend((m.start(), rule.name, record) for m, record in zip(matches, records))
+        found.sort(key=lambda item: item[0])
+        return [(name, record) for _, name, record in found]
+
+    def join_url(self, url):
+        """urljoin(base, url)"""
+        if url.startswith(('http://', 'https://')):
+            return url
+        if url.startswith('.') or '/.' in url or HAS_SCHEME.match(url):
+            return urljoin(self.base, url)
+        if url.startswith('/'):
+            return self.origin + url if not url.startswith('//') else urljoin(self.base, url)
+        if url and url[0] not in '?#':
+            return self.directory + url
+        return urljoin(self.base, url)
+
+    def _take_whole(self, buf, tag, m, done):
+        """Finish a plain record in one match (nothing open); False to scan it tag by tag"""
+        rule, pattern = self.fast[tag]
+        whole = pattern.match(buf, m.start())
+        if whole is None or whole.group(1).rstrip().endswith('/'):
+            return False
+        attrs = parse_attrs(whole.group(1))
+        if not rule.select.matches_start(tag, attrs):
+            return False
+        record = OpenRecord(rule, attrs, m.start(), whole.end(1) + 1)
+        if rule.until:
+            until_attrs = parse_attrs(whole.group(3))
+            if not (rule.until.may_match(rule.until.tag, whole.group(3))
+                    and rule.until.matches_start(rule.until.tag, until_attrs)):
+                return False
+            start = whole.end(2) - record.inner_start
+            record.until_element = (until_attrs, start, whole.group(4))
+        else:
+            record.inner_end = whole.end(2)
+        self._finish(buf, record, whole.end(), done)
+        self.taken = whole.end()
+        return True
+
+    def _open(self, buf, tag, body, m, done):
+        attrs = None
+        void = tag in VOID_TAGS or body.rstrip().endswith('/')
+        for record in list(self.open) if self.open else ():
+            if not void and record.inner_end is None and tag == record.rule.select.tag:
+                record.depth += 1
+            until = record.rule.until
+            if until is None:
+                continue
+            if record.until_depth:
+                if not void and tag == until.tag:
+                    record.until_depth += 1
+            elif until.may_match(tag, body):
+                if attrs is None:
+                    attrs = parse_attrs(body)
+                if not until.matches_start(tag, attrs):
+                    continue
+                record.until_attrs = attrs
+                record.until_start = m.start() - record.inner_start
+                record.until_inner_start = m.end() - record.inner_start
+                if void:
+                    record.until_element = (attrs, record.until_start, '')
+                    self._finish(buf, record, m.end(), done)
+                else:
+                    record.until_depth = 1
+
+        for rule in self.by_tag.get(tag, ()):
+            if not rule.select.may_match(tag, body):
+                continue
+            if attrs is None:
+                attrs = parse_attrs(body)
+            if not rule.select.matches_start(tag, attrs):
+                continue
+            if rule.until:
+                # A new record starts before the last one found its end
+                for record in list(self.open):
+                    if record.rule is rule and not record.until_depth:
+                        self.open.remove(record)
+                        self.skipped[rule.name] += 1
+            record = OpenRecord(rule, attrs, m.start(), m.end())
+            if void and rule.until is None:
+                record.inner_end = m.end()
+                self._finish(buf, record, m.end(), done)
+            else:
+                self.open.append(record)
+
+    def _close(self, buf, tag, m, done):
+        for record in list(self.open):
+            if record.inner_end is None and tag == record.rule.select.tag:
+                record.depth -= 1
+                if record.depth == 0:
+                    record.inner_end = m.start()
+                    if record.rule.until is None:
+                        self._finish(buf, record, m.end(), done)
+                        continue
+            if record.until_depth and tag == record.rule.until.tag:
+                record.until_depth -= 1
+                if record.until_depth == 0:
+                    record.until_element = (record.until_attrs, record.until_start,
+                                            buf[record.inner_start + record.until_inner_start:m.start()])
+                    self._finish(buf, record, m.end(), done)
+
+    def _finish(self, buf, record, end, done):
+        if record in self.open:
+            self.open.remove(record)
+        rule = record.rule
+        element_inner = buf[record.inner_start:record.inner_end if record.inner_end is not None else end]
+        if not rule.select.matches_text(element_inner):
+            return
+        # Fields are looked up in the element, or the whole span up to `until`
+        inner = buf[record.inner_start:end] if rule.until else element_inner
+        fields = {}
+        found_elements = {}
+        if record.until_element is not None and rule.until.text is None:
+            found_elements[rule.until] = record.until_element
+        for field in rule.fields:
+            if not field.extract(fields, record.attrs, inner, self.join_url, found_elements):
+                self.skipped[rule.name] += 1
+                return
+        done.append((rule.name, fields))
+
+
+def load_rules(path):
+    """Extractor for a JSON rule file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            rules = json.load(f)
+        except ValueError as e:
+            raise RuleError(f"{path}: {e}") from None
+    return Extractor(rules)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 common/extract.py RULES.json PAGE.html|URL")
+        sys.exit(1)
+    extractor = load_rules(sys.argv[1])
+    source = sys.argv[2]
+    if source.startswith(('http://', 'https://')):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from common.http_client import fetch_html
+        html = fetch_html(source)
+    else:
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+    for name, record in extractor.records(html):
+        print(json.dumps({'record': name, **record}, ensure_ascii=False))
+    for name, count in extractor.skipped.items():
+        print(f"{count} '{name}' record(s) skipped: fields not found", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
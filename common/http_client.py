@@ -0,0 +1,503 @@
+# Shared HTTP client with keep-alive connection pools.
+#
+# urlopen() opens a new TCP (and TLS) connection for every request. The
+# crawlers hit the same few hosts hundreds of times in a row, so this
+# client keeps finished connections in a small pool per host and reuses
+# them. Errors are raised as urllib's HTTPError / URLError so existing
+# `except HTTPError` / `except URLError` blocks keep working.
+
+import codecs
+import http.client
+import io
+import ssl
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from common.cache import cache_from_environment
+from common.charset import SNIFF_BYTES, detect_charset
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Web Scraper)'}
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# Largest page body get_text() accepts before giving up on it
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+# Errors that mean a kept-alive connection was closed by the server
+# while it sat in the pool; the request is retried on a fresh connection
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+
+class Response:
+    """A finished response: status, headers and the complete body"""
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url          # final URL after redirects
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding)
+
+
+class BodyTooLarge(URLError):
+    """The response body is larger than the allowed maximum"""
+
+
+class StreamedResponse:
+    """
+    A response whose body is read on demand:
+
+        with client.stream(url) as response:
+            for chunk in response.iter_chunks():
+                ...
+
+    The connection goes back to the pool only if the body was read to the
+    end; a response closed early closes its connection.
+    """
+
+    def __init__(self, url, pool, conn, response):
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.pool = pool
+        self.conn = conn
+        self.raw = response
+        self.closed = False
+
+    def read(self, size=-1):
+        try:
+            return self.raw.read(size if size >= 0 else None)
+        except OSError as e:
+            self.close()
+            raise URLError(e)
+
+    def iter_chunks(self, size=64 * 1024):
+        while True:
+            chunk = self.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            if not self.raw.isclosed() and self.raw.length == 0:
+                # 304 / 204 / HEAD: nothing left to read, so the response is
+                # complete and the connection can stay alive
+                try:
+                    self.raw.read()
+                except OSError:
+                    self.conn.close()
+                    return
+            HttpClient._release(self.pool, self.conn, self.raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Idle keep-alive connections to one (scheme, host, port)"""
+
+    def __init__(self, scheme, host, port, maxsize, idle_timeout, timeout, proxy=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy = proxy  # (host, port) of an HTTP proxy, like urlopen uses
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.idle = []  # (connection, time it was put back)
+        self.lock = threading.Lock()
+
+    def new_connection(self):
+        host, port = self.proxy or (self.host, self.port)
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=ssl.create_default_context())
+            if self.proxy:
+                conn.set_tunnel(self.host, self.port)
+            return conn
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def get(self):
+        """Return (connection, reused, evicted); idle connections past the timeout are closed."""
+        evicted = 0
+        now = time.monotonic()
+        with self.lock:
+            while self.idle:
+                conn, since = self.idle.pop()  # most recently used first
+                if now - since <= self.idle_timeout:
+                    return conn, True, evicted
+                conn.close()
+                evicted += 1
+        return self.new_connection(), False, evicted
+
+    def put(self, conn):
+        with self.lock:
+            if len(self.idle) < self.maxsize:
+                self.idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def evict_idle(self):
+        """Close connections idle for longer than idle_timeout; returns count"""
+        now = time.monotonic()
+        with self.lock:
+            keep = [(c, t) for c, t in self.idle if now - t <= self.idle_timeout]
+            stale = [c for c, t in self.idle if now - t > self.idle_timeout]
+            self.idle = keep
+        for conn in stale:
+            conn.close()
+        return len(stale)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client.
+
+        client = HttpClient(pool_size=4, idle_timeout=30)
+        response = client.get(url)
+        html = response.text()
+
+    pool_size     - idle connections kept per host
+    idle_timeout  - seconds an idle connection may sit in the pool
+    timeout       - socket timeout per request
+    cache         - optional ResponseCache consulted by get() and get_text()
+    max_body_bytes - largest page get_text() reads
+    """
+
+    def __init__(self, pool_size=4, idle_timeout=30, timeout=10, headers=None, cache=None,
+                 max_body_bytes=MAX_BODY_BYTES):
+        self.cache = cache
+        self.max_body_bytes = max_body_bytes
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self.pools = {}
+        self.proxies = getproxies()  # same *_proxy environment variables urlopen honours
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'opened': 0, 'reused': 0, 'evicted': 0, 'retries': 0}
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def proxy_for(self, scheme, host):
+        """(host, port) of the proxy to use, or None for a direct connection"""
+        proxy = self.proxies.get(scheme)
+        if not proxy or proxy_bypass(host):
+            return None
+        parts = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+        return parts.hostname, parts.port or 80
+
+    def pool_for(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self.lock:
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(scheme, host, port, self.pool_size,
+                                                 self.idle_timeout, self.timeout,
+                                                 self.proxy_for(scheme, host))
+            return self.pools[key]
+
+    def _open(self, method, url, headers, body):
+        """
+        Send one request on a pooled connection, no redirects.
+        Returns (pool, conn, response) with the body not read yet.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise URLError(f"unsupported URL scheme: {parts.scheme!r}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        pool = self.pool_for(parts.scheme, parts.hostname, port)
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        if pool.proxy and parts.scheme == 'http':
+            path = f"http://{parts.netloc}{path}"  # plain HTTP proxies want the full URL
+
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+
+        for attempt in range(2):
+            conn, reused, evicted = pool.get()
+            if evicted:
+                self.count('evicted', evicted)
+            self.count('reused' if reused else 'opened')
+            try:
+                conn.request(method, path, body=body, headers=all_headers)
+                response = conn.getresponse()
+            except STALE_ERRORS as e:
+                conn.close()
+                # A reused connection may have been dropped by the server; retry once
+                if reused and attempt == 0:
+                    self.count('retries')
+                    continue
+                raise URLError(e)
+            except OSError as e:
+                conn.close()
+                raise URLError(e)
+            except Exception:
+                conn.close()
+                raise
+            return pool, conn, response
+
+    @staticmethod
+    def _release(pool, conn, response):
+        """Pool the connection again if its response was read to the end"""
+        if response.isclosed() and not response.will_close:
+            pool.put(conn)
+        else:
+            conn.close()
+
+    def _send(self, method, url, headers, body):
+        """One request/response on a pooled connection, no redirects"""
+        pool, conn, response = self._open(method, url, headers, body)
+        try:
+            data = response.read()
+        except OSError as e:
+            conn.close()
+            raise URLError(e)
+        except Exception:
+            conn.close()
+            raise
+        self._release(pool, conn, response)
+        return response, data
+
+    def request(self, method, url, headers=None, body=None):
+        """Send a request, follow redirects, raise HTTPError for 4xx/5xx"""
+        self.count('requests')
+        for _ in range(MAX_REDIRECTS + 1):
+            response, data = self._send(method, url, headers, body)
+            if response.status in REDIRECT_CODES and response.getheader('Location'):
+                url = urljoin(url, response.getheader('Location'))
+                if response.status == 303:
+                    method, body = 'GET', None
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason,
+                                response.headers, io.BytesIO(data))
+            return Response(url, response.status, response.reason, response.headers, data)
+        raise URLError(f"too many redirects for {url}")
+
+    def stream(self, url, headers=None, method='GET'):
+        """
+        Like request(), but the body is not read yet: returns a
+        StreamedResponse to read in chunks (use it in a with block).
+        Bypasses the response cache.
+        """
+        self.count('requests')
+        for _ in range(MAX_REDIRECTS + 1):
+            pool, conn, response = self._open(method, url, headers, None)
+            if response.status in REDIRECT_CODES and response.getheader('Location') \
+                    or response.status >= 400:
+                try:
+                    data = response.read()
+                except OSError as e:
+                    conn.close()
+                    raise URLError(e)
+                self._release(pool, conn, response)
+                if response.status >= 400:
+                    raise HTTPError(url, response.status, response.reason,
+                                    response.headers, io.BytesIO(data))
+                url = urljoin(url, response.getheader('Location'))
+                method = 'GET' if response.status == 303 else method
+                continue
+            return StreamedResponse(url, pool, conn, response)
+        raise URLError(f"too many redirects for {url}")
+
+    def get(self, url, headers=None):
+        """GET through the response cache (if there is one)"""
+        if self.cache is None:
+            return self.request('GET', url, headers=headers)
+
+        entry = self.cache.lookup(url)
+        if entry is not None and entry.fresh:
+            self.cache.count('hits')
+            return Response(entry.url, entry.status, entry.reason, entry.headers, entry.body)
+
+        all_headers = dict(headers or {})
+        if entry is not None:
+            all_headers.update(entry.validators())
+
+        response = self.request('GET', url, headers=all_headers)
+        if response.status == 304 and entry is not None:
+            self.cache.count('revalidated')
+            self.cache.refresh(url, response.headers)
+            return Response(entry.url, entry.status, entry.reason, entry.headers, entry.body)
+
+        self.cache.count('misses')
+        if response.status == 200:
+            self.cache.store(url, response)
+        return response
+
+    def get_text(self, url, headers=None, encoding=None, max_bytes=None, feed=None):
+        """
+        GET a page and decode it while it streams in.
+
+        encoding   - force a codec; by default it comes from the Content-Type
+                     header or a <meta> charset in the first few KB
+        max_bytes  - raise BodyTooLarge (a URLError) past this many bytes;
+                     defaults to the client's max_body_bytes
+        feed       - called with each decoded chunk, e.g. an incremental
+                     parser's feed(); the text is then not kept and '' is
+                     returned, so memory stays flat for any page size
+
+        Goes through the response cache like get(), except that pages fed
+        to `feed` are not stored.
+        """
+        max_bytes = max_bytes or self.max_body_bytes
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            self.cache.count('hits')
+            return self._decode_whole(entry.headers, entry.body, encoding, feed)
+
+        all_headers = dict(headers or {})
+        if entry is not None:
+            all_headers.update(entry.validators())
+
+        with self.stream(url, headers=all_headers) as response:
+            if response.status == 304 and entry is not None:
+                self.cache.count('revalidated')
+                self.cache.refresh(url, response.headers)
+                return self._decode_whole(entry.headers, entry.body, encoding, feed)
+
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > max_bytes:
+                raise BodyTooLarge(f"{url}: body of {int(length):,} bytes is over the "
+                                   f"{max_bytes:,} byte limit")
+
+            keep_bytes = self.cache is not None and response.status == 200 and feed is None
+            raw = []
+            pieces = []
+            emit = feed or pieces.append
+            decoder = None
+            head = b''
+            size = 0
+            for chunk in response.iter_chunks():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BodyTooLarge(f"{url}: body is over the {max_bytes:,} byte limit")
+                if keep_bytes:
+                    raw.append(chunk)
+                if decoder is None:
+                    head += chunk
+                    if len(head) < SNIFF_BYTES:
+                        continue
+                    decoder = self._decoder(response.headers, head, encoding)
+                    chunk, head = head, b''
+                text = decoder.decode(chunk)
+                if text:
+                    emit(text)
+            if decoder is None:
+                decoder = self._decoder(response.headers, head, encoding)
+                text = decoder.decode(head)
+                if text:
+                    emit(text)
+            text = decoder.decode(b'', final=True)
+            if text:
+                emit(text)
+
+        if self.cache is not None:
+            self.cache.count('misses')
+            if keep_bytes:
+                self.cache.store(url, Response(response.url, response.status, response.reason,
+                                               response.headers, b''.join(raw)))
+        return ''.join(pieces)
+
+    @staticmethod
+    def _decoder(headers, head, encoding):
+        charset = encoding or detect_charset(headers.get('Content-Type'), head)
+        return codecs.getincrementaldecoder(charset)(errors='replace')
+
+    def _decode_whole(self, headers, body, encoding, feed):
+        text = self._decoder(headers, body[:SNIFF_BYTES], encoding).decode(body, final=True)
+        if feed is None:
+            return text
+        feed(text)
+        return ''
+
+    def evict_idle(self):
+        """Close every pooled connection that has been idle too long"""
+        with self.lock:
+            pools = list(self.pools.values())
+        evicted = sum(pool.evict_idle() for pool in pools)
+        self.count('evicted', evicted)
+        return evicted
+
+    def stats(self):
+        """Copy of the counters plus the connection reuse ratio"""
+        with self.lock:
+            stats = dict(self.counters)
+        connections = stats['opened'] + stats['reused']
+        stats['reuse_ratio'] = stats['reused'] / connections if connections else 0.0
+        return stats
+
+    def describe_stats(self):
+        """One-line summary of the counters for the end of a run"""
+        s = self.stats()
+        line = (f"{s['requests']} requests, {s['opened']} connections opened, "
+                f"{s['reused']} reused ({s['reuse_ratio']:.0%}), {s['evicted']} evicted idle")
+        if self.cache is not None:
+            line += "; " + self.cache.describe_stats()
+        return line
+
+    def close(self):
+        with self.lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client shared by all fetch functions"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(cache=cache_from_environment())
+        return _client
+
+
+def configure_client(**options):
+    """Replace the shared client, e.g. configure_client(pool_size=8)"""
+    global _client
+    options.setdefault('cache', cache_from_environment())
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**options)
+        return _client
+
+
+def fetch_html(url, headers=None, encoding=None):
+    """
+    GET a page through the shared client and return it as text, decoded with
+    `encoding` or else the charset the page declares (see get_text)
+    """
+    return get_client().get_text(url, headers=headers, encoding=encoding)
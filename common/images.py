@@ -0,0 +1,342 @@
+# Concurrent image downloader.
+#
+# Images are streamed to disk in chunks by a bounded worker pool, hashed
+# while they arrive, and deduplicated twice: the same URL is fetched only
+# once, and an image whose content was already saved under another URL is
+# not kept a second time. The file extension comes from the Content-Type
+# header (or the first bytes of the file), not from the URL.
+#
+#   results = download_images(urls, 'downloaded_images', workers=8,
+#                             max_file_bytes=5 * 2**20, max_total_bytes=200 * 2**20)
+#
+# probe_images() learns type, size and pixel dimensions without downloading:
+# one request with a Range header reads only the first few KB of each image.
+#
+#   for info in probe_images(urls):
+#       print(info['url'], info['content_type'], info['bytes'], info['width'], info['height'])
+
+import hashlib
+import mimetypes
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+
+from common.http_client import get_client
+
+CHUNK_SIZE = 64 * 1024
+
+# Bytes read by a probe: enough for the header of PNG / GIF / WebP / BMP and
+# most JPEGs; JPEGs with a large EXIF block before the frame header get one
+# more read up to PROBE_MAX_BYTES
+PROBE_BYTES = 16 * 1024
+PROBE_MAX_BYTES = 256 * 1024
+
+# First bytes of the common image formats, for servers that send no useful Content-Type
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'BM', '.bmp'),
+    (b'\x00\x00\x01\x00', '.ico'),
+)
+PREFERRED = {'image/jpeg': '.jpg', 'image/svg+xml': '.svg', 'image/x-icon': '.ico',
+             'image/vnd.microsoft.icon': '.ico', 'image/webp': '.webp', 'image/avif': '.avif'}
+
+
+class TooLarge(Exception):
+    """The image is bigger than the per-file cap or the remaining budget"""
+
+
+def sniff_extension(head):
+    """Extension from the first bytes of a file, or None"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    if b'<svg' in head[:512].lower():
+        return '.svg'
+    return None
+
+
+def extension_for(content_type, head, url):
+    """Extension from Content-Type, then the content itself, then the URL"""
+    mime = (content_type or '').split(';')[0].strip().lower()
+    extension = PREFERRED.get(mime) or (mimetypes.guess_extension(mime) if mime.startswith('image/') else None)
+    if extension:
+        return extension
+    extension = sniff_extension(head)
+    if extension:
+        return extension
+    guessed = os.path.splitext(urlsplit(url).path)[1].lower()
+    return guessed if 1 < len(guessed) <= 5 and guessed[1:].isalnum() else '.bin'
+
+
+class Budget:
+    """Total bytes all downloads together may still transfer (None = unlimited)"""
+
+    def __init__(self, total=None):
+        self.remaining = total
+        self.lock = threading.Lock()
+
+    def take(self, amount):
+        """Reserve `amount` bytes; False once the budget is used up"""
+        with self.lock:
+            if self.remaining is None:
+                return True
+            if amount > self.remaining:
+                self.remaining = 0
+                return False
+            self.remaining -= amount
+            return True
+
+    def exhausted(self):
+        with self.lock:
+            return self.remaining == 0
+
+
+class ImageDownloader:
+    """
+    Download images concurrently into `output_dir` as image_001.jpg, ...
+    Numbers follow the order of the URLs passed to run().
+
+    max_file_bytes   - skip images larger than this
+    max_total_bytes  - stop once this many bytes have been downloaded in total
+    """
+
+    def __init__(self, output_dir='downloaded_images', workers=8, max_file_bytes=None,
+                 max_total_bytes=None, client=None):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_file_bytes = max_file_bytes
+        self.budget = Budget(max_total_bytes)
+        self.client = client or get_client()
+        self.saved = {}  # sha256 -> file name of the first copy
+        self.lock = threading.Lock()
+
+    def fetch(self, number, url):
+        """Stream one image to disk; returns a result dict"""
+        result = {'url': url, 'file': None, 'bytes': 0, 'status': 'failed', 'reason': ''}
+        if self.budget.exhausted():
+            result.update(status='skipped', reason='total byte budget used up')
+            return result
+
+        part = os.path.join(self.output_dir, f".image_{number:03d}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with self.client.stream(url) as response:
+                length = response.headers.get('Content-Length')
+                if self.max_file_bytes and length and int(length) > self.max_file_bytes:
+                    raise TooLarge(f"{int(length):,} bytes > per-file cap")
+                head = b''
+                with open(part, 'wb') as f:
+                    for chunk in response.iter_chunks(CHUNK_SIZE):
+                        size += len(chunk)
+                        if self.max_file_bytes and size > self.max_file_bytes:
+                            raise TooLarge("over the per-file cap")
+                        if not self.budget.take(len(chunk)):
+                            raise TooLarge("total byte budget used up")
+                        if len(head) < 512:
+                            head += chunk[:512]
+                        digest.update(chunk)
+                        f.write(chunk)
+                extension = extension_for(response.headers.get('Content-Type'), head, response.url)
+        except TooLarge as e:
+            result.update(status='skipped', reason=str(e))
+        except (HTTPError, URLError, OSError, ValueError) as e:
+            result['reason'] = str(e)
+        else:
+            sha = digest.hexdigest()
+            result.update(bytes=size, sha256=sha)
+            with self.lock:
+                first = self.saved.get(sha)
+                if first is None:
+                    name = f"image_{number:03d}{extension}"
+                    self.saved[sha] = name
+            if first is not None:
+                result.update(status='duplicate', file=first, reason=f"same content as {first}")
+            else:
+                os.replace(part, os.path.join(self.output_dir, name))
+                result.update(status='saved', file=name)
+        if os.path.exists(part):
+            os.remove(part)
+        return result
+
+    def run(self, urls, progress=None):
+        """
+        Download every distinct URL; returns one result per distinct URL, in order.
+        `progress(result)` is called as each one finishes.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        unique = list(dict.fromkeys(urls))
+        results = [None] * len(unique)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, i, url): i - 1 for i, url in enumerate(unique, 1)}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if progress:
+                    progress(result)
+        return results
+
+
+def download_images(urls, output_dir='downloaded_images', workers=8, max_file_bytes=None,
+                    max_total_bytes=None, progress=None):
+    """Convenience wrapper around ImageDownloader(...).run(urls)"""
+    downloader = ImageDownloader(output_dir, workers=workers, max_file_bytes=max_file_bytes,
+                                 max_total_bytes=max_total_bytes)
+    return downloader.run(urls, progress=progress)
+
+
+def jpeg_size(head):
+    """(width, height) from the SOF marker of a JPEG, or None if not in `head`"""
+    pos = 2
+    while pos + 9 < len(head):
+        if head[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = head[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            pos += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', head[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', head[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def svg_size(head):
+    text = head[:4096].decode('utf-8', errors='replace')
+    tag = re.search(r'<svg\b[^>]*>', text, re.IGNORECASE)
+    if not tag:
+        return None
+    attrs = dict(re.findall(r'([\w:-]+)\s*=\s*["\']([^"\']*)["\']', tag.group(0)))
+    number = re.compile(r'^\s*(\d+(?:\.\d+)?)(?:px)?\s*$')
+    width, height = number.match(attrs.get('width', '')), number.match(attrs.get('height', ''))
+    if width and height:
+        return round(float(width.group(1))), round(float(height.group(1)))
+    box = attrs.get('viewBox', '').replace(',', ' ').split()
+    if len(box) == 4:
+        return round(float(box[2])), round(float(box[3]))
+    return None
+
+
+def image_size(head):
+    """
+    (width, height) in pixels read from the first bytes of an image, or
+    None when the format is unknown or the header is not in `head`.
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if head.startswith(b'\xff\xd8'):
+        return jpeg_size(head)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(head[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return (int.from_bytes(head[24:27], 'little') + 1,
+                    int.from_bytes(head[27:30], 'little') + 1)
+    if head.startswith(b'BM') and len(head) >= 26:
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height)
+    if head.startswith(b'\x00\x00\x01\x00') and len(head) >= 8:
+        return head[6] or 256, head[7] or 256
+    if b'<svg' in head[:4096].lower():
+        return svg_size(head)
+    return None
+
+
+def total_size(response):
+    """Full size of the resource from Content-Range (206) or Content-Length (200)"""
+    content_range = response.headers.get('Content-Range') or ''
+    if response.status == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1].strip()
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def read_head(client, url, limit, start=0):
+    """
+    (response, bytes `start` to `limit` of the image, bytes transferred).
+    Asks for a byte range; a server that ignores Range sends the whole image
+    from byte 0, of which only `limit` bytes are read before the connection
+    is dropped.
+    """
+    with client.stream(url, headers={'Range': f'bytes={start}-{limit - 1}'}) as response:
+        skip = 0 if response.status == 206 else start
+        want = limit - start + skip
+        data = b''
+        while len(data) < want:
+            chunk = response.read(min(CHUNK_SIZE, want - len(data)))
+            if not chunk:
+                break
+            data += chunk
+    return response, data[skip:], len(data)
+
+
+def probe_image(url, client=None):
+    """
+    Content type, byte size and pixel dimensions of one image, from its
+    first few KB. Returns a dict; 'error' is set when the probe failed.
+    """
+    client = client or get_client()
+    info = {'url': url, 'content_type': None, 'bytes': None, 'width': None, 'height': None,
+            'transferred': 0, 'error': None}
+    try:
+        response, head, transferred = read_head(client, url, PROBE_BYTES)
+        size = image_size(head)
+        total = total_size(response)
+        if (size is None and head.startswith(b'\xff\xd8') and len(head) == PROBE_BYTES
+                and (total is None or total > PROBE_BYTES)):
+            # JPEG dimensions come after the metadata: fetch only the bytes that follow
+            try:
+                _, more, extra = read_head(client, url, PROBE_MAX_BYTES, start=len(head))
+            except HTTPError as e:
+                if e.code != 416:  # 416: nothing after what we have
+                    raise
+                more, extra = b'', 0
+            head += more
+            transferred += extra
+            size = image_size(head)
+    except (HTTPError, URLError, OSError, ValueError) as e:
+        info['error'] = str(e)
+        return info
+
+    content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+    if not content_type.startswith('image/'):
+        extension = sniff_extension(head)
+        content_type = mimetypes.types_map.get(extension, content_type) if extension else content_type
+    info.update(content_type=content_type or None, bytes=total, transferred=transferred)
+    if size:
+        info['width'], info['height'] = size
+    return info
+
+
+def probe_images(urls, workers=8, client=None, progress=None):
+    """probe_image() for every distinct URL, concurrently; results in URL order"""
+    client = client or get_client()
+    unique = list(dict.fromkeys(urls))
+    results = [None] * len(unique)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(probe_image, url, client): i for i, url in enumerate(unique)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(results[futures[future]])
+    return results
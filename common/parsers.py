@@ -0,0 +1,101 @@
+# Parser backend selection for BeautifulSoup.
+#
+# All scrapers build their soup through make_soup() so the parser can be
+# chosen in one place:
+#   - SCRAPER_PARSER=lxml python3 anton/step_2.py     (environment)
+#   - python3 anton/batch_scraper.py --parser lxml    (command line)
+# Without either, the stdlib html.parser is used, even when lxml is
+# installed: lxml is much faster on large pages but builds a different tree
+# for some markup (CDATA sections, tags inside <title>, broken nesting), so
+# the analytics of a page would change just by installing a package.
+# benchmarks/bench_parsers.py lists the differences on the fixture corpus.
+
+import importlib.util
+import os
+import sys
+
+from bs4 import BeautifulSoup
+
+# Backend name -> module that has to be importable for it
+BACKENDS = {
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'html.parser': None,  # stdlib, always there
+}
+
+DEFAULT_PARSER = 'html.parser'
+
+ENV_VAR = 'SCRAPER_PARSER'
+
+_forced = None
+_env_warned = False
+
+
+def backend_available(name):
+    """True if the backend is known and its module is installed"""
+    if name not in BACKENDS:
+        return False
+    module = BACKENDS[name]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_backends():
+    """List of installed backends, in BACKENDS order"""
+    return [name for name in BACKENDS if backend_available(name)]
+
+
+def set_parser(name):
+    """Force a backend for the rest of the run (None goes back to the default)"""
+    global _forced
+    if name is not None and not backend_available(name):
+        raise ValueError(f"Parser '{name}' is not available "
+                         f"(installed: {', '.join(available_backends())})")
+    _forced = name
+
+
+def take_parser_option(argv):
+    """
+    Remove '--parser NAME' or '--parser=NAME' from argv (in place) and
+    force that backend. Lets scripts keep their own positional arguments.
+    An unknown or missing backend ends the script with the installed ones.
+    """
+    for i, arg in enumerate(argv):
+        if arg == '--parser' and i + 1 < len(argv):
+            name = argv[i + 1]
+            del argv[i:i + 2]
+            break
+        if arg.startswith('--parser='):
+            name = arg.split('=', 1)[1]
+            del argv[i]
+            break
+    else:
+        return None
+    try:
+        set_parser(name)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    return name
+
+
+def pick_parser():
+    """Name of the backend make_soup() will use"""
+    global _env_warned
+    if _forced:
+        return _forced
+
+    name = os.environ.get(ENV_VAR, '').strip()
+    if name:
+        if backend_available(name):
+            return name
+        # A typo in the environment should not stop every scraper; say so once
+        if not _env_warned:
+            _env_warned = True
+            print(f"⚠️  {ENV_VAR}={name} is not available (installed: "
+                  f"{', '.join(available_backends())}), using {DEFAULT_PARSER}", file=sys.stderr)
+
+    return DEFAULT_PARSER
+
+
+def make_soup(html, parser=None):
+    """BeautifulSoup(html, <backend>) with the backend picked as above"""
+    return BeautifulSoup(html, parser or pick_parser())
@@ -0,0 +1,257 @@
+# Whole-work Perseus crawler driven by the table of contents.
+#
+# The step_3 scripts walk one chapter section by section along the "next"
+# arrows, which is strictly serial. Here the work's table of contents is
+# read first, so every section URL is known up front; the sections are
+# then fetched by a small worker pool and put back in canonical order.
+#
+#   python3 -m common.perseus 1999.01.0126              (all of Herodotus)
+#   python3 -m common.perseus 1999.01.0126 --only book=1 --workers 4
+#
+# Output: one file per chapter (or per book for works without chapters),
+# in the same [Section N] format as the step_3 scripts, with N taken from the
+# reference (section=327a gives [Section 327a]), e.g.
+# perseus_1999.01.0126_book1_chapter1.txt
+#
+# Pages are kept in the response cache (.scraper_cache/), so crawling the
+# same work again only revalidates them (304 Not Modified); --no-cache or
+# SCRAPER_CACHE=off turns that off.
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.cache import cache_from_environment
+from common.http_client import configure_client, fetch_html, get_client
+from common.parsers import available_backends, make_soup, set_parser
+from common.throttle import HostThrottle
+
+HOPPER = "https://www.perseus.tufts.edu/hopper/"
+
+# ref="Perseus:text:..." in the XML TOC, doc=Perseus%3Atext%3A... in links
+TOC_REF = re.compile(r'(?:\bref=["\']|[?&]doc=)(Perseus(?::|%3[Aa])text(?::|%3[Aa])[^"\'&\s<>]+)')
+
+
+def text_url(ref, hopper=HOPPER):
+    """Reading page of a Perseus reference like Perseus:text:ID:book=1:chapter=1"""
+    return f"{hopper}text?doc={quote(ref, safe='')}"
+
+
+def toc_url(ref, hopper=HOPPER):
+    """XML table of contents below a reference"""
+    return f"{hopper}xmltoc?doc={quote(ref, safe='')}"
+
+
+def ref_levels(ref):
+    """'Perseus:text:ID:book=1:chapter=2' -> [('book', '1'), ('chapter', '2')]"""
+    return [tuple(part.split('=', 1)) for part in ref.split(':') if '=' in part]
+
+
+def natural_key(value):
+    """Sort '2' before '10' and '327a' before '327b'"""
+    return [(0, int(piece), '') if piece.isdigit() else (1, 0, piece)
+            for piece in re.findall(r'\d+|\D+', value)]
+
+
+def canonical_key(ref):
+    return [(name, natural_key(value)) for name, value in ref_levels(ref)]
+
+
+def refs_in_toc(markup, work_ref):
+    """
+    Every reference below `work_ref` mentioned in a TOC document. Works for
+    the xmltoc XML (ref="..." attributes) and for the table of contents
+    links of an ordinary reading page (href="text?doc=...").
+    """
+    prefix = work_ref + ':'
+    refs = set()
+    for match in TOC_REF.finditer(markup):
+        ref = unquote(match.group(1))
+        if ref.startswith(prefix):
+            refs.add(ref)
+    return refs
+
+
+def leaves(refs):
+    """References that have nothing below them"""
+    parents = set()
+    for ref in refs:
+        parts = ref.split(':')
+        for i in range(4, len(parts)):
+            parents.add(':'.join(parts[:i]))
+    return {ref for ref in refs if ref not in parents}
+
+
+def read_toc(work_id, leaf_level='section', hopper=HOPPER, throttle=None, workers=4):
+    """
+    Sorted list of the leaf references (sections) of a work.
+    TOC entries that stop above `leaf_level` are expanded with one more
+    xmltoc request each; an entry whose request fails is reported and left
+    out, the rest of the work is still crawled.
+    """
+    work_ref = f"Perseus:text:{work_id}"
+    throttle = throttle or HostThrottle(0.5)
+    failed = set()
+
+    def fetch_toc(ref):
+        url = toc_url(ref, hopper)
+        throttle.wait_for(url)
+        try:
+            return refs_in_toc(fetch_html(url), work_ref)
+        except Exception as e:
+            print(f"Failed TOC {ref}: {e}")
+            failed.add(ref)
+            return set()
+
+    refs = fetch_toc(work_ref)
+    if not refs:
+        # No XML TOC: fall back to the links on the work's reading page
+        url = text_url(work_ref, hopper)
+        throttle.wait_for(url)
+        refs = refs_in_toc(fetch_html(url), work_ref)
+
+    # Expand entries that are not deep enough yet, level by level
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            shallow = [ref for ref in leaves(refs)
+                       if leaf_level not in dict(ref_levels(ref)) and ref not in failed]
+            if not shallow:
+                break
+            found = set()
+            for below in pool.map(fetch_toc, shallow):
+                found |= below
+            if not found - refs:
+                break  # the TOC goes no deeper
+            refs |= found
+
+    return sorted(leaves(refs) - failed, key=canonical_key)
+
+
+def extract_section_text(soup):
+    """Main text of a reading page, same cleanup as the step_3 scripts"""
+    container = soup.select_one("div.text_container.greek")
+    if container is None:
+        container = soup.select_one("div.text_container")
+    if container is None:
+        return ""
+    text = container.get_text(separator=" ", strip=True)
+    return " ".join(text.split())
+
+
+def fetch_sections(refs, hopper=HOPPER, workers=4, throttle=None, progress=None):
+    """
+    Download every section concurrently; returns {ref: text}, where text is
+    "" for a page without a text container and None for a failed download.
+    Requests to the host stay `throttle`-spaced.
+    """
+    throttle = throttle or HostThrottle(0.5)
+
+    def fetch(ref):
+        url = text_url(ref, hopper)
+        throttle.wait_for(url)
+        try:
+            return ref, extract_section_text(make_soup(fetch_html(url)))
+        except Exception as e:
+            print(f"Failed {ref}: {e}")
+            return ref, None
+
+    texts = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, (ref, text) in enumerate(pool.map(fetch, refs), start=1):
+            texts[ref] = text
+            if progress:
+                progress(done, len(refs), ref)
+    return texts
+
+
+def group_name(work_id, ref):
+    """Output file for a section: every level above the section goes in the name"""
+    levels = ref_levels(ref)[:-1]
+    return f"perseus_{work_id}_" + "_".join(f"{name}{value}" for name, value in levels) + ".txt"
+
+
+def write_groups(work_id, refs, texts, output_dir='.'):
+    """
+    Write the sections in canonical order, one [Section N] file per group.
+    N is the reference's own section number, so a failed or empty section
+    leaves a gap instead of renumbering the ones after it.
+    """
+    written = []
+    current, f = None, None
+    for ref in refs:
+        text = texts.get(ref)
+        if not text:
+            continue
+        name = group_name(work_id, ref)
+        if name != current:
+            if f:
+                f.close()
+            current = name
+            f = open(os.path.join(output_dir, name), "w", encoding="utf-8")
+            written.append(name)
+        f.write(f"[Section {ref_levels(ref)[-1][1]}]\n")
+        f.write(text)
+        f.write("\n\n")
+    if f:
+        f.close()
+    return written
+
+
+def crawl_work(work_id, only=None, leaf_level='section', workers=4, delay=0.5,
+               hopper=HOPPER, output_dir='.'):
+    """Read the TOC, fetch every section in parallel, write the chapter files"""
+    throttle = HostThrottle(delay)
+
+    print(f"Reading table of contents of {work_id}...")
+    refs = read_toc(work_id, leaf_level=leaf_level, hopper=hopper, throttle=throttle, workers=workers)
+    if only:
+        refs = [ref for ref in refs if f":{only}:" in ref + ':']
+    print(f"{len(refs)} sections to fetch with {workers} workers")
+
+    def progress(done, total, ref):
+        print(f"\r[{done}/{total}] {ref}", end='' if done < total else '\n', flush=True)
+
+    texts = fetch_sections(refs, hopper=hopper, workers=workers, throttle=throttle, progress=progress)
+    missing = [ref for ref in refs if texts.get(ref) is None]
+
+    written = write_groups(work_id, refs, texts, output_dir)
+    print(f"Wrote {len(written)} file(s) in {output_dir}")
+    if missing:
+        print(f"{len(missing)} section(s) failed, e.g. {missing[0]}")
+    print(f"Connections: {get_client().describe_stats()}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a whole Perseus work via its table of contents")
+    parser.add_argument('work_id', help="Perseus text ID, e.g. 1999.01.0126")
+    parser.add_argument('--only', help="restrict to one part, e.g. book=1 or chapter=3")
+    parser.add_argument('--leaf-level', default='section',
+                        help="deepest citation level to fetch (default: section)")
+    parser.add_argument('--workers', type=int, default=4, help="parallel downloads (default: 4)")
+    parser.add_argument('--delay', type=float, default=0.5,
+                        help="seconds between requests to Perseus (default: 0.5)")
+    parser.add_argument('--hopper', default=HOPPER, help="base URL of the Perseus hopper")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--parser', dest='html_parser', choices=available_backends(),
+                        help="force a BeautifulSoup backend")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="don't keep pages in the response cache (.scraper_cache/)")
+    args = parser.parse_args()
+
+    if args.html_parser:
+        set_parser(args.html_parser)
+    configure_client(cache=cache_from_environment(enabled=not args.no_cache))
+    os.makedirs(args.output_dir, exist_ok=True)
+    crawl_work(args.work_id, only=args.only, leaf_level=args.leaf_level, workers=args.workers,
+               delay=args.delay, hopper=args.hopper, output_dir=args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
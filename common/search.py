@@ -0,0 +1,179 @@
+# Multi-term text search over a BeautifulSoup tree.
+#
+# All literal terms go into one Aho-Corasick automaton, so the page text is
+# read once no matter how many terms there are: checking a page for 500
+# keywords costs about as much as checking it for one. Regular expressions
+# can be mixed in; they are run on each text node during the same walk.
+#
+#   matcher = TermMatcher(['athena', 'zeus'], regexes=[r'\bpolis\w*'])
+#   results = matcher.search(soup)
+#   results['zeus']['count'], results['zeus']['matches'][0]['context']
+
+import re
+from collections import deque
+
+from bs4 import CData, NavigableString
+
+CONTEXT_CHARS = 80
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over a list of strings. `feed` can be called
+    piece by piece; the state carries over, so matches that span two
+    pieces are still found.
+    """
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for index, word in enumerate(words):
+            if word:
+                self._add(index, word)
+        self._link()
+        self.state = 0
+
+    def _add(self, index, word):
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        self.out[state] += ((index, len(word)),)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def reset(self):
+        self.state = 0
+
+    def feed(self, text):
+        """Yield (end, word_index, length) for every match ending in `text`"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = self.state
+        for end, ch in enumerate(text, start=1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for index, length in out[state]:
+                    yield end, index, length
+        self.state = state
+
+
+def snippet(text, start, end, width=CONTEXT_CHARS):
+    """About `width` characters of `text` around text[start:end], on one line"""
+    margin = max(width - (end - start), 0) // 2
+    left = max(start - margin, 0)
+    piece = " ".join(text[left:left + width].split())
+    return ("..." if left > 0 else "") + piece + ("..." if left + width < len(text) else "")
+
+
+class TermMatcher:
+    """
+    Counts many terms (case-insensitive by default) and regexes in one walk.
+
+    Counts follow str.count: occurrences of one term do not overlap, but
+    different terms may overlap each other. Literal terms match across
+    element boundaries, exactly like searching soup.get_text(); regexes
+    match within a single text node.
+    """
+
+    def __init__(self, terms=(), regexes=(), case_sensitive=False, max_matches=5):
+        self.terms = list(dict.fromkeys(terms))
+        self.case_sensitive = case_sensitive
+        flags = 0 if case_sensitive else re.IGNORECASE
+        self.regexes = [(pattern, re.compile(pattern, flags)) for pattern in dict.fromkeys(regexes)]
+        self.max_matches = max_matches
+        fold = (lambda s: s) if case_sensitive else str.lower
+        self.automaton = Automaton([fold(term) for term in self.terms])
+        self.fold = fold
+
+    def search(self, soup):
+        """
+        {term_or_pattern: {'count': n, 'matches': [{'tag': ..., 'context': ...}, ...]}}
+        with at most `max_matches` matches (first ones on the page) per entry.
+        """
+        results = {key: {'count': 0, 'matches': []}
+                   for key in self.terms + [pattern for pattern, _ in self.regexes]}
+        string_types = soup.interesting_string_types or {NavigableString, CData}
+
+        automaton = self.automaton
+        automaton.reset()
+        last_end = [-1] * len(self.terms)
+        offset = 0
+
+        for node in soup.descendants:
+            if type(node) not in string_types:
+                continue
+            tag = node.parent.name if node.parent is not None else None
+
+            if self.terms:
+                folded = self.fold(node)
+                for end, index, length in automaton.feed(folded):
+                    start = offset + end - length
+                    if start < last_end[index]:
+                        continue  # overlaps the previous match of the same term
+                    last_end[index] = offset + end
+                    entry = results[self.terms[index]]
+                    entry['count'] += 1
+                    if len(entry['matches']) < self.max_matches:
+                        local = max(end - length, 0)
+                        entry['matches'].append({'tag': tag, 'context': snippet(node, local, end)})
+                offset += len(folded)
+
+            for pattern, regex in self.regexes:
+                entry = results[pattern]
+                for match in regex.finditer(node):
+                    entry['count'] += 1
+                    if len(entry['matches']) < self.max_matches:
+                        entry['matches'].append(
+                            {'tag': tag, 'context': snippet(node, match.start(), match.end())})
+
+        return results
+
+
+# One item of a query: a whole /regex/ (commas allowed inside) or anything up to the next comma
+QUERY_ITEM = re.compile(r'\s*(?:(/(?:\\.|[^\\])+?/)\s*(?:,|$)|([^,]*)(?:,|$))')
+
+
+def parse_query(query):
+    """
+    Split a search prompt into (terms, regexes): comma-separated terms,
+    /pattern/ for a regex, @file for a file with one term or /regex/ per line.
+    A /pattern/ is taken whole, so it may contain commas.
+    """
+    items = []
+    position = 0
+    while position < len(query):
+        match = QUERY_ITEM.match(query, position)
+        position = match.end()
+        item = (match.group(1) or match.group(2)).strip()
+        if item.startswith('@'):
+            with open(item[1:], 'r', encoding='utf-8') as f:
+                items.extend(line.strip() for line in f)
+        elif item:
+            items.append(item)
+
+    terms, regexes = [], []
+    for item in items:
+        if len(item) > 2 and item.startswith('/') and item.endswith('/'):
+            regexes.append(item[1:-1])
+        elif item:
+            terms.append(item)
+    return terms, regexes
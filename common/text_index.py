@@ -0,0 +1,383 @@
+# Full-text inverted index over the scraped text corpora.
+#
+# Two kinds of files are understood:
+#   sections  - the step_3 / perseus output: "[Section N]" followed by text
+#   verses    - lingyue/step_2.py output: a chapter heading line, one verse
+#               per line ("... || 12 ||"), a blank line between chapters
+#
+# Every section or verse is one unit. For each folded token the index keeps
+# the units it occurs in and its token positions there, in a SQLite file.
+# Files that only grew since the last run (a crawler appending sections) are
+# indexed from where the last run stopped; anything else is re-indexed.
+#
+#   python3 -m common.text_index add Republic_chapter_1.txt brihat_samhita_output_sa.txt
+#   python3 -m common.text_index refresh
+#   python3 -m common.text_index search 'θεῷ "ἅμα τὴν ἑορτὴν"'
+#
+# Folding makes queries forgiving: accents, breathings and iota subscripts
+# (Greek) and IAST / ISO 15919 diacritics (Sanskrit) are dropped, case is
+# folded (final sigma included). In verse files, which are transliterated
+# Sanskrit, the ASCII spellings sh, ch, chh and Harvard-Kyoto z also fold to
+# s, c, c and s; sections (Greek, English) keep them, so "chair" does not
+# find "cair" there. Queries are folded both ways. So "theo" style queries
+# still need Greek letters, but θεω finds θεῷ and "samkirtyate" finds
+# saṃkīrtyate. Devanagari vowel signs and viramas stay inside their word.
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+from array import array
+from collections import defaultdict
+
+INDEX_FILE = '.text_index.sqlite'
+# Bumped whenever folding, tokenizing or file parsing changes; older indexes are rebuilt
+INDEX_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_bytes INTEGER NOT NULL,
+    tail BLOB NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    label TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_path ON units (path);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, unit)
+) WITHOUT ROWID;
+"""
+
+# Bytes before indexed_bytes kept to recognise a file that was only appended to
+TAIL_BYTES = 256
+
+COMBINING = re.compile('[\u0300-\u036f\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+VARIANTS = (('chh', 'c'), ('ch', 'c'), ('sh', 's'), ('z', 's'))
+# Word characters plus the Devanagari signs \w leaves out (not the dandas)
+TOKEN = re.compile(r'[\w\u0900-\u0963\u0971-\u097f]+')
+
+# N is a number, or a Perseus section like 327a
+SECTION_HEADER = re.compile(rb'^\[Section (\d[0-9A-Za-z.]*)\][ \t]*\r?\n', re.MULTILINE)
+VERSE_NUMBER = re.compile(r'\|\|\s*(\d+)\s*\|\|\s*$')
+
+
+def fold(text, variants=False):
+    """Fold diacritics, case and, with `variants`, transliteration variants (see the top of this file)"""
+    text = COMBINING.sub('', unicodedata.normalize('NFD', text)).casefold()
+    if variants:
+        for variant, plain in VARIANTS:
+            text = text.replace(variant, plain)
+    return text
+
+
+def tokenize(text, variants=False):
+    return TOKEN.findall(fold(text, variants))
+
+
+def detect_kind(data):
+    """'sections' when the file is made of [Section N] blocks, else 'verses'"""
+    for line in data.splitlines():
+        if line.strip():
+            return 'sections' if SECTION_HEADER.match(line + b'\n') else 'verses'
+    return None
+
+
+def section_units(data, base, state):
+    """
+    (label, start, end, text) for every complete section in `data`, which
+    starts at byte `base` of the file. The last section only counts once
+    the blank line after it has been written. Returns (units, consumed).
+    """
+    headers = list(SECTION_HEADER.finditer(data))
+    units = []
+    consumed = headers[0].start() if headers else 0
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(data)
+        if i + 1 == len(headers) and not data.endswith(b'\n\n'):
+            break
+        text = data[header.end():end].decode('utf-8', errors='replace')
+        number = header.group(1).decode('ascii')
+        units.append((f"Section {int(number) if number.isdigit() else number}",
+                      base + header.end(), base + end, text))
+        consumed = end
+    return units, consumed
+
+
+def verse_units(data, base, state):
+    """
+    (label, start, end, text) for every complete verse line in `data`.
+    A line right after a blank line without any "|" is a chapter heading.
+    `state` carries the chapter, verse count and blank-line flag between calls.
+    """
+    units = []
+    consumed = 0
+    pos = 0
+    while True:
+        newline = data.find(b'\n', pos)
+        if newline < 0:
+            break
+        line = data[pos:newline].decode('utf-8', errors='replace').strip()
+        if not line:
+            state['blank'] = True
+        elif state.get('blank', True) and '|' not in line:
+            state.update(chapter=line.split(':', 1)[0].strip(), verse=0, blank=False)
+        else:
+            number = VERSE_NUMBER.search(line)
+            state['verse'] = int(number.group(1)) if number else state.get('verse', 0) + 1
+            state['blank'] = False
+            label = f"{state.get('chapter') or 'Text'}, verse {state['verse']}"
+            units.append((label, base + pos, base + newline, line))
+        pos = newline + 1
+        consumed = pos
+    return units, consumed
+
+
+PARSERS = {'sections': section_units, 'verses': verse_units}
+
+
+class Hit:
+    """One matching unit: file, label ("Section 3", "Chapter 2, verse 7") and token positions"""
+
+    def __init__(self, path, label, start, end, positions):
+        self.path = path
+        self.label = label
+        self.start = start
+        self.end = end
+        self.positions = positions
+
+    def text(self):
+        """The unit's text, read back from the corpus file"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.start)
+            return f.read(self.end - self.start).decode('utf-8', errors='replace').strip()
+
+    def __repr__(self):
+        return f"Hit({self.path!r}, {self.label!r}, {self.positions})"
+
+
+class TextIndex:
+    """
+        index = TextIndex()
+        index.add('Republic_chapter_1.txt')      # or refresh() for every known file
+        for hit in index.search('"τὴν ἑορτὴν" θεῷ'):
+            print(hit.path, hit.label, hit.positions)
+    """
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.db = sqlite3.connect(index_file)
+        self.db.executescript(SCHEMA)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            # Built with other tokens: make every file look changed and index it again
+            with self.db:
+                self.db.execute("UPDATE files SET mtime = -1, indexed_bytes = 0, tail = x''")
+                self.db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self.refresh()
+
+    def add(self, path):
+        """Index a file, or only its new part if it was appended to. Returns new units."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.db.execute(
+            "SELECT kind, mtime, size, indexed_bytes, tail, state FROM files WHERE path = ?",
+            (path,)).fetchone()
+        if row and (row[1], row[2]) == (stat.st_mtime, stat.st_size):
+            return 0
+
+        with open(path, 'rb') as f:
+            start = 0
+            if row:
+                kind, _, _, indexed, tail, state = row
+                state = json.loads(state)
+                f.seek(max(indexed - TAIL_BYTES, 0))
+                if stat.st_size >= indexed and f.read(len(tail)) == tail:
+                    start = indexed  # only appended to
+            if start == 0:
+                self.remove(path)
+                state = {}
+                f.seek(0)
+                kind = detect_kind(f.read(64 * 1024))
+                if kind is None:
+                    return 0
+            f.seek(start)
+            data = f.read()
+
+        units, consumed = PARSERS[kind](data, start, state)
+        indexed = start + consumed
+        with open(path, 'rb') as f:
+            f.seek(max(indexed - TAIL_BYTES, 0))
+            tail = f.read(min(indexed, TAIL_BYTES))
+
+        with self.db:
+            for label, begin, end, text in units:
+                unit = self.db.execute(
+                    "INSERT INTO units (path, label, start, end) VALUES (?, ?, ?, ?)",
+                    (path, label, begin, end)).lastrowid
+                positions = defaultdict(lambda: array('I'))
+                for position, token in enumerate(tokenize(text, variants=kind == 'verses')):
+                    positions[token].append(position)
+                self.db.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    ((term, unit, found.tobytes()) for term, found in positions.items()))
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, kind, stat.st_mtime, stat.st_size, indexed, tail, json.dumps(state)))
+        return len(units)
+
+    def remove(self, path):
+        path = os.path.abspath(path)
+        with self.db:
+            self.db.execute(
+                "DELETE FROM postings WHERE unit IN (SELECT id FROM units WHERE path = ?)", (path,))
+            self.db.execute("DELETE FROM units WHERE path = ?", (path,))
+            self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def files(self):
+        return [path for (path,) in self.db.execute("SELECT path FROM files ORDER BY path")]
+
+    def refresh(self):
+        """Re-check every indexed file; returns {path: new units} for the ones that changed"""
+        changed = {}
+        for path in self.files():
+            if not os.path.exists(path):
+                self.remove(path)
+                continue
+            added = self.add(path)
+            if added:
+                changed[path] = added
+        return changed
+
+    def postings(self, term, kind=None):
+        """{unit: array of positions} for one folded token, optionally only in files of one kind"""
+        if kind is None:
+            rows = self.db.execute("SELECT unit, positions FROM postings WHERE term = ?", (term,))
+        else:
+            rows = self.db.execute(
+                "SELECT postings.unit, postings.positions FROM postings "
+                "JOIN units ON units.id = postings.unit JOIN files ON files.path = units.path "
+                "WHERE postings.term = ? AND files.kind = ?", (term, kind))
+        found = {}
+        for unit, blob in rows:
+            positions = array('I')
+            positions.frombytes(blob)
+            found[unit] = positions
+        return found
+
+    def spellings(self, token):
+        """
+        Postings of a query token given as (plain, variants folded): sections
+        were indexed with the plain spelling, verse files with the folded one.
+        """
+        plain, folded = token
+        if plain == folded:
+            return self.postings(plain)
+        found = self.postings(plain, 'sections')
+        found.update(self.postings(folded, 'verses'))
+        return found
+
+    def phrase(self, tokens):
+        """{unit: [start positions]} where the (plain, folded) tokens occur next to each other"""
+        lists = [self.spellings(token) for token in tokens]
+        if not lists or not all(lists):
+            return {}
+        matches = {}
+        for unit in set.intersection(*(set(found) for found in lists)):
+            starts = set(lists[0][unit])
+            for offset, found in enumerate(lists[1:], start=1):
+                starts &= {p - offset for p in found[unit]}
+                if not starts:
+                    break
+            if starts:
+                matches[unit] = sorted(starts)
+        return matches
+
+    def search(self, query, limit=None):
+        """
+        Units matching every part of the query, in corpus order. Bare words
+        must all occur; "quoted words" must occur as a phrase. Each hit's
+        positions are the token positions where a query part starts.
+        """
+        clauses = []
+        for quoted, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            tokens = list(zip(tokenize(quoted or word), tokenize(quoted or word, variants=True)))
+            if tokens:
+                clauses.append(tokens)
+        if not clauses:
+            return []
+
+        units = None
+        positions = defaultdict(set)
+        for tokens in clauses:
+            matches = self.phrase(tokens)
+            units = set(matches) if units is None else units & set(matches)
+            if not units:
+                return []
+            for unit, starts in matches.items():
+                positions[unit].update(starts)
+
+        hits = []
+        for unit in sorted(units)[:limit]:
+            path, label, start, end = self.db.execute(
+                "SELECT path, label, start, end FROM units WHERE id = ?", (unit,)).fetchone()
+            hits.append(Hit(path, label, start, end, sorted(positions[unit])))
+        return hits
+
+    def stats(self):
+        files, units = self.db.execute(
+            "SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM units)").fetchone()
+        terms = self.db.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+        return {'files': files, 'units': units, 'terms': terms}
+
+    def close(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inverted index over section and verse text files")
+    parser.add_argument('--index', default=INDEX_FILE, help=f"index file (default: {INDEX_FILE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="index files (only what is new in files indexed before)")
+    add.add_argument('paths', nargs='+')
+    commands.add_parser('refresh', help="pick up appended sections in every indexed file")
+    search = commands.add_parser('search', help='search, e.g. θεῷ "τὴν ἑορτὴν"')
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=20)
+    commands.add_parser('stats')
+    args = parser.parse_args()
+
+    index = TextIndex(args.index)
+    if args.command == 'add':
+        for path in args.paths:
+            print(f"{path}: {index.add(path)} new unit(s)")
+    elif args.command == 'refresh':
+        changed = index.refresh()
+        for path, added in changed.items():
+            print(f"{os.path.relpath(path)}: {added} new unit(s)")
+        print(f"{len(changed)} file(s) updated")
+    elif args.command == 'search':
+        hits = index.search(args.query)
+        for hit in hits[:args.limit]:
+            text = hit.text()
+            print(f"{os.path.relpath(hit.path)} [{hit.label}] positions {hit.positions}")
+            print(f"    {text[:120]}{'...' if len(text) > 120 else ''}")
+        print(f"{len(hits)} unit(s) found")
+    else:
+        print(index.stats())
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Per-host politeness with token buckets.
+#
+# Each host gets its own bucket that refills at `rate` requests per second
+# and holds at most `burst` tokens. Requests to different hosts never wait
+# for each other, requests to the same host are spaced out.
+
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def host_of(url):
+    """Host part of a URL, lowercased (the key for the buckets)"""
+    return urlparse(url).netloc.lower()
+
+
+class TokenBucket:
+    """A single token bucket; thread safe"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self):
+        """Seconds until a token is available (0 if one is available now)"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        """Take a token if there is one; never blocks"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostThrottle:
+    """
+    One TokenBucket per host, created on first use.
+
+    HostThrottle(delay=1) allows one request per second per host, which is
+    what the old global time.sleep(1) did, but only within a host.
+    """
+
+    def __init__(self, delay=1.0, burst=1):
+        # delay <= 0 disables throttling
+        self.rate = 1.0 / delay if delay > 0 else None
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def ready_in(self, host):
+        if self.rate is None:
+            return 0.0
+        return self.bucket(host).ready_in()
+
+    def try_acquire(self, host):
+        if self.rate is None:
+            return True
+        return self.bucket(host).try_acquire()
+
+    def acquire(self, host):
+        if self.rate is not None:
+            self.bucket(host).acquire()
+
+    def wait_for(self, url):
+        """Blocking acquire for the host of `url` (for serial crawlers)"""
+        self.acquire(host_of(url))
@@ -0,0 +1,277 @@
+# Whole-book chapter downloader for wisdomlib.org.
+#
+# lingyue/step_2.py used to fetch the chapters of a book one after another
+# with a pause in between. Here they are fetched (and parsed) by a small
+# worker pool, with at most `per_host` requests in flight per host and new
+# requests to a host spaced `delay` seconds apart. The default delay is the
+# old loop's 0.8 s pause, so the site gets no more requests per second than
+# before; the pool only overlaps waiting for responses with parsing.
+# Chapters finish in any order; fetch_chapters() hands them back in index
+# order, each one as soon as every chapter before it is done, so the output
+# file can be written while the download is still going.
+#
+# Every finished chapter is also appended to a parts file (JSON lines).
+# After a failed or interrupted run, load_parts() gives back what was
+# already fetched and only the missing chapters are downloaded again.
+#
+# Verses are cut out of the chapter text by segment_verses(), which works on
+# the page's text nodes as they come (ChapterText reads them without building
+# a tree) and yields each verse once its '|| n ||' line is seen. A whole book
+# can go through stream_verses() in one pass.
+
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+
+from common.http_client import fetch_html
+from common.throttle import HostThrottle, host_of
+
+
+def segment_verses(texts):
+    """
+    Split '||'/'|'-delimited text into verses, yielding each verse as soon
+    as its '|| n ||' line arrives. `texts` are text nodes (any iterable of
+    strings); every node is cut into lines and blank lines are dropped, the
+    way get_text(separator="\n") did. A None in `texts` ends the current
+    verse, so a whole book can go through one call with a None after each
+    chapter.
+    """
+    parts = []
+    for text in texts:
+        if text is None:
+            if parts:
+                yield " ".join(parts)
+                parts = []
+            continue
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            parts.append(line)
+            if line.startswith("||"):
+                yield " ".join(parts)
+                parts = []
+    if parts:
+        yield " ".join(parts)
+
+
+def chapter_verses(html):
+    """
+    Verses of a chapter page: the text of div.chapter-content, one verse
+    per '|| n ||' ending, with the grammar/translation UI blocks removed.
+    None if the page has no chapter content.
+    """
+    parser = ChapterText()
+    parser.feed(html)
+    parser.close()
+    if not parser.found:
+        return None
+    return list(segment_verses(parser.take()))
+
+
+class ChapterText(HTMLParser):
+    """
+    The text nodes chapter_verses() reads, without building a tree: the
+    strings inside the first div.chapter-content, minus span.sanskrit-av
+    and script/style. Feed the page in pieces and take() the nodes found
+    so far; text is held back until the next tag so a node is never split.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.nodes = []
+        self.pending = []
+        self.divs = 0        # open divs inside the content div (0 = outside)
+        self.hidden = 0      # open spans/scripts we are skipping
+        self.found = False
+
+    def _flush(self):
+        if self.pending:
+            self.nodes.append("".join(self.pending))
+            self.pending = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if not self.divs:
+            if tag == 'div' and not self.found and 'chapter-content' in _classes(attrs):
+                self.found = True
+                self.divs = 1
+            return
+        if self.hidden:
+            if tag in ('span', 'script', 'style'):
+                self.hidden += 1
+        elif tag in ('script', 'style') or (tag == 'span' and 'sanskrit-av' in _classes(attrs)):
+            self.hidden = 1
+        if tag == 'div':
+            self.divs += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if not self.divs:
+            return
+        if self.hidden and tag in ('span', 'script', 'style'):
+            self.hidden -= 1
+        if tag == 'div':
+            self.divs -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_data(self, data):
+        if self.divs and not self.hidden:
+            self.pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def take(self):
+        nodes, self.nodes = self.nodes, []
+        return nodes
+
+
+def _classes(attrs):
+    for name, value in attrs:
+        if name == 'class' and value:
+            return value.split()
+    return ()
+
+
+def stream_verses(pages):
+    """
+    Verses of chapter pages without building trees, yielded as they are
+    read. `pages` is an iterable of pages, each a string or an iterable of
+    string pieces (e.g. a streamed download); a whole book goes through in
+    one call and no verse runs across a chapter boundary.
+    """
+    def texts():
+        for page in pages:
+            parser = ChapterText()
+            for piece in ([page] if isinstance(page, str) else page):
+                parser.feed(piece)
+                yield from parser.take()
+            parser.close()
+            yield from parser.take()
+            yield None
+
+    return segment_verses(texts())
+
+
+class HostLimit:
+    """At most `per_host` requests in flight per host; thread safe"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def slot(self, url):
+        host = host_of(url)
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.slots[host]
+
+
+def fetch_chapters(chapters, workers=4, per_host=4, delay=0.8, done=None, fetched=None):
+    """
+    Download and parse chapters concurrently.
+        chapters  - list of (link, name) in index order
+        done      - {link: verses} already fetched (from load_parts); not fetched again
+        fetched   - called as fetched(link, name, verses) right after each new
+                    chapter is parsed, in completion order (e.g. save_part)
+
+    Yields (index, link, name, verses) in index order. verses is None for a
+    chapter that failed or has no content; the chapters after it still come.
+    At most workers * 2 chapters are queued at a time. If the caller stops
+    early (Ctrl-C, break), the queued ones are cancelled and the chapters
+    already downloaded still go to `fetched`, so --resume keeps them.
+    """
+    done = done or {}
+    throttle = HostThrottle(delay)
+    limit = HostLimit(per_host)
+
+    def fetch(link):
+        with limit.slot(link):
+            throttle.wait_for(link)
+            html = fetch_html(link, encoding="UTF-8")
+        return chapter_verses(html)
+
+    results = {}
+    futures = {}
+    upcoming = enumerate(chapters)
+    window = workers * 2
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def submit_more():
+        """Queue chapters in index order until the window is full"""
+        for index, (link, name) in upcoming:
+            if link in done:
+                results[index] = done[link]
+            else:
+                futures[pool.submit(fetch, link)] = index
+                if len(futures) >= window:
+                    return
+
+    def collect(future):
+        index = futures.pop(future)
+        link, name = chapters[index]
+        try:
+            verses = future.result()
+        except Exception as e:
+            print(f"Failed {name}: {e}")
+            verses = None
+        if verses is not None and fetched:
+            fetched(link, name, verses)
+        results[index] = verses
+
+    next_index = 0
+    try:
+        submit_more()
+        while next_index < len(chapters):
+            # Hand out everything that is complete up to the first gap
+            while next_index in results:
+                link, name = chapters[next_index]
+                yield next_index, link, name, results.pop(next_index)
+                next_index += 1
+            if next_index == len(chapters):
+                break
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                collect(future)
+            submit_more()
+    finally:
+        # Normally nothing is left; after an interruption keep what has arrived
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in list(futures):
+            if future.cancelled():
+                del futures[future]
+            else:
+                collect(future)
+
+
+def load_parts(path):
+    """{link: verses} of the chapters saved in a parts file (a torn last line is ignored)"""
+    parts = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    part = json.loads(line)
+                except ValueError:
+                    continue
+                parts[part['link']] = part['verses']
+    except FileNotFoundError:
+        pass
+    return parts
+
+
+def save_part(f, link, name, verses):
+    """Append one chapter to an open parts file, flushed right away"""
+    f.write(json.dumps({'link': link, 'name': name, 'verses': verses}, ensure_ascii=False) + "\n")
+    f.flush()
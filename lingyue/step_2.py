@@ -1,52 +1,65 @@
 # 第一步先从目录页面获取所有章节的链接 https://www.wisdomlib.org/hinduism/book/brihat-samhita-sanskrit
 # 第二步再从每个文章页面链接里获取每章节内容
 
-from bs4 import BeautifulSoup
-import re
-from urllib.request import urlopen
+import argparse
+import os
+import sys
 import time
 
-url = "https://www.wisdomlib.org/hinduism/book/brihat-samhita-sanskrit"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import cache_from_environment
+from common.extract import load_rules
+from common.http_client import configure_client, fetch_html, get_client
+from common.wisdomlib import fetch_chapters, load_parts, save_part
 
-# 这里的page是随机起的变量名，后面可以加.read()等功能是因为内容归于urlopen这个函数返回的HTTPResponse对象的类定义了这些方法
+parser = argparse.ArgumentParser(description="Brihat-samhita: table of contents and all chapters")
+parser.add_argument('--workers', type=int, default=4, help="chapters downloaded at the same time (1 = one by one)")
+parser.add_argument('--delay', type=float, default=0.8, help="seconds between two requests to wisdomlib.org (default: 0.8)")
+parser.add_argument('--resume', action='store_true', help="only fetch the chapters missing from the last run")
+parser.add_argument('--no-cache', action='store_true', help="don't keep pages in the response cache (.scraper_cache/)")
+args = parser.parse_args()
 
-page = urlopen(url)
+# 下载过的页面保存在.scraper_cache/里：再运行一次时只向服务器确认页面有没有变（304 Not Modified），没变就不用重新下载
+# 用 --no-cache 或环境变量 SCRAPER_CACHE=off 可以关掉
+configure_client(cache=cache_from_environment(enabled=not args.no_cache))
 
-# page.read()读取服务器返回的原始数据，这些数据是以字节形式返回的，而不是文本形式
-# decode("UTF-8")将这些字节转换为普通的Python字符串
+url = "https://www.wisdomlib.org/hinduism/book/brihat-samhita-sanskrit"
 
-html = page.read().decode("UTF-8")
+# fetch_html通过共享的keep-alive连接池下载页面：同一个网站的多次请求会复用同一个TCP/TLS连接
+# 它读取服务器返回的原始字节数据，再用decode("UTF-8")转换为普通的Python字符串
 
-BASE = "https://www.wisdomlib.org/"
+html = fetch_html(url, encoding="UTF-8")
 
 # print(html)
 
-# 下面第一步的正则需要的是content界面的title，description，contents部分的标题+chapter name及url
-
-pattern = re.compile(r"<title>(.*?)\s*\[sanskrit\]</title>", re.DOTALL)
-matches_title = pattern.search(html)
-book_title = matches_title.group(1).strip()
+# 下面第一步需要的是content界面的title，description，contents部分的标题+chapter name及url
+# 这些字段不再在这里手写正则，而是写在wisdomlib_rules.json规则文件里：common.extract只编译一次规则，
+# 按标签顺序扫描一遍页面，不会像 .*? 的DOTALL正则那样在大页面上反复回溯；网页结构变了也会在skipped里计数提醒
+rules = load_rules(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wisdomlib_rules.json"))
 
-pattern = re.compile(r"<p><em>Summary</em>:\s(.*?)</p>", re.DOTALL)
-matches_description = pattern.search(html)
-description = matches_description.group(1).strip()
+book_title = None
+description = None
+chapters = []
 
-pattern = re.compile(
-    r"<a href=\"/(hinduism/book/brihat-samhita-sanskrit/d/[^\"]+)\">\s*(Chapter\s+\d+[^<]+)</a>", re.DOTALL)
-matches = pattern.findall(html)
+# records()是一个生成器，每找到一条记录就返回 (规则名, 字段字典)，规则名对应规则文件里records下面的名字
+for name, record in rules.records(html):
+    if name == "book" and book_title is None:
+        book_title = record["book_title"]
+    elif name == "summary" and description is None:
+        description = record["description"]
+    elif name == "chapter":
+        # 链接已经按规则文件里的base拼成完整网址，标题里的多余空白也已经去掉
+        chapters.append((record["link"], record["name"]))
 
-# print(matches)
+if rules.skipped or not chapters:
+    print(f"警告：找到{len(chapters)}个章节，{sum(rules.skipped.values())}条记录与wisdomlib_rules.json不匹配，网页结构可能变了\n")
 
 # 方括号创建一个空的列表用来存储搜索结果，目的和好处是把所有结果集中存储在一个地方，方便后续处理和输出
 # 完整逻辑：方括号代表空容器- for loop遍历每个匹配项（注意这里只是遍历而不保存）-把处理后的结果append到列表里（这步才是真正保存结果到容器以便接下来复用或者自定义输出）
 search_results = []
 
-# 必须分两步指定括号对应的变量名再=strip是因为findall返回的matches是一个元组列表，必须先拆开元组才能对每个元素进行strip操作（这些str字符串int float等基本数据类型是不可变的immutable，不能直接对元组内的元素进行修改；而像list dict set等装一堆东西的容器才是可变的）
-# 三种括号在python里的区别：方括号[]表示列表list或创建一个list对象，小括号()表示元组tuple或调用函数/方法，大括号{}表示字典dict/集合set或创建一个dict/set对象
-# for循环直接对应findall返回的每个元组，元组内的每个元素依次赋值给link和chapter_name变量
-for chapter_link, chapter_name in matches:
-    chapter_link = BASE+chapter_link.strip()
-    chapter_name = chapter_name.strip()
+# for循环直接对应chapters里的每个元组，元组内的每个元素依次赋值给chapter_link和chapter_name变量
+for chapter_link, chapter_name in chapters:
     if chapter_name.startswith("Chapter"):
         chapter_name = chapter_name.replace(
             " - ", ": ", 1)  # 把第一个" - "替换成": "，后面的不变以防误伤
@@ -67,52 +80,44 @@ with open("Brihat_samhita_index_sa.txt", "w", encoding="utf-8") as f_index:
         print(f"Link: {chapter_link}\n", file=f_index)
 
 # 第二步：再从每个文章页面链接里获取每章节内容
-# "w+"表示写入模式，如果文件不存在则创建新文件，如果存在则覆盖原有内容
+# 以前是一章一章地下载，每章之后time.sleep(0.8)；现在由common.wisdomlib的fetch_chapters并发下载并解析：
+# 同一个网站最多同时args.workers个请求，两个请求之间至少隔args.delay秒（默认还是0.8秒，对网站的请求频率和以前一样，
+# 并发只是让等待服务器响应和解析网页的时间重叠起来）
+# 各章完成的先后顺序不定，但fetch_chapters按目录顺序交回：前面的章节都好了才交出下一章，所以可以边下载边写文件
+# 每下载好一章就追加到parts文件里；中途失败或中断后用 --resume 重新运行，只下载缺少的章节
+# 分诗句的逻辑也搬到了common.wisdomlib：以前先get_text整段文字、建两个行列表、再用current += 拼接每句；
+# 现在segment_verses直接读网页的文本节点，用列表缓存每句的各行，遇到'|| n ||'就交出一句，分句结果和以前完全一样
+parts_file = "Brihat_samhita_output_sa.parts.jsonl"
+done = load_parts(parts_file) if args.resume else {}
+chapters = [(chapter_link, chapter_name) for _, _, chapter_link, chapter_name in search_results]
+if done:
+    print(f"Resuming: {sum(link in done for link, _ in chapters)} of {len(chapters)} chapters already fetched")
+
+failed = 0
+started = time.perf_counter()
+
+# "w"表示写入模式，如果文件不存在则创建新文件，如果存在则覆盖原有内容；parts文件用"a"追加，续传时保留已下载的章节
 # 如果把所有code放在with块里则会确保每次先正确运行再进行后面的操作
-with open("Brihat_samhita_output_sa.txt", "w", encoding="utf-8") as f_text:
-    for _, _, chapter_link, chapter_name in search_results:
-        page = urlopen(chapter_link)
-        html = page.read().decode("UTF-8")
-
-        # 使用BeautifulSoup解析HTML内容
-        soup = BeautifulSoup(html, 'html.parser')
-
-        content_div = soup.find('div', class_='chapter-content')
-
-        # 删除所有“Analyze grammar / English text”UI块
-        for ui in content_div.find_all("span", class_="sanskrit-av"):
-            ui.decompose()
-
-        if not content_div:
+with open("Brihat_samhita_output_sa.txt", "w", encoding="utf-8") as f_text, \
+        open(parts_file, "a" if args.resume else "w", encoding="utf-8") as f_parts:
+    for index, chapter_link, chapter_name, verses in fetch_chapters(
+            chapters, workers=args.workers, per_host=args.workers, delay=args.delay, done=done,
+            fetched=lambda link, name, verses: save_part(f_parts, link, name, verses)):
+        if verses is None:
             print(f"Content not found for {chapter_name}\n")
+            failed += 1
             continue
 
-        raw_text = content_div.get_text(separator="\n")
-        lines = [line.strip() for line in raw_text.split("\n")]
-        lines = [line for line in lines if line]
-
-        verses = []
-        current = ""
-
-        for line in lines:
-            if line.startswith("||"):
-                current += " " + line
-                verses.append(current.strip())
-                current = ""
-            elif line == "|":
-                current += " |"
-            else:
-                if current:
-                    current += " " + line
-                else:
-                    current = line
-
-        if current:
-            verses.append(current.strip())
-
         print(f"{chapter_name}\n", file=f_text)
         for v in verses:
             print(v, file=f_text)
         print("", file=f_text)  # 章节间空行
-        time.sleep(0.8)
-        # quit()  # 先只处理一个章节看看效果
+        print(f"[{index + 1}/{len(chapters)}] {chapter_name}")
+
+print(f"Done in {time.perf_counter() - started:.1f}s")
+if failed:
+    print(f"{failed} chapter(s) failed - run again with --resume to fetch only those")
+else:
+    os.remove(parts_file)  # 全部成功后不再需要续传文件
+
+print(f"Connections: {get_client().describe_stats()}")
@@ -1,8 +1,11 @@
-import time
+import os
+import sys
 from urllib.parse import urljoin, parse_qs, urlparse
-from urllib.request import urlopen
 
-from bs4 import BeautifulSoup
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.crawl import follow_chain
+from common.http_client import fetch_html, get_client
+from common.parsers import make_soup, take_parser_option
 
 START_URL = "https://www.perseus.tufts.edu/hopper/text?doc=Perseus%3Atext%3A1999.01.0167%3Abook%3D1%3Asection%3D327a"
 BASE_URL = "https://www.perseus.tufts.edu/hopper/"
@@ -12,9 +15,8 @@ def get_soup(url):
     """
     Download one page and turn it into a BeautifulSoup object.
     """
-    page = urlopen(url)
-    html = page.read().decode("utf-8")
-    return BeautifulSoup(html, "html.parser")
+    html = fetch_html(url)
+    return make_soup(html)
 
 
 def extract_greek_text(soup):
@@ -69,19 +71,35 @@ def doc_still_in_book1(url):
     return ":book=1:" in doc_value
 
 
-def scrape_book1(start_url):
+def next_url_in_book1(soup, current_url):
+    """
+    The next URL to visit, or None when there is none or it leaves book 1.
+    """
+    next_url = find_next_url(soup, current_url)
+    if next_url is None:
+        return None
+
+    # Stop once the next URL is no longer book 1
+    if not doc_still_in_book1(next_url):
+        return None
+
+    return next_url
+
+
+def scrape_book1(start_url, pipelined=True, delay=0.5):
     """
     Follow 'next' links, collect Greek text, stop when leaving book 1 chapter 1.
+    pipelined=True: 下一页在后台下载，同时处理和写入当前这一节
+    delay: 两次请求之间至少间隔的秒数
     """
-    url = start_url
     all_sections = []
 
     with open("Republic_chapter_1.txt", "w", encoding="utf-8") as f:
         section_count = 0
 
-        while True:
-            soup = get_soup(url)
-
+        # Be polite to the server: `delay` (0.5 s) between requests, prefetching or not
+        for url, soup in follow_chain(start_url, get_soup, next_url_in_book1,
+                                      delay=delay, pipelined=pipelined):
             greek = extract_greek_text(soup)
             if greek:
                 all_sections.append(greek)
@@ -91,23 +109,13 @@ def scrape_book1(start_url):
                 f.write("\n\n")
                 f.flush()  # 关键：立刻写到磁盘
 
-            next_url = find_next_url(soup, url)
-            if next_url is None:
-                break
-
-            # Stop once the next URL is no longer chapter 1
-            if not doc_still_in_book1(next_url):
-                break
-
-            url = next_url
-
-            # Be polite to the server
-            time.sleep(0.5)
         print(f"Saved {section_count} sections")
 
     return all_sections
 
 
 if __name__ == "__main__":
-    sections = scrape_book1(START_URL)
+    take_parser_option(sys.argv)
+    sections = scrape_book1(START_URL, pipelined="--serial" not in sys.argv)
     print(f"Saved {len(sections)} sections to Republic_chapter_1.txt")
+    print(f"Connections: {get_client().describe_stats()}")
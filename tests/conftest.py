@@ -0,0 +1,25 @@
+# Tests import the shared modules the way the scripts do: from the repo root.
+# The benchmarks dir is on the path too, for their legacy versions and page builders.
+
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+MANIFEST = os.path.join(ROOT, 'benchmarks', 'corpus', 'manifest.json')
+
+
+def corpus_pages(kinds=None, sites=None):
+    """[(name, html), ...] of the recorded corpus, optionally only some kinds or sites"""
+    with open(MANIFEST, encoding='utf-8') as f:
+        entries = json.load(f)['pages']
+    pages = []
+    for entry in entries:
+        if kinds and entry['kind'] not in kinds or sites and entry['site'] not in sites:
+            continue
+        with open(os.path.join(ROOT, entry['path']), encoding='utf-8') as f:
+            pages.append((entry['name'], f.read()))
+    return pages
@@ -0,0 +1,76 @@
+# Census and text statistics against the code they replaced (bench_analytics, bench_text).
+
+import random
+
+import pytest
+
+from bench_analytics import census_analyze, legacy_analyze, make_page
+from bench_text import fuzz, legacy_text_stats
+from common.analytics import StreamingCensus, TextStats, normalized_text_stats, take_census
+from common.parsers import make_soup
+from conftest import corpus_pages
+
+PAGES = [('synthetic x50', make_page(50))] + corpus_pages()
+EDGE_CASES = [
+    ('empty title', '<title></title><p>x</p>'),
+    ('tag inside title', '<title>t<b>x</b></title><p>y</p>'),
+    ('no title', '<p>just  text</p>\n<p>more</p>'),
+    ('template and rp', '<p>a<template>hidden</template><ruby>b<rp>(</rp><rt>c</rt><rp>)</rp></ruby></p>'),
+    ('script and comment', '<p>a</p><script>var s = "<p>no</p>";</script><!-- c --><p>b  c</p>'),
+]
+
+
+@pytest.mark.parametrize('name, html', PAGES + EDGE_CASES, ids=[name for name, _ in PAGES + EDGE_CASES])
+def test_census_matches_legacy_analyze(name, html):
+    assert census_analyze(make_soup(html, 'html.parser')) == legacy_analyze(make_soup(html, 'html.parser'))
+
+
+@pytest.mark.parametrize('name, html', PAGES + EDGE_CASES, ids=[name for name, _ in PAGES + EDGE_CASES])
+def test_streaming_census_matches_tree(name, html):
+    census = take_census(make_soup(html, 'html.parser'))
+    expected = {
+        'title': census['title'],
+        'tags': census['tags'],
+        'text_length': normalized_text_stats(census['text'])[0],
+        'word_count': normalized_text_stats(census['text'])[1],
+    }
+    whole = StreamingCensus()
+    whole.feed(html)
+    assert whole.result() == expected
+
+    chunked = StreamingCensus()
+    for i in range(0, len(html), 1000):
+        chunked.feed(html[i:i + 1000])
+    assert chunked.result() == expected
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[name for name, _ in PAGES])
+def test_text_stats_match_legacy(name, html):
+    text = take_census(make_soup(html, 'html.parser'))['text']
+    assert normalized_text_stats(text) == legacy_text_stats(text)
+
+
+def test_text_stats_fuzz():
+    assert fuzz(cases=3000, seed=7) == 0
+
+
+def test_text_stats_in_random_pieces():
+    rng = random.Random(3)
+    text = take_census(make_soup(make_page(20), 'html.parser'))['text']
+    text += ''.join(rng.choice(' \n\r\ta') for _ in range(2000))
+    expected = legacy_text_stats(text)
+    for _ in range(20):
+        stats = TextStats()
+        position = 0
+        while position < len(text):
+            size = rng.randint(1, 40)
+            stats.feed(text[position:position + size])
+            position += size
+        assert stats.result() == expected
+
+
+def test_text_stats_long_run_without_separators():
+    stats = TextStats()
+    for _ in range(10000):
+        stats.feed('word ')
+    assert stats.result() == normalized_text_stats('word ' * 10000)
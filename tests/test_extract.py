@@ -0,0 +1,89 @@
+# Rule-file extraction against the regexes of the step_2 scripts (bench_extract).
+
+import os
+import time
+
+import pytest
+
+from bench_extract import (perseus_page, perseus_regex, perseus_rules, qalamos_page, qalamos_regex,
+                           qalamos_rules, renamed)
+from common.extract import Extractor, RuleError, load_rules
+from conftest import ROOT, corpus_pages
+
+RULE_FILES = {
+    'qalamos': os.path.join(ROOT, 'andreas', 'qalamos_rules.json'),
+    'perseus': os.path.join(ROOT, 'christian', 'perseus_rules.json'),
+    'perseus_listing': os.path.join(ROOT, 'christian', 'perseus_rules.json'),
+    'wisdomlib': os.path.join(ROOT, 'lingyue', 'wisdomlib_rules.json'),
+}
+SITES = {
+    'qalamos': (qalamos_page, qalamos_regex, qalamos_rules),
+    'perseus': (perseus_page, perseus_regex, perseus_rules),
+}
+
+
+@pytest.fixture
+def extractors():
+    return {name: load_rules(path) for name, path in RULE_FILES.items()}
+
+
+@pytest.mark.parametrize('site', SITES)
+@pytest.mark.parametrize('regex', [True, False], ids=['fast path', 'scan'])
+def test_rules_match_the_regexes(site, regex, extractors):
+    make, old, new = SITES[site]
+    html = make(500)
+    assert new(extractors[site], html, regex) == old(html)
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_pieces_match_the_whole_page(site, extractors):
+    make, old, new = SITES[site]
+    html = make(200)
+    extractor = extractors[site]
+    whole = list(extractor.records(html))
+    for size in (4096, 13):
+        assert list(extractor.records(html[i:i + size] for i in range(0, len(html), size))) == whole
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_shifted_markup(site, extractors):
+    make, old, new = SITES[site]
+    entries = 500
+    html = make(entries, shifted=True)
+    extractor = extractors[site]
+    records = new(extractor, html)
+    skipped = sum(extractor.skipped.values())
+    assert len(records) + skipped == entries
+    assert len(records) > len(old(html))
+    if site == 'perseus':
+        assert skipped == 0
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_renamed_class_is_quick(site, extractors):
+    make, old, new = SITES[site]
+    html = renamed(make(2000), site)
+    start = time.perf_counter()
+    assert new(extractors[site], html) == []
+    assert time.perf_counter() - start < 5
+
+
+@pytest.mark.parametrize('name, html, site', [(name, html, site)
+                                               for site in ('qalamos', 'perseus_listing', 'wisdomlib')
+                                               for name, html in corpus_pages(sites={site})
+                                               if site != 'wisdomlib' or name == 'wisdomlib_index'])
+def test_recorded_pages(name, html, site):
+    extractor = load_rules(RULE_FILES[site])
+    fast = extractor._regex_records(html)
+    assert fast, "the fast path should take the recorded page"
+    assert fast == list(extractor.records(html, regex=False))
+
+
+def test_regex_groups_must_be_fields():
+    rules = {'records': {'link': {
+        'select': {'tag': 'a'},
+        'fields': {'link': {'attr': 'href'}},
+        'regex': {'pattern': '<a href="(?P<href>[^"]*)">', 'count': ['<a\\b']},
+    }}}
+    with pytest.raises(RuleError):
+        Extractor(rules)
@@ -0,0 +1,67 @@
+# HttpClient against a local keep-alive server with ETags, no network needed.
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from common.cache import ResponseCache
+from common.http_client import HttpClient
+
+PAGE = b'<html><head><title>cached</title></head><body><p>hello</p></body></html>'
+ETAG = '"v1"'
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), EtagHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/page"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = HttpClient(cache=ResponseCache(str(tmp_path / 'cache'), ttl=0))
+    yield client
+    client.close()  # closes the cache too
+
+
+def test_get_text_revalidation_reuses_connection(server, client):
+    for _ in range(5):
+        assert client.get_text(server) == PAGE.decode()
+    stats = client.stats()
+    assert stats['opened'] == 1
+    assert stats['reused'] == 4
+    assert client.cache.stats()['revalidated'] == 4
+
+
+def test_get_revalidation_reuses_connection(server, client):
+    for _ in range(5):
+        assert client.get(server).body == PAGE
+    stats = client.stats()
+    assert stats['opened'] == 1
+    assert stats['reused'] == 4
+    assert client.cache.stats()['revalidated'] == 4
@@ -0,0 +1,40 @@
+# TermMatcher counts against str.count on the page text, as the docstring promises.
+
+import re
+
+import pytest
+
+from common.parsers import make_soup
+from common.search import TermMatcher, parse_query
+from conftest import corpus_pages
+
+PAGES = corpus_pages(kinds={'small', 'typical'})
+TERMS = ['the', 'a', 'an', 'and', 'sanskrit', 'chapter', 'zeus', 'ss', 'e ', ' ', '\n', 'nonexistent']
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[name for name, _ in PAGES])
+def test_term_counts_match_str_count(name, html):
+    soup = make_soup(html, 'html.parser')
+    text = soup.get_text().lower()
+    results = TermMatcher(TERMS).search(soup)
+    assert {term: results[term]['count'] for term in TERMS} == {term: text.count(term) for term in TERMS}
+
+
+def test_case_sensitive_and_across_elements():
+    soup = make_soup('<p>Ze<b>us</b> and zeus, ZEUS</p>', 'html.parser')
+    assert TermMatcher(['zeus']).search(soup)['zeus']['count'] == 3
+    assert TermMatcher(['zeus'], case_sensitive=True).search(soup)['zeus']['count'] == 1
+
+
+def test_regex_counts():
+    soup = make_soup('<p>polis 12 poleis</p><p>politeia 345 6789</p>', 'html.parser')
+    pattern = r'\bpol\w*'
+    results = TermMatcher(regexes=[pattern, r'\d{1,3}']).search(soup)
+    # Within one text node each: 'poleis' and 'politeia' stay apart
+    assert results[pattern]['count'] == sum(len(re.findall(pattern, s)) for s in soup.strings) == 3
+    assert results[r'\d{1,3}']['count'] == 4
+
+
+def test_parse_query_keeps_regexes_whole():
+    assert parse_query('zeus, athena ,/a,b/, /\\d{1,3}/') == (['zeus', 'athena'], ['a,b', '\\d{1,3}'])
+    assert parse_query(' , ,') == ([], [])
@@ -0,0 +1,60 @@
+# Verse segmentation of the Brihat Samhita (bench_verses): every variant must give
+# back exactly the verses of lingyue/brihat_samhita_output_sa.txt.
+
+import pytest
+
+from bench_verses import _Text, chapter_page, content_of, legacy_chapter_verses, legacy_segment, load_book
+from common.wisdomlib import chapter_verses, segment_verses, stream_verses
+from conftest import corpus_pages
+
+
+@pytest.fixture(scope='module')
+def book():
+    chapters = load_book()
+    pages = [chapter_page(name, verses) for name, verses in chapters]
+    return pages, [verse for _, verses in chapters for verse in verses]
+
+
+def test_legacy_reads_the_book(book):
+    pages, expected = book
+    assert [v for page in pages for v in legacy_chapter_verses(page)] == expected
+
+
+def test_chapter_verses(book):
+    pages, expected = book
+    assert [v for page in pages for v in chapter_verses(page)] == expected
+
+
+def test_segment_verses_on_the_tree(book):
+    pages, expected = book
+    assert [v for page in pages for v in segment_verses(content_of(page).strings)] == expected
+
+
+def test_stream_verses_whole_book(book):
+    pages, expected = book
+    assert list(stream_verses(pages)) == expected
+
+
+def pieces(page, size):
+    return [page[i:i + size] for i in range(0, len(page), size)]
+
+
+def test_stream_verses_in_pieces(book):
+    pages, expected = book
+    assert list(stream_verses(pieces(page, 4096) for page in pages)) == expected
+    # Tags, entities and '||' cut anywhere
+    few = pages[:5]
+    assert list(stream_verses(pieces(page, 7) for page in few)) == [v for page in few for v in chapter_verses(page)]
+
+
+CHAPTERS = [(name, html) for name, html in corpus_pages(sites={'wisdomlib'}) if 'chapter' in name]
+
+
+@pytest.mark.parametrize('name, html', CHAPTERS, ids=[name for name, _ in CHAPTERS])
+def test_recorded_chapters(name, html):
+    assert chapter_verses(html) == legacy_chapter_verses(html)
+
+
+def test_one_long_verse():
+    text = "\n".join(f"pada {i} |" if i % 2 else f"pada {i}" for i in range(20000))
+    assert list(segment_verses([text])) == legacy_segment(_Text(text))